@@ -0,0 +1,306 @@
+"""
+Benchmarks for the ECG/EEG conversion, anomaly detection and route hot paths
+
+Run from the backend directory:
+
+    python -m benchmarks.run_benchmarks                  # 1e3 to 1e5 samples
+    python -m benchmarks.run_benchmarks --full           # 1e3 to 1e7 samples
+    python -m benchmarks.run_benchmarks --save-baseline  # store results as the baseline
+    python -m benchmarks.run_benchmarks --compare        # flag regressions against the baseline
+
+Every stage is run on the same deterministic synthetic recording. Results
+report throughput, p50/p99 latency and peak traced memory per stage and
+size, and are written to benchmarks/results/.
+"""
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+FULL_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Stages are repeated until roughly this many samples have been processed
+SAMPLES_PER_STAGE = 1_000_000
+
+# Channels of the montage the multi-channel EEG stage spreads its samples over
+MONTAGE_CHANNELS = 32
+
+# Latency increase over the baseline p50 that counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Keep the stores used by the route stages out of the working tree
+_scratch = tempfile.mkdtemp(prefix='neurocard-bench-')
+os.environ.setdefault('ANOMALY_DB_PATH', os.path.join(_scratch, 'anomalies.db'))
+os.environ.setdefault('SIGNAL_DB_PATH', os.path.join(_scratch, 'signals.db'))
+
+# Time the route stages inline at every size rather than as background jobs
+os.environ.setdefault('ADMISSION_MAX_INLINE_COST', str(FULL_SIZES[-1] * 10))
+os.environ.setdefault('ADMISSION_MAX_REQUEST_COST', str(FULL_SIZES[-1] * 10))
+
+from benchmarks.synthetic import SAMPLE_RATE_HZ, generate_ecg, generate_eeg
+from services.eeg_ecg_conversion import convert_ecg_to_eeg, EEG_BANDS
+from services.derived_signals import ecg_rows, eeg_rows
+from services.anomaly_detection import (
+    detect_ecg_anomalies,
+    detect_eeg_anomalies,
+    detect_combined_anomalies,
+    detect_eeg_array_anomalies
+)
+from services.eeg_array import EEGArray
+
+
+def _install_synthetic_source(sample_rate, seed):
+    # Route handlers fetch ECG through utils.signal_processing; serve the
+    # synthetic recording from there so route timings are reproducible
+    def generate_mock_ecg_data(start_time=None, end_time=None):
+        n = max(int((end_time - start_time) * sample_rate / 1000), 0)
+        timestamps, values = generate_ecg(n, start_ms=start_time, sample_rate=sample_rate, seed=seed)
+        return ecg_rows(timestamps, values)
+
+    module = types.ModuleType('utils.signal_processing')
+    module.generate_mock_ecg_data = generate_mock_ecg_data
+    sys.modules['utils.signal_processing'] = module
+
+
+def _route_client():
+    from flask import Flask
+    from routes.health_data import health_data_bp
+    from routes.jobs import jobs_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(health_data_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def build_stages(size, sample_rate, seed):
+    """
+    Prepare the benchmark stages for one input size
+
+    Args:
+        size (int): Number of samples per stage
+        sample_rate (int): Samples per second of the synthetic recording
+        seed (int): Random seed
+
+    Returns:
+        dict: Stage name to a zero-argument callable
+    """
+    np.random.seed(seed)
+
+    timestamps, values = generate_ecg(size, sample_rate=sample_rate, seed=seed)
+    eeg_timestamps, bands = generate_eeg(size, sample_rate=sample_rate, seed=seed)
+    ecg_data = ecg_rows(timestamps, values)
+    eeg_data = eeg_rows(eeg_timestamps, np.stack([bands[band] for band in EEG_BANDS]))
+
+    # The same band values spread over a multi-channel montage
+    n_windows = size // MONTAGE_CHANNELS
+    montage = EEGArray(
+        np.stack([bands[band][:n_windows * MONTAGE_CHANNELS] for band in bands])
+        .reshape(len(bands), MONTAGE_CHANNELS, n_windows).transpose(1, 0, 2),
+        eeg_timestamps[:n_windows],
+        [f'ch{channel}' for channel in range(MONTAGE_CHANNELS)],
+        list(bands)
+    )
+
+    start_ms = int(timestamps[0])
+    end_ms = start_ms + size * 1000 // sample_rate
+    window = f'startTime={start_ms}&endTime={end_ms}'
+
+    client = _route_client()
+    from services.result_cache import result_cache
+    from services.derived_signals import derived_signals
+
+    runs = iter(range(sys.maxsize))
+
+    def get(path):
+        # A fresh patient and empty caches force the compute path each run
+        result_cache.clear()
+        derived_signals.clear()
+        response = client.get(f'{path}?{window}&patientId=bench-{next(runs)}')
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+        return response
+
+    return {
+        'convert_ecg_to_eeg': lambda: [convert_ecg_to_eeg(value) for value in values.tolist()],
+        'detect_ecg_anomalies': lambda: detect_ecg_anomalies(ecg_data),
+        'detect_eeg_anomalies': lambda: detect_eeg_anomalies(eeg_data),
+        'detect_combined_anomalies': lambda: detect_combined_anomalies(ecg_data, eeg_data),
+        'detect_eeg_array_anomalies': lambda: detect_eeg_array_anomalies(montage),
+        'route_ecg': lambda: get('/api/ecg'),
+        'route_eeg': lambda: get('/api/eeg'),
+        'route_anomalies': lambda: get('/api/anomalies')
+    }
+
+
+def measure(stage, size, repeats):
+    """
+    Time a stage and trace its peak memory
+
+    Args:
+        stage (callable): The stage to run
+        size (int): Number of samples the stage processes
+        repeats (int): Number of timed runs
+
+    Returns:
+        dict: Latency percentiles, throughput and peak memory
+    """
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        stage()
+        latencies.append(time.perf_counter() - started)
+
+    # Memory is traced in a separate run so tracing does not skew the timings
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1000
+    p50 = float(np.percentile(latencies, 50))
+
+    return {
+        'repeats': repeats,
+        'p50_ms': p50,
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'throughput_sps': size / (p50 / 1000) if p50 else None,
+        'peak_memory_bytes': peak
+    }
+
+
+def run(sizes, stage_names, repeat, sample_rate, seed):
+    """
+    Run every selected stage at every size
+
+    Returns:
+        list: One result dict per stage and size
+    """
+    _install_synthetic_source(sample_rate, seed)
+
+    results = []
+    for size in sizes:
+        stages = build_stages(size, sample_rate, seed)
+        repeats = max(1, min(repeat, SAMPLES_PER_STAGE // size))
+
+        for name, stage in stages.items():
+            if stage_names and name not in stage_names:
+                continue
+
+            result = {'stage': name, 'size': size, **measure(stage, size, repeats)}
+            results.append(result)
+            print(f"{name:28s} n={size:<10d} p50={result['p50_ms']:10.2f}ms "
+                  f"p99={result['p99_ms']:10.2f}ms "
+                  f"{result['throughput_sps']:14.0f} samples/s "
+                  f"peak={result['peak_memory_bytes'] / 2 ** 20:8.1f}MiB")
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Find stages whose p50 latency regressed against the baseline
+
+    Args:
+        results (list): Current results
+        baseline (list): Baseline results
+        tolerance (float): Allowed relative increase in p50 latency
+
+    Returns:
+        list: Descriptions of the regressions
+    """
+    previous = {(result['stage'], result['size']): result for result in baseline}
+    regressions = []
+
+    for result in results:
+        before = previous.get((result['stage'], result['size']))
+        if not before or not before['p50_ms']:
+            continue
+
+        ratio = result['p50_ms'] / before['p50_ms']
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{result['stage']} n={result['size']}: p50 {before['p50_ms']:.2f}ms -> "
+                f"{result['p50_ms']:.2f}ms ({ratio:.2f}x)"
+            )
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=lambda value: int(float(value)), nargs='+',
+                        help='input sizes in samples (default: 1e3 1e4 1e5)')
+    parser.add_argument('--full', action='store_true', help='run sizes from 1e3 to 1e7')
+    parser.add_argument('--stages', nargs='+', help='only run these stages')
+    parser.add_argument('--repeat', type=int, default=50, help='maximum timed runs per stage')
+    parser.add_argument('--sample-rate', type=int, default=SAMPLE_RATE_HZ)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='where to write the results JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline results JSON')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='flag regressions against the baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    results = run(sizes, args.stages, args.repeat, args.sample_rate, args.seed)
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'sampleRate': args.sample_rate,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline written to {args.baseline}')
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f'No baseline at {args.baseline}')
+            return 1
+
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
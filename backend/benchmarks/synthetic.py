@@ -0,0 +1,91 @@
+import numpy as np
+
+# Default sampling rate of the synthetic recordings
+SAMPLE_RATE_HZ = 250
+
+# Fraction of samples that belong to an injected anomaly
+ANOMALY_FRACTION = 0.001
+
+# Length of each injected anomaly, in samples
+ANOMALY_LENGTH = 8
+
+
+def _anomaly_mask(rng, n):
+    """
+    Mark runs of samples that carry an injected anomaly
+
+    Args:
+        rng (np.random.Generator): Seeded random generator
+        n (int): Number of samples
+
+    Returns:
+        np.ndarray: Boolean mask of anomalous samples
+    """
+    mask = np.zeros(n, dtype=bool)
+    n_anomalies = int(n * ANOMALY_FRACTION / ANOMALY_LENGTH)
+
+    if n_anomalies and n > ANOMALY_LENGTH:
+        starts = rng.integers(0, n - ANOMALY_LENGTH, size=n_anomalies)
+        for offset in range(ANOMALY_LENGTH):
+            mask[starts + offset] = True
+
+    return mask
+
+
+def generate_ecg(n, start_ms=1_700_000_000_000, sample_rate=SAMPLE_RATE_HZ, seed=0):
+    """
+    Generate a deterministic synthetic ECG recording
+
+    Mirrors the frontend mock: a slow sine baseline, an R peak every ten
+    samples and uniform noise, plus runs of high-amplitude samples injected
+    as anomalies.
+
+    Args:
+        n (int): Number of samples
+        start_ms (int, optional): Timestamp of the first sample in milliseconds
+        sample_rate (int, optional): Samples per second
+        seed (int, optional): Random seed
+
+    Returns:
+        tuple: (timestamps, values) as int64 and float64 arrays
+    """
+    rng = np.random.default_rng(seed)
+    i = np.arange(n)
+
+    values = np.sin(i * 0.2) * 0.5
+    values += (i % 10 == 0) * 1.0
+    values += rng.random(n) * 0.1
+    values[_anomaly_mask(rng, n)] += 4.0
+
+    timestamps = start_ms + (i * 1000) // sample_rate
+    return timestamps.astype(np.int64), values
+
+
+def generate_eeg(n, start_ms=1_700_000_000_000, sample_rate=SAMPLE_RATE_HZ, seed=0):
+    """
+    Generate a deterministic synthetic EEG band-power recording
+
+    Each band is a slow sine at its own frequency plus noise, with runs of
+    elevated power injected as anomalies.
+
+    Args:
+        n (int): Number of samples
+        start_ms (int, optional): Timestamp of the first sample in milliseconds
+        sample_rate (int, optional): Samples per second
+        seed (int, optional): Random seed
+
+    Returns:
+        tuple: (timestamps, bands) where bands maps band name to a float64 array
+    """
+    rng = np.random.default_rng(seed + 1)
+    i = np.arange(n)
+
+    bands = {}
+    for k, band in enumerate(('alpha', 'beta', 'theta', 'delta')):
+        values = 0.5 + np.sin(i * 0.01 * (k + 1)) * 0.2 + rng.random(n) * 0.1
+        values[_anomaly_mask(rng, n)] += 2.0
+        bands[band] = values
+
+    timestamps = start_ms + (i * 1000) // sample_rate
+    return timestamps.astype(np.int64), bands
+
@@ -0,0 +1,116 @@
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeUpstream:
+    """
+    Local stand-in for an external API with configurable latency and error rate
+
+    Runs a threaded HTTP server on a free local port. Every request waits
+    for the configured latency (plus uniform jitter) and then fails with a
+    500 at the configured error rate, or returns the JSON body produced by
+    the subclass.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                upstream._handle(self)
+
+            def do_POST(self):
+                upstream._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeUpstream':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests += 1
+
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < self.error_rate:
+            status, payload = 500, {'error': 'injected failure'}
+        else:
+            status, payload = 200, self.respond(handler.path, body)
+
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def respond(self, path: str, body: bytes) -> dict:
+        return {}
+
+
+class FakeOpenRouter(FakeUpstream):
+    """
+    Stand-in for the OpenRouter chat completions API
+    """
+
+    def respond(self, path, body):
+        return {
+            'id': 'fake-completion',
+            'choices': [{
+                'message': {
+                    'role': 'assistant',
+                    'content': 'This is a canned analysis from the local OpenRouter stand-in.'
+                }
+            }]
+        }
+
+
+class FakeGoogleFit(FakeUpstream):
+    """
+    Stand-in for the Google Fit REST API (datasets and aggregate endpoints)
+    """
+
+    def respond(self, path, body):
+        now_ns = int(time.time() * 1e9)
+        return {
+            'point': [
+                {
+                    'startTimeNanos': str(now_ns - i * 1_000_000_000),
+                    'endTimeNanos': str(now_ns - i * 1_000_000_000),
+                    'dataTypeName': 'com.google.heart_rate.bpm',
+                    'value': [{'fpVal': 60 + random.random() * 20}]
+                }
+                for i in range(60)
+            ]
+        }
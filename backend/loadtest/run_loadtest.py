@@ -0,0 +1,363 @@
+"""
+HTTP load test for the backend with local stand-ins for OpenRouter and Google Fit
+
+Run from the backend directory:
+
+    python -m loadtest.run_loadtest                              # 10 dashboards for 30s
+    python -m loadtest.run_loadtest --concurrency 1 5 10 25 50   # step up to find saturation
+    python -m loadtest.run_loadtest --url http://host:5000       # target a running node
+    python -m loadtest.run_loadtest --save-baseline / --compare  # track regressions
+
+Each simulated dashboard loops over a weighted mix of /api/ecg, /api/eeg,
+/api/anomalies, /api/llm/* and /api/google-fit/sync requests. Unless --url
+is given, the Flask app is started in-process with LLM_API_URL and
+GOOGLE_FIT_API_URL pointing at local fake servers whose latency and error
+rate are configurable. Throughput, latency percentiles and error rates are
+reported per endpoint and concurrency level.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import requests
+
+from loadtest.fakes import FakeOpenRouter, FakeGoogleFit
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(LOADTEST_DIR, 'results')
+BASELINE_PATH = os.path.join(LOADTEST_DIR, 'baseline.json')
+
+# Relative weight of each request kind in the traffic mix
+DEFAULT_MIX = {
+    'ecg': 30,
+    'eeg': 30,
+    'anomalies': 20,
+    'google_fit_sync': 10,
+    'llm_recommendations': 7,
+    'llm_analysis': 3
+}
+
+# Throughput gain below which a concurrency step counts as saturated
+SATURATION_GAIN = 0.1
+
+# Latency increase over the baseline p99 that counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+class Dashboard:
+    """
+    One simulated dashboard issuing requests from the traffic mix
+    """
+
+    def __init__(self, base_url, mix, patients, think_time, rng):
+        self.base_url = base_url.rstrip('/')
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.patients = patients
+        self.think_time = think_time
+        self.rng = rng
+        self.session = requests.Session()
+        self.anomaly_ids = []
+
+    def _window(self):
+        now = int(time.time() * 1000)
+        # Mostly the live view, sometimes a historical hour
+        if self.rng.random() < 0.7:
+            return now - 10 * 60 * 1000, now
+        end = now - self.rng.randint(1, 72) * 60 * 60 * 1000
+        return end - 60 * 60 * 1000, end
+
+    def request(self, kind):
+        patient = self.rng.choice(self.patients)
+        start, end = self._window()
+        window = {'startTime': start, 'endTime': end, 'patientId': patient}
+
+        if kind == 'ecg':
+            return self.session.get(f'{self.base_url}/api/ecg', params={**window, 'maxPoints': 500})
+        if kind == 'eeg':
+            return self.session.get(f'{self.base_url}/api/eeg', params={**window, 'maxPoints': 500})
+        if kind == 'anomalies':
+            response = self.session.get(f'{self.base_url}/api/anomalies', params=window)
+            if response.ok:
+                self.anomaly_ids = [anomaly['id'] for anomaly in response.json()[:20]] or self.anomaly_ids
+            return response
+        if kind == 'google_fit_sync':
+            return self.session.post(f'{self.base_url}/api/google-fit/sync',
+                                     json={'startTime': start, 'endTime': end})
+        if kind == 'llm_recommendations':
+            return self.session.post(f'{self.base_url}/api/llm/recommendations', json={
+                'ecgData': [], 'eegData': [], 'anomalies': [],
+                'userProfile': {'age': 50, 'gender': 'female'}
+            })
+        if kind == 'llm_analysis':
+            anomaly_id = self.rng.choice(self.anomaly_ids) if self.anomaly_ids else 'unknown'
+            return self.session.get(f'{self.base_url}/api/llm/analysis/{anomaly_id}')
+
+        raise ValueError(f'Unknown request kind: {kind}')
+
+    def run(self, deadline, samples):
+        while time.time() < deadline:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                status = self.request(kind).status_code
+            except requests.RequestException:
+                status = None
+            samples.append((kind, time.perf_counter() - started, status))
+
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+
+def summarize(samples, duration):
+    """
+    Aggregate request samples per endpoint
+
+    Args:
+        samples (list): (kind, latency_seconds, status) tuples
+        duration (float): Length of the run in seconds
+
+    Returns:
+        dict: Per-endpoint and overall throughput, latency percentiles and error rate
+    """
+    groups = {}
+    for kind, latency, status in samples:
+        groups.setdefault(kind, []).append((latency, status))
+    groups['total'] = [(latency, status) for _, latency, status in samples]
+
+    summary = {}
+    for kind, entries in groups.items():
+        latencies = np.array([latency for latency, _ in entries]) * 1000
+        # 404 from the anomaly analysis of an unknown id is an expected answer
+        errors = sum(1 for _, status in entries if status is None or status >= 500 or status == 429)
+        summary[kind] = {
+            'requests': len(entries),
+            'throughput_rps': len(entries) / duration,
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'error_rate': errors / len(entries) if entries else 0.0
+        }
+    return summary
+
+
+def run_level(base_url, concurrency, duration, mix, patients, think_time, seed):
+    """
+    Drive the backend with a number of concurrent dashboards
+
+    Returns:
+        dict: The summary for this concurrency level
+    """
+    samples = []
+    deadline = time.time() + duration
+    dashboards = [
+        Dashboard(base_url, mix, patients, think_time, random.Random(seed + i))
+        for i in range(concurrency)
+    ]
+    threads = [threading.Thread(target=dashboard.run, args=(deadline, samples)) for dashboard in dashboards]
+
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return summarize(samples, time.time() - started)
+
+
+def find_saturation(levels):
+    """
+    Find the first concurrency level at which throughput stops scaling
+
+    Args:
+        levels (list): Results per concurrency level, ascending
+
+    Returns:
+        int: The saturating concurrency, or None if throughput kept scaling
+    """
+    for previous, current in zip(levels, levels[1:]):
+        before = previous['endpoints']['total']['throughput_rps']
+        after = current['endpoints']['total']['throughput_rps']
+        if before and (after - before) / before < SATURATION_GAIN:
+            return current['concurrency']
+    return None
+
+
+def compare(levels, baseline, tolerance):
+    """
+    Find endpoints whose p99 latency or error rate regressed against the baseline
+
+    Returns:
+        list: Descriptions of the regressions
+    """
+    previous = {level['concurrency']: level['endpoints'] for level in baseline}
+    regressions = []
+
+    for level in levels:
+        before_level = previous.get(level['concurrency'], {})
+        for kind, result in level['endpoints'].items():
+            before = before_level.get(kind)
+            if not before:
+                continue
+            if before['p99_ms'] and result['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+                regressions.append(f"{kind} @{level['concurrency']}: p99 {before['p99_ms']:.1f}ms -> "
+                                   f"{result['p99_ms']:.1f}ms")
+            if result['error_rate'] > before['error_rate'] + 0.01:
+                regressions.append(f"{kind} @{level['concurrency']}: error rate "
+                                   f"{before['error_rate']:.1%} -> {result['error_rate']:.1%}")
+
+    return regressions
+
+
+def start_local_backend(open_router, google_fit):
+    """
+    Start the Flask app in-process against the fake upstreams
+
+    Returns:
+        tuple: (base_url, server)
+    """
+    scratch = tempfile.mkdtemp(prefix='neurocard-loadtest-')
+    os.environ.setdefault('ANOMALY_DB_PATH', os.path.join(scratch, 'anomalies.db'))
+    os.environ.setdefault('SIGNAL_DB_PATH', os.path.join(scratch, 'signals.db'))
+    os.environ['LLM_API_URL'] = f'{open_router.url}/api/v1/chat/completions'
+    os.environ['LLM_API_KEY'] = os.environ.get('LLM_API_KEY') or 'loadtest'
+    os.environ['GOOGLE_FIT_API_URL'] = google_fit.url
+
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from main import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        kind, weight = part.split('=')
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'Unknown request kind: {kind}')
+        mix[kind] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='target a running backend instead of starting one')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10], help='dashboards per level')
+    parser.add_argument('--duration', type=float, default=30, help='seconds per concurrency level')
+    parser.add_argument('--think-time', type=float, default=0.5, help='mean pause between requests')
+    parser.add_argument('--patients', type=int, default=5, help='distinct patient ids to spread load over')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='traffic weights, e.g. ecg=3,eeg=3,anomalies=2,llm_analysis=1')
+    parser.add_argument('--llm-latency', type=float, default=1.5, help='fake OpenRouter latency (s)')
+    parser.add_argument('--llm-error-rate', type=float, default=0.02)
+    parser.add_argument('--fit-latency', type=float, default=0.3, help='fake Google Fit latency (s)')
+    parser.add_argument('--fit-error-rate', type=float, default=0.01)
+    parser.add_argument('--jitter', type=float, default=0.2, help='uniform latency jitter of the fakes (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='where to write the results JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    open_router = FakeOpenRouter(args.llm_latency, args.jitter, args.llm_error_rate).start()
+    google_fit = FakeGoogleFit(args.fit_latency, args.jitter, args.fit_error_rate).start()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        base_url, server = start_local_backend(open_router, google_fit)
+
+    patients = [f'loadtest-{i}' for i in range(args.patients)]
+    levels = []
+    try:
+        for concurrency in args.concurrency:
+            endpoints = run_level(base_url, concurrency, args.duration, args.mix,
+                                  patients, args.think_time, args.seed)
+            levels.append({'concurrency': concurrency, 'endpoints': endpoints})
+
+            print(f'--- {concurrency} dashboards ---')
+            for kind, result in sorted(endpoints.items()):
+                if not result['requests']:
+                    continue
+                print(f"{kind:22s} {result['requests']:7d} req {result['throughput_rps']:8.1f} rps "
+                      f"p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms "
+                      f"p99={result['p99_ms']:8.1f}ms errors={result['error_rate']:.1%}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        open_router.stop()
+        google_fit.stop()
+
+    if server is not None:
+        # A stand-in that saw no traffic means its URL is not wired into the app
+        print(f'Upstream requests: OpenRouter {open_router.requests}, Google Fit {google_fit.requests}')
+
+    saturation = find_saturation(levels)
+    if saturation is not None:
+        print(f'Throughput stops scaling at {saturation} dashboards')
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(),
+            'target': args.url or 'in-process',
+            'duration': args.duration,
+            'thinkTime': args.think_time,
+            'mix': args.mix,
+            'fakes': {
+                'llmLatency': args.llm_latency, 'llmErrorRate': args.llm_error_rate,
+                'fitLatency': args.fit_latency, 'fitErrorRate': args.fit_error_rate,
+                'jitter': args.jitter,
+                'llmRequests': open_router.requests, 'fitRequests': google_fit.requests
+            }
+        },
+        'saturation': saturation,
+        'levels': levels
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline written to {args.baseline}')
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f'No baseline at {args.baseline}')
+            return 1
+
+        with open(args.baseline) as f:
+            baseline = json.load(f)['levels']
+
+        regressions = compare(levels, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
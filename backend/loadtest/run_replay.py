@@ -0,0 +1,149 @@
+"""
+Replay a stored recording through the live ingestion pipeline
+
+Run from the backend directory:
+
+    python -m loadtest.run_replay --synthetic 600                # record 10 min, replay at max speed
+    python -m loadtest.run_replay --patient p1 --speed 1         # replay p1's recording in real time
+    python -m loadtest.run_replay --synthetic 600 --speed 10 --patients 1 5 10 25
+
+The recording is read from the signal store and re-emitted chunk by chunk
+through ingestion, ECG to EEG conversion, streaming detection and the live
+push feed, at 1x, Nx or maximum speed. Each level replays the recording as
+that many concurrent patients and reports per-stage time, the lag behind
+the replay schedule and the sustained samples per second. At a given speed
+a level keeps up while the worst lag stays below one chunk; the number of
+patients a node can monitor is read off the largest such level, or, at
+maximum speed, estimated from the sustained samples per second.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(LOADTEST_DIR, 'results')
+
+# Sample rate of synthetic recordings
+SYNTHETIC_SAMPLE_RATE = 250
+
+
+def parse_speed(value):
+    if value == 'max':
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError('speed must be positive or "max"')
+    return speed
+
+
+def record_synthetic(patient_id, seconds, sample_rate, seed):
+    """
+    Store a synthetic ECG recording to replay
+
+    Args:
+        patient_id (str): The patient to record under
+        seconds (float): Length of the recording
+        sample_rate (int): Samples per second
+        seed (int): Random seed
+    """
+    from benchmarks.synthetic import generate_ecg
+    from services.signal_store import get_signal_store
+
+    timestamps, values = generate_ecg(int(seconds * sample_rate), sample_rate=sample_rate, seed=seed)
+    get_signal_store().append(patient_id, 'ecg', timestamps, values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patient', default='replay-source', help='patient whose recording is replayed')
+    parser.add_argument('--start', type=int, help='start of the recording in milliseconds')
+    parser.add_argument('--end', type=int, help='end of the recording in milliseconds')
+    parser.add_argument('--synthetic', type=float, metavar='SECONDS',
+                        help='first record a synthetic ECG session of this length')
+    parser.add_argument('--sample-rate', type=int, default=SYNTHETIC_SAMPLE_RATE,
+                        help='sample rate of the synthetic session')
+    parser.add_argument('--speed', type=parse_speed, default=None, help='replay speed, e.g. 1, 10 or max')
+    parser.add_argument('--patients', type=int, nargs='+', default=[1],
+                        help='concurrent replayed patients per level')
+    parser.add_argument('--chunk-ms', type=int, default=1000, help='recording time emitted per chunk')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='where to write the results JSON')
+    args = parser.parse_args(argv)
+
+    # Keep replayed data out of the working databases unless pointed at them
+    if args.synthetic:
+        scratch = tempfile.mkdtemp(prefix='neurocard-replay-')
+        os.environ.setdefault('ANOMALY_DB_PATH', os.path.join(scratch, 'anomalies.db'))
+        os.environ.setdefault('SIGNAL_DB_PATH', os.path.join(scratch, 'signals.db'))
+        record_synthetic(args.patient, args.synthetic, args.sample_rate, args.seed)
+
+    from services.replay import load_recording, run_concurrent
+
+    recording = load_recording(args.patient, start_ms=args.start, end_ms=args.end)
+    if not recording:
+        print(f'No recording stored for {args.patient}')
+        return 1
+
+    speed_name = 'max' if args.speed is None else f'{args.speed:g}x'
+    levels = []
+    for n_patients in args.patients:
+        result = run_concurrent(recording, n_patients, speed=args.speed, chunk_ms=args.chunk_ms,
+                                target_prefix=f'replay-{n_patients}')
+        result['keepsUp'] = args.speed is not None and result['worstScheduleLag'] < args.chunk_ms / 1000
+        levels.append(result)
+
+        print(f'--- {n_patients} patients at {speed_name} ---')
+        print(f"{result['samples']:10d} samples in {result['wallSeconds']:.1f}s "
+              f"{result['samplesPerSecond']:12.0f} samples/s "
+              f"lag max={result['worstScheduleLag'] * 1000:.1f}ms "
+              f"chunk p95={result['worstChunkLatency'] * 1000:.1f}ms")
+
+        stages = {}
+        for report in result['reports']:
+            for stage, timing in report['stages'].items():
+                stages[stage] = stages.get(stage, 0.0) + timing['totalSeconds']
+        for stage, seconds in sorted(stages.items(), key=lambda item: -item[1]):
+            print(f'  {stage:22s} {seconds:8.2f}s')
+
+    # How many live patients the sustained throughput could absorb; only
+    # an unpaced replay measures what the pipeline can take
+    capacity = None
+    if args.speed is None:
+        patient_rate = levels[-1]['patientSamplesPerSecond']
+        capacity = max(int(level['samplesPerSecond'] / patient_rate) for level in levels)
+        print(f'Sustained throughput covers about {capacity} live patients '
+              f'at {patient_rate:.0f} samples/s each')
+    else:
+        kept_up = [level['patients'] for level in levels if level['keepsUp']]
+        if kept_up:
+            print(f'Kept up with the schedule at up to {max(kept_up)} patients at {speed_name}')
+        else:
+            print(f'Fell behind the schedule at every level at {speed_name}')
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(),
+            'patient': args.patient,
+            'speed': args.speed,
+            'chunkMs': args.chunk_ms,
+            'channels': sorted(recording)
+        },
+        'capacity': capacity,
+        'levels': levels
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"replay-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
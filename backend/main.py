@@ -4,6 +4,10 @@ import os
 from routes.health_data import health_data_bp
 from routes.llm_analysis import llm_analysis_bp
 from routes.google_fit import google_fit_bp
+from routes.metrics import metrics_bp
+from routes.ingest import ingest_bp
+from routes.jobs import jobs_bp
+from services.metrics import install_request_profiler
 
 app = Flask(__name__)
 CORS(app)
@@ -12,6 +16,12 @@ CORS(app)
 app.register_blueprint(health_data_bp, url_prefix='/api')
 app.register_blueprint(llm_analysis_bp, url_prefix='/api')
 app.register_blueprint(google_fit_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp, url_prefix='/api')
+app.register_blueprint(ingest_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
+
+# Opt-in sampling profiler (NEUROCARD_PROFILE_SAMPLE_RATE)
+install_request_profiler(app)
 
 @app.route('/api/status', methods=['GET'])
 def status():
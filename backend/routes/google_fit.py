@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from services.google_fit_service import GoogleFitService
+from services.metrics import timed
 
 google_fit_bp = Blueprint('google_fit', __name__)
 
@@ -81,7 +82,8 @@ def sync_google_fit():
     
     try:
         # Sync data from Google Fit
-        result = google_fit_service.sync_data(start_time, end_time)
+        with timed('google_fit_sync'):
+            result = google_fit_service.sync_data(start_time, end_time)
         
         return jsonify({
             'status': 'success',
@@ -1,9 +1,510 @@
-from flask import Blueprint, jsonify, request
-from services.eeg_ecg_conversion import convert_ecg_to_eeg
-from services.anomaly_detection import detect_anomalies
+import time
+import numpy as np
+from flask import Blueprint, jsonify, request, g, url_for
+from services.eeg_ecg_conversion import convert_ecg_to_eeg, EEG_BANDS
+from services.anomaly_detection import detect_anomalies, detect_eeg_array_anomalies, detector_signature
+from services.eeg_array import band_powers, BAND_RANGES
+from services.anomaly_store import get_anomaly_store, anomaly_timestamp_ms, SCOPE_ALL, SUMMARY_PERIODS
+from services.result_cache import result_cache, align_buckets
+from services.signal_store import get_signal_store, choose_resolution, RESOLUTION_NAMES
+from services.downsampling import downsample_rows, METHODS
+from utils.response_formats import make_data_response
+from services.metrics import timed, timed_stage, record_samples, record_cache
+from services.baselines import get_baseline_store, baseline_signature
+from services.ingestion import CHANNELS
+from services.summaries import get_summary, MAX_SUMMARY_BUCKETS
+from services.derived_signals import derived_signals, ecg_rows, eeg_rows
+from services.admission import admission, estimate_cost, client_key, Overloaded, SAMPLE_RATE
+from services.jobs import get_job_queue, JobLimitExceeded
 
 health_data_bp = Blueprint('health_data', __name__)
 
+# Windows ending at least this long ago no longer receive new data, so
+# their detection results can be stored and served again
+HISTORICAL_MARGIN_MS = 5 * 60 * 1000
+
+# Extra data fetched around each bucket so the detectors' edge handling
+# does not drop anomalies at bucket boundaries
+EDGE_PADDING_MS = 10 * 1000
+
+# Signal reads computed as background jobs are downsampled to at most this
+# many points, since their results are kept in memory until fetched
+JOB_MAX_POINTS = 100000
+
+def _client_id():
+    return client_key(request.remote_addr, request.headers.get('X-Client-Id'))
+
+def _admit(cost):
+    """
+    Charge the estimated cost of the current request to its client
+    
+    The budget is held until the request ends. Raises Overloaded, answered
+    with 429, if it cannot be admitted in time.
+    
+    Args:
+        cost (int): Estimated samples the request processes
+    """
+    g.admission_ticket = admission.acquire(_client_id(), cost)
+
+def _serve(kind, cost, func, *args, key=None, numeric=True):
+    """
+    Answer a request inline under admission control, or as a background job
+    
+    Requests priced above the hard limit are refused with 400. Those above
+    the inline limit are submitted as a job and answered with 202 and the
+    job, to be polled at the Location header. The rest are admitted against
+    their client's budget and computed inline.
+    
+    Args:
+        kind (str): Kind of work, for the job
+        cost (int): Estimated samples the request processes
+        func (callable): Computes the rows of the response
+        *args: Arguments to call it with
+        key (hashable, optional): Identifies the work, so duplicate jobs are merged
+        numeric (bool, optional): Whether the rows are numeric, for the response format
+    
+    Returns:
+        Response: The rows, the job or an error
+    """
+    if not admission.allowed(cost):
+        return jsonify({'error': f'The request covers about {cost} samples; at most '
+                                 f'{admission.max_request_cost} can be processed, narrow the window'}), 400
+    
+    if not admission.inline(cost):
+        job = get_job_queue().submit(kind, func, *args, key=key, client_id=_client_id())
+        response = jsonify(job.to_dict())
+        response.status_code = 202
+        response.headers['Location'] = url_for('jobs.get_job', job_id=job.id)
+        return response
+    
+    _admit(cost)
+    return make_data_response(func(*args), numeric=numeric)
+
+def _read_cost(start_time, end_time, recorded, resolution):
+    # Rollup tiers hold one row per resolution step; raw, derived and mock
+    # data every sample
+    return estimate_cost(start_time, end_time, 1000 / resolution if recorded and resolution else SAMPLE_RATE)
+
+def _plan_read(start_time, end_time, recorded, max_points, resolution):
+    """
+    Price a signal read by what it reads, bounding reads too large to run inline
+    
+    Background results stay in memory until fetched, so reads that run as
+    jobs are downsampled to at most JOB_MAX_POINTS, and recorded data is
+    read from a tier coarse enough for that many points instead of from
+    finer rows that would only be downsampled away.
+    
+    Args:
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+        recorded (bool): Whether the patient has recorded samples in the window
+        max_points (int): Maximum number of points, or None
+        resolution (int): Rollup resolution in milliseconds, or None for raw samples
+    
+    Returns:
+        tuple: (cost, max_points, resolution)
+    """
+    cost = _read_cost(start_time, end_time, recorded, resolution)
+    if admission.inline(cost):
+        return cost, max_points, resolution
+    
+    max_points = min(max_points, JOB_MAX_POINTS) if max_points is not None else JOB_MAX_POINTS
+    if recorded:
+        job_resolution = choose_resolution(start_time, end_time, max_points)
+        if job_resolution is not None and (resolution is None or job_resolution > resolution):
+            resolution = job_resolution
+            cost = _read_cost(start_time, end_time, recorded, resolution)
+    
+    return cost, max_points, resolution
+
+@health_data_bp.teardown_request
+def _release_admission(exc):
+    admission.release(g.pop('admission_ticket', None))
+
+@health_data_bp.errorhandler(Overloaded)
+@health_data_bp.errorhandler(JobLimitExceeded)
+def _overloaded(error):
+    response = jsonify({'error': str(error)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@timed_stage('convert_ecg_to_eeg')
+def _convert_rows(ecg_data):
+    record_samples('convert_ecg_to_eeg', len(ecg_data))
+    
+    # Convert ECG to EEG using our transformation model
+    eeg_data = []
+    for ecg_point in ecg_data:
+        eeg_values = convert_ecg_to_eeg(ecg_point['value'])
+        eeg_data.append({
+            'timestamp': ecg_point['timestamp'],
+            **eeg_values
+        })
+    return eeg_data
+
+def _run_detection(patient_id, start_time, end_time, scope, baselines=None):
+    """
+    Fetch the ECG and EEG of a window and run anomaly detection over it
+    
+    Args:
+        patient_id (str): The patient
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+        scope (str): Detection scope ('all', 'ECG' or 'EEG')
+        baselines (dict, optional): Patient baselines per channel
+    
+    Returns:
+        list: List of detected anomalies
+    """
+    if start_time is not None and end_time is not None:
+        # The ECG and EEG bands are shared with the EEG view of the window
+        ecg_timestamps, values, eeg_timestamps, bands = derived_signals.get_window(patient_id, start_time, end_time)
+        ecg_data = ecg_rows(ecg_timestamps, values)
+        eeg_data = eeg_rows(eeg_timestamps, bands) if scope != 'ECG' else None
+    else:
+        # In a real application, this would fetch ECG and EEG data from a database
+        # For now, we'll generate mock data
+        from utils.signal_processing import generate_mock_ecg_data
+        
+        with timed('fetch'):
+            ecg_data = generate_mock_ecg_data(start_time, end_time)
+        record_samples('fetch', len(ecg_data))
+        eeg_data = _convert_rows(ecg_data) if scope != 'ECG' else None
+    
+    if scope == 'ECG':
+        return detect_anomalies(ecg_data, None, type='ECG', baselines=baselines)
+    
+    if scope == 'EEG':
+        return detect_anomalies(None, eeg_data, type='EEG', baselines=baselines)
+    
+    return detect_anomalies(ecg_data, eeg_data, baselines=baselines)
+
+def _result_signature(patient_id):
+    """
+    Get the baselines of a patient and the signature results detected with them carry
+    
+    Args:
+        patient_id (str): The patient
+    
+    Returns:
+        tuple: (baselines, signature)
+    """
+    baselines = get_baseline_store().profiles(patient_id, CHANNELS)
+    signature = detector_signature()
+    if baselines:
+        # Results thresholded against a baseline are only valid while that
+        # baseline is in effect
+        signature += ':baseline:' + baseline_signature(baselines)
+    return baselines, signature
+
+def _detection_range(bucket_start, bucket_end, start_time, end_time, now_ms):
+    # Settled buckets are detected whole so they can be reused; live
+    # ones only over the requested part up to now
+    if bucket_end <= now_ms - HISTORICAL_MARGIN_MS:
+        return bucket_start, bucket_end
+    return max(bucket_start, start_time), min(bucket_end, end_time, now_ms)
+
+def _detection_cost(patient_id, start_time, end_time, scope):
+    """
+    Estimate the samples detection reads to answer an anomaly request
+    
+    Detection reads the range of every bucket it computes plus padding on
+    both sides; buckets whose results are cached or stored are free.
+    
+    Args:
+        patient_id (str): The patient
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+        scope (str): Detection scope ('all', 'ECG' or 'EEG')
+    
+    Returns:
+        int: Estimated samples
+    """
+    store = get_anomaly_store()
+    _, signature = _result_signature(patient_id)
+    now_ms = int(time.time() * 1000)
+    scopes = (SCOPE_ALL,) if scope == SCOPE_ALL else (scope, SCOPE_ALL)
+    
+    detected_ms = 0
+    for bucket_start in align_buckets(start_time, end_time, result_cache.bucket_ms):
+        bucket_end = bucket_start + result_cache.bucket_ms
+        detect_start, detect_end = _detection_range(bucket_start, bucket_end, start_time, end_time, now_ms)
+        
+        if detect_start >= detect_end:
+            continue
+        if (detect_start, detect_end) == (bucket_start, bucket_end) and (
+                result_cache.contains(patient_id, bucket_start, scope, signature)
+                or store.is_covered(patient_id, bucket_start, bucket_end, signature, scopes=scopes)):
+            continue
+        detected_ms += detect_end - detect_start + 2 * EDGE_PADDING_MS
+    
+    return estimate_cost(0, detected_ms)
+
+def _detect_bucketed(patient_id, start_time, end_time, scope):
+    """
+    Get anomalies for a window by stitching together per-bucket results
+    
+    The window is aligned to fixed buckets. Each bucket is served from the
+    result cache, then from the anomaly store, and only computed when
+    neither has it. Buckets that can still receive data are never cached;
+    they are recomputed on every request, but only over the requested part
+    that has already happened, so live polls stay proportional to their
+    window and nothing is stored ahead of the present.
+    
+    Args:
+        patient_id (str): The patient
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+        scope (str): Detection scope ('all', 'ECG' or 'EEG')
+    
+    Returns:
+        list: Anomalies inside the window, ordered by timestamp
+    """
+    store = get_anomaly_store()
+    baselines, signature = _result_signature(patient_id)
+    now_ms = int(time.time() * 1000)
+    settled_before = now_ms - HISTORICAL_MARGIN_MS
+    scopes = (SCOPE_ALL,) if scope == SCOPE_ALL else (scope, SCOPE_ALL)
+    type_filter = None if scope == SCOPE_ALL else scope
+    
+    anomalies = []
+    for bucket_start in align_buckets(start_time, end_time, result_cache.bucket_ms):
+        bucket_end = bucket_start + result_cache.bucket_ms
+        settled = bucket_end <= settled_before
+        
+        bucket = result_cache.get(patient_id, bucket_start, scope, signature) if settled else None
+        
+        if bucket is None:
+            covered = settled and store.is_covered(patient_id, bucket_start, bucket_end, signature, scopes=scopes)
+            record_cache('anomaly_store', covered)
+            
+            detect_start, detect_end = _detection_range(bucket_start, bucket_end, start_time, end_time, now_ms)
+            
+            if covered:
+                detected = store.query(patient_id, bucket_start, bucket_end, type=type_filter)
+            elif detect_start >= detect_end:
+                detected = []
+            else:
+                detected = [
+                    anomaly for anomaly in _run_detection(
+                        patient_id, detect_start - EDGE_PADDING_MS, detect_end + EDGE_PADDING_MS, scope, baselines)
+                    if detect_start <= anomaly_timestamp_ms(anomaly) < detect_end
+                ]
+                store.replace_window(patient_id, detect_start, detect_end, detected, scope=scope,
+                                     version=signature if settled else None)
+            
+            bucket = sorted(
+                ((anomaly_timestamp_ms(anomaly), anomaly) for anomaly in detected),
+                key=lambda item: item[0]
+            )
+            if settled:
+                result_cache.put(patient_id, bucket_start, scope, signature, bucket)
+        
+        anomalies.extend(anomaly for timestamp, anomaly in bucket if start_time <= timestamp < end_time)
+    
+    return anomalies
+
+def _get_anomalies(scope):
+    start_time = request.args.get('startTime', type=int)
+    end_time = request.args.get('endTime', type=int)
+    patient_id = request.args.get('patientId', 'default')
+    
+    if start_time is not None and end_time is not None:
+        return _serve('anomalies', _detection_cost(patient_id, start_time, end_time, scope), _detect_bucketed,
+                      patient_id, start_time, end_time, scope,
+                      key=('anomalies', patient_id, start_time, end_time, scope), numeric=False)
+    
+    # Without an explicit window there is nothing to align, so run detection directly
+    anomalies = _run_detection(patient_id, start_time, end_time, scope,
+                               get_baseline_store().profiles(patient_id, CHANNELS))
+    
+    # Persist anomalies so they can be looked up by ID later
+    get_anomaly_store().add(patient_id, anomalies)
+    
+    return make_data_response(anomalies, numeric=False)
+
+def _parse_downsampling():
+    """
+    Read the downsampling query parameters of a signal request
+    
+    Returns:
+        tuple: (options, error) where options is (max_points, resolution, method),
+            or None with an error message if a parameter is invalid
+    """
+    max_points = request.args.get('maxPoints', type=int)
+    resolution_name = request.args.get('resolution')
+    method = request.args.get('downsample', 'lttb')
+    
+    if max_points is not None and max_points < 3:
+        return None, 'maxPoints must be at least 3'
+    if resolution_name is not None and resolution_name not in RESOLUTION_NAMES:
+        return None, f"resolution must be one of: {', '.join(RESOLUTION_NAMES)}"
+    if method not in METHODS:
+        return None, f"downsample must be one of: {', '.join(METHODS)}"
+    
+    start_time = request.args.get('startTime', type=int)
+    end_time = request.args.get('endTime', type=int)
+    
+    # An explicit resolution wins; otherwise pick a tier that fits maxPoints
+    if resolution_name is not None:
+        resolution = RESOLUTION_NAMES[resolution_name]
+    elif max_points is not None and start_time is not None and end_time is not None:
+        resolution = choose_resolution(start_time, end_time, max_points)
+    else:
+        resolution = None
+    
+    return (max_points, resolution, method), None
+
+@timed_stage('fetch')
+def _rollup_rows(store, patient_id, channels, fields, resolution, start_time, end_time):
+    """
+    Build data points from a pre-aggregated tier of the signal store
+    
+    Each field holds the bucket mean, with the bucket envelope in
+    '<field>Min' and '<field>Max'.
+    
+    Args:
+        store (SignalStore): The signal store
+        patient_id (str): The patient
+        channels (list): Store channels to read
+        fields (list): Output field name for each channel
+        resolution (int): The tier in milliseconds
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+    
+    Returns:
+        list: Data points ordered by timestamp
+    """
+    tiers = [store.read_rollup(patient_id, channel, resolution, start_time, end_time) for channel in channels]
+    
+    # Only keep buckets present in every channel
+    timestamps = tiers[0]['timestamp']
+    for tier in tiers[1:]:
+        timestamps = np.intersect1d(timestamps, tier['timestamp'])
+    
+    rows = [{'timestamp': timestamp} for timestamp in timestamps.tolist()]
+    for field, tier in zip(fields, tiers):
+        positions = np.searchsorted(tier['timestamp'], timestamps)
+        for key, suffix in (('mean', ''), ('min', 'Min'), ('max', 'Max')):
+            for row, value in zip(rows, tier[key][positions].tolist()):
+                row[field + suffix] = value
+    
+    return rows
+
+@timed_stage('fetch')
+def _raw_rows(store, patient_id, channels, fields, start_time, end_time):
+    """
+    Build data points from raw samples of the signal store
+    
+    Args:
+        store (SignalStore): The signal store
+        patient_id (str): The patient
+        channels (list): Store channels to read
+        fields (list): Output field name for each channel
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+    
+    Returns:
+        list: Data points ordered by timestamp
+    """
+    series = [store.read(patient_id, channel, start_time, end_time) for channel in channels]
+    
+    timestamps = series[0][0]
+    for channel_timestamps, _ in series[1:]:
+        timestamps = np.intersect1d(timestamps, channel_timestamps)
+    
+    rows = [{'timestamp': timestamp} for timestamp in timestamps.tolist()]
+    for field, (channel_timestamps, values) in zip(fields, series):
+        positions = np.searchsorted(channel_timestamps, timestamps)
+        for row, value in zip(rows, values[positions].tolist()):
+            row[field] = value
+    
+    return rows
+
+def _read_ecg(patient_id, start_time, end_time, recorded, max_points, resolution, method):
+    """
+    Read the ECG of a window, downsampled as requested
+    
+    Args:
+        patient_id (str): The patient
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+        recorded (bool): Whether the patient has recorded ECG in the window
+        max_points (int): Maximum number of points, or None
+        resolution (int): Rollup resolution in milliseconds, or None for raw samples
+        method (str): Downsampling method
+    
+    Returns:
+        list: ECG data points
+    """
+    store = get_signal_store()
+    if recorded:
+        # Wide windows are read from a pre-aggregated tier
+        if resolution is not None:
+            ecg_data = _rollup_rows(store, patient_id, ['ecg'], ['value'], resolution, start_time, end_time)
+        else:
+            ecg_data = _raw_rows(store, patient_id, ['ecg'], ['value'], start_time, end_time)
+    else:
+        # Without recorded data, we'll generate mock data
+        from utils.signal_processing import generate_mock_ecg_data
+        
+        with timed('fetch'):
+            ecg_data = generate_mock_ecg_data(start_time, end_time)
+    
+    if max_points is not None:
+        with timed('downsample'):
+            ecg_data = downsample_rows(ecg_data, ['value'], max_points, method)
+    
+    return ecg_data
+
+def _read_eeg(patient_id, start_time, end_time, recorded, max_points, resolution, method):
+    """
+    Read the EEG of a window, downsampled as requested
+    
+    Args:
+        patient_id (str): The patient
+        start_time (int): Start of the window in milliseconds
+        end_time (int): End of the window in milliseconds
+        recorded (bool): Whether the patient has recorded EEG bands in the window
+        max_points (int): Maximum number of points, or None
+        resolution (int): Rollup resolution in milliseconds, or None for raw samples
+        method (str): Downsampling method
+    
+    Returns:
+        list: EEG data points
+    """
+    store = get_signal_store()
+    bands = list(EEG_BANDS)
+    if recorded:
+        # Recorded EEG; wide windows are read from a pre-aggregated tier
+        if resolution is not None:
+            eeg_data = _rollup_rows(store, patient_id, bands, bands, resolution, start_time, end_time)
+        else:
+            eeg_data = _raw_rows(store, patient_id, bands, bands, start_time, end_time)
+    elif start_time is not None and end_time is not None:
+        # Derive EEG from the recorded ECG, or from mock data without any;
+        # the conversion is shared with the anomaly views of the window
+        _, _, timestamps, eeg_bands = derived_signals.get_window(patient_id, start_time, end_time)
+        eeg_data = eeg_rows(timestamps, eeg_bands)
+    elif store.has_data(patient_id, 'ecg', start_time, end_time):
+        # Recorded ECG only; convert the raw samples to EEG
+        ecg_data = _raw_rows(store, patient_id, ['ecg'], ['value'], start_time, end_time)
+        eeg_data = _convert_rows(ecg_data)
+    else:
+        # Without recorded data, we'll generate mock data and then convert from ECG
+        from utils.signal_processing import generate_mock_ecg_data
+        
+        with timed('fetch'):
+            ecg_data = generate_mock_ecg_data(start_time, end_time)
+        eeg_data = _convert_rows(ecg_data)
+    
+    if max_points is not None:
+        with timed('downsample'):
+            eeg_data = downsample_rows(eeg_data, bands, max_points, method)
+    
+    return eeg_data
+
 @health_data_bp.route('/ecg', methods=['GET'])
 def get_ecg_data():
     """
@@ -11,17 +512,31 @@ def get_ecg_data():
     Query parameters:
     - startTime: timestamp in milliseconds
     - endTime: timestamp in milliseconds
+    - patientId: patient identifier (optional)
+    - maxPoints: maximum number of points to return (optional)
+    - resolution: 'raw', '1s', '1m', '1h' or '1d' (optional, chosen from maxPoints by default)
+    - downsample: 'lttb' or 'minmax' (optional, defaults to 'lttb')
+    - format: 'json', 'columnar', 'binary' or 'arrow' (optional, Accept header otherwise)
+    
+    Windows too large to read inline are read as a background job, downsampled
+    to at most JOB_MAX_POINTS from a rollup tier that fits them: the response
+    is 202 with the job, to be polled at the Location header. Windows beyond
+    the request limit are refused with 400.
     """
     start_time = request.args.get('startTime', type=int)
     end_time = request.args.get('endTime', type=int)
+    patient_id = request.args.get('patientId', 'default')
     
-    # In a real application, this would fetch data from a database
-    # For now, we'll generate mock data
-    from utils.signal_processing import generate_mock_ecg_data
+    options, error = _parse_downsampling()
+    if error:
+        return jsonify({'error': error}), 400
+    max_points, resolution, method = options
     
-    ecg_data = generate_mock_ecg_data(start_time, end_time)
+    recorded = get_signal_store().has_data(patient_id, 'ecg', start_time, end_time)
+    cost, max_points, resolution = _plan_read(start_time, end_time, recorded, max_points, resolution)
     
-    return jsonify(ecg_data)
+    return _serve('ecg', cost, _read_ecg, patient_id, start_time, end_time, recorded, max_points, resolution, method,
+                  key=('ecg', patient_id, start_time, end_time, max_points, resolution, method))
 
 @health_data_bp.route('/eeg', methods=['GET'])
 def get_eeg_data():
@@ -30,26 +545,31 @@ def get_eeg_data():
     Query parameters:
     - startTime: timestamp in milliseconds
     - endTime: timestamp in milliseconds
+    - patientId: patient identifier (optional)
+    - maxPoints: maximum number of points to return (optional)
+    - resolution: 'raw', '1s', '1m', '1h' or '1d' (optional, chosen from maxPoints by default)
+    - downsample: 'lttb' or 'minmax' (optional, defaults to 'lttb')
+    - format: 'json', 'columnar', 'binary' or 'arrow' (optional, Accept header otherwise)
+    
+    Windows too large to read inline are read as a background job, downsampled
+    to at most JOB_MAX_POINTS from a rollup tier that fits them: the response
+    is 202 with the job, to be polled at the Location header. Windows beyond
+    the request limit are refused with 400.
     """
     start_time = request.args.get('startTime', type=int)
     end_time = request.args.get('endTime', type=int)
+    patient_id = request.args.get('patientId', 'default')
     
-    # In a real application, this would fetch data from a database
-    # For now, we'll generate mock data and then convert from ECG
-    from utils.signal_processing import generate_mock_ecg_data
+    options, error = _parse_downsampling()
+    if error:
+        return jsonify({'error': error}), 400
+    max_points, resolution, method = options
     
-    ecg_data = generate_mock_ecg_data(start_time, end_time)
+    recorded = get_signal_store().has_data(patient_id, EEG_BANDS[0], start_time, end_time)
+    cost, max_points, resolution = _plan_read(start_time, end_time, recorded, max_points, resolution)
     
-    # Convert ECG to EEG using our transformation model
-    eeg_data = []
-    for ecg_point in ecg_data:
-        eeg_values = convert_ecg_to_eeg(ecg_point['value'])
-        eeg_data.append({
-            'timestamp': ecg_point['timestamp'],
-            **eeg_values
-        })
-    
-    return jsonify(eeg_data)
+    return _serve('eeg', cost, _read_eeg, patient_id, start_time, end_time, recorded, max_points, resolution, method,
+                  key=('eeg', patient_id, start_time, end_time, max_points, resolution, method))
 
 @health_data_bp.route('/anomalies', methods=['GET'])
 def get_anomalies():
@@ -58,29 +578,14 @@ def get_anomalies():
     Query parameters:
     - startTime: timestamp in milliseconds
     - endTime: timestamp in milliseconds
-    """
-    start_time = request.args.get('startTime', type=int)
-    end_time = request.args.get('endTime', type=int)
-    
-    # In a real application, this would fetch ECG and EEG data and run anomaly detection
-    # For now, we'll generate mock data
-    from utils.signal_processing import generate_mock_ecg_data
-    
-    ecg_data = generate_mock_ecg_data(start_time, end_time)
-    
-    # Convert ECG to EEG
-    eeg_data = []
-    for ecg_point in ecg_data:
-        eeg_values = convert_ecg_to_eeg(ecg_point['value'])
-        eeg_data.append({
-            'timestamp': ecg_point['timestamp'],
-            **eeg_values
-        })
+    - patientId: patient identifier (optional)
+    - format: 'json' or 'columnar' (optional, Accept header otherwise)
     
-    # Detect anomalies
-    anomalies = detect_anomalies(ecg_data, eeg_data)
-    
-    return jsonify(anomalies)
+    Windows too large to answer inline are detected as a background job: the
+    response is 202 with the job, to be polled at the Location header.
+    Windows beyond the request limit are refused with 400.
+    """
+    return _get_anomalies(SCOPE_ALL)
 
 @health_data_bp.route('/ecg/anomalies', methods=['GET'])
 def get_ecg_anomalies():
@@ -89,20 +594,10 @@ def get_ecg_anomalies():
     Query parameters:
     - startTime: timestamp in milliseconds
     - endTime: timestamp in milliseconds
+    - patientId: patient identifier (optional)
+    - format: 'json' or 'columnar' (optional, Accept header otherwise)
     """
-    start_time = request.args.get('startTime', type=int)
-    end_time = request.args.get('endTime', type=int)
-    
-    # In a real application, this would fetch ECG data and run anomaly detection
-    # For now, we'll generate mock data
-    from utils.signal_processing import generate_mock_ecg_data
-    
-    ecg_data = generate_mock_ecg_data(start_time, end_time)
-    
-    # Detect ECG anomalies
-    anomalies = detect_anomalies(ecg_data, None, type='ECG')
-    
-    return jsonify(anomalies)
+    return _get_anomalies('ECG')
 
 @health_data_bp.route('/eeg/anomalies', methods=['GET'])
 def get_eeg_anomalies():
@@ -111,26 +606,98 @@ def get_eeg_anomalies():
     Query parameters:
     - startTime: timestamp in milliseconds
     - endTime: timestamp in milliseconds
+    - patientId: patient identifier (optional)
+    - format: 'json' or 'columnar' (optional, Accept header otherwise)
     """
-    start_time = request.args.get('startTime', type=int)
-    end_time = request.args.get('endTime', type=int)
+    return _get_anomalies('EEG')
+
+@health_data_bp.route('/summary', methods=['GET'])
+def get_health_summary():
+    """
+    Get hourly or daily health summaries from the materialized rollups
+    Query parameters:
+    - patientId: patient identifier (optional)
+    - period: 'hour' or 'day' (optional, default 'hour')
+    - startTime: timestamp in milliseconds (optional, default 24 periods before endTime)
+    - endTime: timestamp in milliseconds (optional, default now)
     
-    # In a real application, this would fetch EEG data and run anomaly detection
-    # For now, we'll generate mock ECG data and convert to EEG
-    from utils.signal_processing import generate_mock_ecg_data
+    Each summary holds anomaly counts by type and severity, and the mean,
+    minimum and maximum heart rate and band power of its period.
+    """
+    patient_id = request.args.get('patientId', 'default')
+    period = request.args.get('period', 'hour')
     
-    ecg_data = generate_mock_ecg_data(start_time, end_time)
+    if period not in SUMMARY_PERIODS:
+        return jsonify({'error': f"period must be one of: {', '.join(SUMMARY_PERIODS)}"}), 400
     
-    # Convert ECG to EEG
-    eeg_data = []
-    for ecg_point in ecg_data:
-        eeg_values = convert_ecg_to_eeg(ecg_point['value'])
-        eeg_data.append({
-            'timestamp': ecg_point['timestamp'],
-            **eeg_values
-        })
+    period_ms = SUMMARY_PERIODS[period]
+    end_time = request.args.get('endTime', int(time.time() * 1000), type=int)
+    start_time = request.args.get('startTime', end_time - 24 * period_ms, type=int)
+    
+    if end_time <= start_time:
+        return jsonify({'error': 'endTime must be after startTime'}), 400
+    if (end_time - start_time) / period_ms > MAX_SUMMARY_BUCKETS:
+        return jsonify({'error': f'At most {MAX_SUMMARY_BUCKETS} {period}s can be summarized at once'}), 400
+    
+    return jsonify({
+        'patientId': patient_id,
+        'period': period,
+        'summaries': get_summary(patient_id, period, start_time, end_time)
+    })
+
+def _detect_multichannel(samples, sample_rate, start_time, channels, window_samples, bands):
+    eeg = band_powers(samples, sample_rate, start_time, channels, window_samples, bands)
+    record_samples('band_powers', samples.size)
+    return detect_eeg_array_anomalies(eeg)
+
+@health_data_bp.route('/eeg/multichannel/anomalies', methods=['POST'])
+def detect_multichannel_eeg_anomalies():
+    """
+    Detect anomalies in a raw multi-channel EEG recording
+    Request body (JSON):
+    - channels: channel names, e.g. ["Fp1", "Fp2", "Cz"]
+    - samples: one array of raw samples per channel, all of the same length
+    - sampleRate: samples per second
+    - startTime: timestamp of the first sample in milliseconds
+    - windowSeconds: length of the band power windows (optional, default 1)
+    - bands: frequency range per band in Hz, e.g. {"alpha": [8, 13]} (optional)
+    
+    Band powers are computed for every channel and window, and detection runs
+    over all channels and bands at once. Each anomaly names the channel and
+    band that triggered it. Recordings too large to process inline are
+    processed as a background job and answered with 202.
+    """
+    data = request.get_json(silent=True) or {}
+    channels = data.get('channels')
+    sample_rate = data.get('sampleRate')
+    start_time = data.get('startTime')
+    window_seconds = data.get('windowSeconds', 1)
+    bands = data.get('bands') or BAND_RANGES
+    
+    if not channels or 'samples' not in data or sample_rate is None or start_time is None:
+        return jsonify({'error': 'channels, samples, sampleRate and startTime are required'}), 400
+    
+    if not isinstance(bands, dict):
+        return jsonify({'error': 'bands must map band names to [low, high] ranges'}), 400
+    
+    try:
+        samples = np.asarray(data['samples'], dtype=np.float64)
+        sample_rate = float(sample_rate)
+        start_time = int(start_time)
+        bands = {band: (float(low), float(high)) for band, (low, high) in bands.items()}
+        window_samples = int(round(float(window_seconds) * sample_rate))
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'samples, bands, sampleRate, startTime and windowSeconds must be numeric'}), 400
+    
+    if not sample_rate > 0:
+        return jsonify({'error': 'sampleRate must be positive'}), 400
     
-    # Detect EEG anomalies
-    anomalies = detect_anomalies(None, eeg_data, type='EEG')
+    if samples.ndim != 2 or samples.shape[0] != len(channels):
+        return jsonify({'error': 'samples must hold one equally long array per channel'}), 400
+    if window_samples < 2:
+        return jsonify({'error': 'windowSeconds must cover at least two samples'}), 400
+    if any(not 0 <= low < high <= sample_rate / 2 for low, high in bands.values()):
+        return jsonify({'error': 'band ranges must be increasing and within half the sample rate'}), 400
     
-    return jsonify(anomalies)
\ No newline at end of file
+    return _serve('eeg_multichannel', samples.size, _detect_multichannel,
+                  samples, sample_rate, start_time, channels, window_samples, bands, numeric=False)
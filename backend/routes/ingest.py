@@ -0,0 +1,131 @@
+import json
+import numpy as np
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from services.ingestion import BatchWriter, IngestionError, ingest_batch, INGEST_BATCH_SIZE
+from services.live_feed import live_feed
+
+ingest_bp = Blueprint('ingest', __name__)
+
+# Highest sample rate the millisecond timestamps of the signal store can hold
+MAX_SAMPLE_RATE = 1000
+
+# Bytes read from the request body at a time
+READ_CHUNK_BYTES = 1 << 20
+
+@ingest_bp.route('/ingest/<patient_id>', methods=['POST'])
+def ingest_ndjson(patient_id):
+    """
+    Ingest samples from a newline-delimited JSON stream
+    Request body (application/x-ndjson), one object per line, either a
+    single sample or a block of samples for one channel:
+    {"channel": string, "timestamp": number, "value": number}
+    {"channel": string, "timestamps": number[], "values": number[]}
+
+    Channels are 'ecg' and the EEG bands. The body is read incrementally,
+    so it may be sent with chunked transfer encoding.
+    """
+    writer = BatchWriter(patient_id)
+    line_number = 0
+
+    try:
+        for line in request.stream:
+            line_number += 1
+            line = line.strip()
+            if not line:
+                continue
+
+            record = json.loads(line)
+            if 'timestamps' in record:
+                writer.add(record['channel'], record['timestamps'], record['values'])
+            else:
+                writer.add(record['channel'], [record['timestamp']], [record['value']])
+
+        writer.flush()
+    except (ValueError, KeyError, TypeError) as e:
+        # Everything flushed before the bad line has been written
+        message = str(e) if isinstance(e, IngestionError) else f'Invalid record: {e}'
+        return jsonify({
+            'error': f'Line {line_number}: {message}',
+            'samples': writer.samples,
+            'anomalies': writer.anomalies
+        }), 400
+
+    return jsonify({
+        'status': 'success',
+        'samples': writer.samples,
+        'anomalies': writer.anomalies
+    })
+
+@ingest_bp.route('/ingest/<patient_id>/<channel>', methods=['POST'])
+def ingest_binary(patient_id, channel):
+    """
+    Ingest a block of evenly spaced samples for one channel
+    Query parameters:
+    - startTime: timestamp of the first sample in milliseconds
+    - sampleRate: samples per second (at most 1000)
+    Request body (application/octet-stream): little-endian float32 values
+
+    The body is read in chunks and written in large batches, so it may be
+    sent with chunked transfer encoding.
+    """
+    start_time = request.args.get('startTime', type=int)
+    sample_rate = request.args.get('sampleRate', type=float)
+
+    if start_time is None or sample_rate is None:
+        return jsonify({'error': 'startTime and sampleRate are required'}), 400
+    if not 0 < sample_rate <= MAX_SAMPLE_RATE:
+        return jsonify({'error': f'sampleRate must be between 0 and {MAX_SAMPLE_RATE}'}), 400
+
+    samples = 0
+    anomalies = 0
+    pending = b''
+    batch_bytes = INGEST_BATCH_SIZE * 4
+
+    try:
+        while True:
+            chunk = request.stream.read(READ_CHUNK_BYTES)
+            if chunk:
+                pending += chunk
+
+            # Write whole batches while reading, and whatever is left at the end
+            while len(pending) >= batch_bytes or (not chunk and len(pending) >= 4):
+                usable = min(batch_bytes, len(pending) - len(pending) % 4)
+                values = np.frombuffer(pending[:usable], dtype='<f4')
+                timestamps = start_time + np.round(
+                    (samples + np.arange(len(values))) * 1000 / sample_rate).astype(np.int64)
+                result = ingest_batch(patient_id, channel, timestamps, values)
+                samples += result['samples']
+                anomalies += result['anomalies']
+                pending = pending[usable:]
+
+            if not chunk:
+                break
+    except IngestionError as e:
+        return jsonify({'error': str(e), 'samples': samples, 'anomalies': anomalies}), 400
+
+    if pending:
+        return jsonify({
+            'error': 'Body length is not a multiple of 4 bytes',
+            'samples': samples,
+            'anomalies': anomalies
+        }), 400
+
+    return jsonify({
+        'status': 'success',
+        'samples': samples,
+        'anomalies': anomalies
+    })
+
+@ingest_bp.route('/stream/<patient_id>', methods=['GET'])
+def stream_live(patient_id):
+    """
+    Stream a patient's newly ingested samples and anomalies as server-sent events
+    Events:
+    - samples: {"channel": string, "timestamps": number[], "values": number[]}
+    - anomaly: {"anomaly": object}
+    """
+    return Response(
+        stream_with_context(live_feed.stream(patient_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from services.jobs import get_job_queue
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the status of a background job, with its result once it is done
+    
+    Finished jobs are kept for a limited time; older ones are no longer found.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict())
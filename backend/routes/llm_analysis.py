@@ -1,18 +1,25 @@
 from flask import Blueprint, jsonify, request
 import os
+import time
 from services.llm_service import LLMService
+from services.anomaly_store import get_anomaly_store, SUMMARY_PERIODS
+from services.summaries import get_summary
 
 llm_analysis_bp = Blueprint('llm_analysis', __name__)
 
 # Initialize LLM service
 llm_service = LLMService()
 
+# Days of daily summaries included in recommendation prompts
+SUMMARY_DAYS = 7
+
 @llm_analysis_bp.route('/llm/recommendations', methods=['POST'])
 def get_health_recommendations():
     """
     Get health recommendations based on health data
     Request body:
     {
+        "patientId": string (optional, adds daily summaries to the prompt),
         "ecgData": [...],
         "eegData": [...],
         "anomalies": [...],
@@ -30,8 +37,15 @@ def get_health_recommendations():
         return jsonify({'error': 'No data provided'}), 400
     
     try:
+        # Pull the recent daily summaries instead of relying on raw series
+        summaries = None
+        if data.get('patientId'):
+            now_ms = int(time.time() * 1000)
+            summaries = get_summary(data['patientId'], 'day',
+                                    now_ms - SUMMARY_DAYS * SUMMARY_PERIODS['day'], now_ms)
+        
         # Get recommendations from LLM
-        recommendations = llm_service.generate_health_recommendations(data)
+        recommendations = llm_service.generate_health_recommendations(data, summaries)
         
         return jsonify({
             'recommendations': recommendations
@@ -46,11 +60,8 @@ def get_anomaly_analysis(anomaly_id):
     Path parameters:
     - anomaly_id: ID of the anomaly to analyze
     """
-    # In a real application, this would fetch the anomaly from a database
-    # For now, we'll generate a mock anomaly
-    from utils.signal_processing import generate_mock_anomaly
-    
-    anomaly = generate_mock_anomaly(anomaly_id)
+    # Look up the anomaly in the local anomaly store
+    anomaly = get_anomaly_store().get(anomaly_id)
     
     if not anomaly:
         return jsonify({'error': 'Anomaly not found'}), 404
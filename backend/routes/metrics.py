@@ -0,0 +1,23 @@
+from flask import Blueprint, Response, jsonify
+from services.metrics import registry, profiler
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Get processing metrics in the Prometheus text exposition format
+    """
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@metrics_bp.route('/metrics/profiles', methods=['GET'])
+def get_profiles():
+    """
+    Get the most recent request profiles
+    
+    Profiling is opt-in through NEUROCARD_PROFILE_SAMPLE_RATE.
+    """
+    if not profiler.enabled:
+        return jsonify({'error': 'Request profiling is disabled'}), 404
+    
+    return jsonify(list(profiler.profiles))
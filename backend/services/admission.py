@@ -0,0 +1,236 @@
+import os
+import math
+import time
+import threading
+from typing import Optional
+
+from services.metrics import registry
+
+# Nominal samples per second of a signal channel, used to price a window
+SAMPLE_RATE = int(os.environ.get('ADMISSION_SAMPLE_RATE', 250))
+
+# Requests at or below this cost (samples) skip the budgets: about a minute of signal
+CHEAP_COST = int(os.environ.get('ADMISSION_CHEAP_COST', SAMPLE_RATE * 60))
+
+# Samples in flight across all clients, and per client: about four hours and one hour of signal
+GLOBAL_BUDGET = int(os.environ.get('ADMISSION_GLOBAL_BUDGET', SAMPLE_RATE * 4 * 3600))
+CLIENT_BUDGET = int(os.environ.get('ADMISSION_CLIENT_BUDGET', SAMPLE_RATE * 3600))
+
+# Windows priced above this are computed as background jobs instead of inline...
+MAX_INLINE_COST = int(os.environ.get('ADMISSION_MAX_INLINE_COST', CLIENT_BUDGET))
+
+# ...and windows priced above this are refused outright: about a day of signal
+MAX_REQUEST_COST = int(os.environ.get('ADMISSION_MAX_REQUEST_COST', SAMPLE_RATE * 86400))
+
+# Proxies trusted to name the client they forward for in X-Client-Id;
+# everyone else is budgeted by address
+TRUSTED_PROXIES = frozenset(
+    address.strip() for address in os.environ.get('ADMISSION_TRUSTED_PROXIES', '').split(',') if address.strip()
+)
+
+# How long a request may wait for budget, and how many may wait at once
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 2.0))
+MAX_QUEUED = int(os.environ.get('ADMISSION_MAX_QUEUED', 32))
+
+admission_decisions = registry.counter(
+    'neurocard_admission_decisions_total', 'Admission decisions by outcome', ['decision'])
+admission_wait = registry.histogram(
+    'neurocard_admission_wait_seconds', 'Time requests waited for budget')
+
+
+def estimate_cost(start_ms: Optional[int], end_ms: Optional[int], sample_rate: float = SAMPLE_RATE) -> int:
+    """
+    Estimate the work of a request on a window as the number of samples it covers
+
+    Args:
+        start_ms (int, optional): Start of the window in milliseconds
+        end_ms (int, optional): End of the window in milliseconds
+        sample_rate (float, optional): Samples per second read for the window
+
+    Returns:
+        int: Estimated samples; 0 without an explicit window
+    """
+    if start_ms is None or end_ms is None or end_ms <= start_ms:
+        return 0
+    return int(math.ceil((end_ms - start_ms) / 1000 * sample_rate))
+
+
+def client_key(remote_addr: Optional[str], forwarded_client: Optional[str] = None,
+               trusted_proxies: frozenset = TRUSTED_PROXIES) -> str:
+    """
+    Identify the client a request is charged to
+
+    Args:
+        remote_addr (str, optional): Address the request came from
+        forwarded_client (str, optional): Client named by the X-Client-Id header
+        trusted_proxies (frozenset, optional): Addresses allowed to name the client
+
+    Returns:
+        str: The forwarded client when a trusted proxy names one, the address otherwise
+    """
+    if forwarded_client and remote_addr in trusted_proxies:
+        return forwarded_client
+    return remote_addr or 'anonymous'
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request cannot be admitted within the queueing limits
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Server is saturated, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    Budget held by an admitted request until it is released
+    """
+
+    def __init__(self, client_id: str, cost: int):
+        self.client_id = client_id
+        self.cost = cost
+        self.admitted_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    Cost-aware admission of expensive requests
+
+    Every request is priced in samples. Requests priced above the inline
+    limit belong on the background job path and those above the request
+    limit are refused; callers check both with inline() and allowed().
+    Cheap requests are admitted right away without touching the budgets, so
+    they keep their latency however busy the expensive ones are. The rest
+    must fit both the global budget and the budget of their client, and
+    otherwise wait in a short, bounded queue; past its limits they are shed
+    with a retry hint derived from how long admitted requests have recently
+    held their budget.
+    """
+
+    def __init__(self, global_budget: int = GLOBAL_BUDGET, client_budget: int = CLIENT_BUDGET,
+                 cheap_cost: int = CHEAP_COST, queue_timeout: float = QUEUE_TIMEOUT,
+                 max_queued: int = MAX_QUEUED, max_inline_cost: int = MAX_INLINE_COST,
+                 max_request_cost: int = MAX_REQUEST_COST):
+        self.global_budget = global_budget
+        self.client_budget = client_budget
+        self.cheap_cost = cheap_cost
+        self.queue_timeout = queue_timeout
+        self.max_queued = max_queued
+        self.max_inline_cost = max_inline_cost
+        self.max_request_cost = max_request_cost
+
+        self._in_flight = 0
+        self._client_in_flight = {}
+        self._queued = 0
+        self._hold_seconds = queue_timeout
+        self._cond = threading.Condition()
+
+    def allowed(self, cost: int) -> bool:
+        """
+        Check whether a request is small enough to be served at all
+
+        Args:
+            cost (int): Estimated samples the request processes
+
+        Returns:
+            bool: False if the request exceeds the hard limit
+        """
+        return cost <= self.max_request_cost
+
+    def inline(self, cost: int) -> bool:
+        """
+        Check whether a request is small enough to be answered inline
+
+        Args:
+            cost (int): Estimated samples the request processes
+
+        Returns:
+            bool: False if the request belongs on the background job path
+        """
+        return cost <= self.max_inline_cost
+
+    def acquire(self, client_id: str, cost: int) -> Optional[Ticket]:
+        """
+        Admit a request, waiting briefly for budget if needed
+
+        Args:
+            client_id (str): Identifies the client the budget is charged to
+            cost (int): Estimated samples the request processes
+
+        Returns:
+            Optional[Ticket]: Budget to release when done, or None for cheap requests
+
+        Raises:
+            Overloaded: If the budget did not free up in time or the queue is full
+        """
+        if cost <= self.cheap_cost:
+            admission_decisions.inc(decision='cheap')
+            return None
+
+        # Inline requests fit a client budget unless the limits were
+        # configured otherwise; such a request runs once it has the budget to itself
+        cost = min(cost, self.client_budget, self.global_budget)
+
+        with self._cond:
+            if not self._fits(client_id, cost):
+                if self._queued >= self.max_queued:
+                    admission_decisions.inc(decision='rejected')
+                    raise Overloaded(self._retry_after())
+
+                self._queued += 1
+                started = time.monotonic()
+                deadline = started + self.queue_timeout
+                try:
+                    while not self._fits(client_id, cost):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            admission_decisions.inc(decision='rejected')
+                            raise Overloaded(self._retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self._queued -= 1
+
+                admission_wait.observe(time.monotonic() - started)
+                admission_decisions.inc(decision='queued')
+            else:
+                admission_decisions.inc(decision='admitted')
+
+            self._in_flight += cost
+            self._client_in_flight[client_id] = self._client_in_flight.get(client_id, 0) + cost
+
+        return Ticket(client_id, cost)
+
+    def release(self, ticket: Optional[Ticket]) -> None:
+        """
+        Return the budget of an admitted request
+
+        Args:
+            ticket (Optional[Ticket]): Ticket returned by acquire
+        """
+        if ticket is None:
+            return
+
+        held = time.monotonic() - ticket.admitted_at
+        with self._cond:
+            self._in_flight -= ticket.cost
+            remaining = self._client_in_flight.get(ticket.client_id, 0) - ticket.cost
+            if remaining > 0:
+                self._client_in_flight[ticket.client_id] = remaining
+            else:
+                self._client_in_flight.pop(ticket.client_id, None)
+
+            # Moving average of how long budget is held, for the retry hint
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held
+            self._cond.notify_all()
+
+    def _fits(self, client_id, cost):
+        return (self._in_flight + cost <= self.global_budget
+                and self._client_in_flight.get(client_id, 0) + cost <= self.client_budget)
+
+    def _retry_after(self):
+        return max(1, int(math.ceil(self._hold_seconds)))
+
+
+admission = AdmissionController()
@@ -4,10 +4,108 @@ from datetime import datetime
 import pickle
 import os
 from services.eeg_ecg_conversion import detect_ecg_eeg_anomaly
+from services.eeg_array import EEGArray, DEFAULT_CHANNEL
+from services.metrics import timed_stage
 
 # Path to the trained model
 MODEL_PATH = os.path.join(os.path.dirname(__file__), '../models/anomaly_detector.pkl')
 
+# Version of the detection logic; bump whenever detector behaviour changes so
+# cached and stored results computed by older versions are not served
+DETECTOR_VERSION = '2'
+
+# Deviation thresholds, in standard deviations from the window mean, or in
+# robust scale units from the patient baseline when one is available
+THRESHOLDS = {
+    'trigger': 2.5,   # deviation that starts an anomaly
+    'sustain': 2.0,   # deviation the following points must keep
+    'high': 3.0       # deviation above which an anomaly is high severity
+}
+
+def detector_signature():
+    """
+    Get a string identifying the detector version and thresholds in effect
+    
+    Returns:
+        str: The detector signature
+    """
+    thresholds = ','.join(f'{key}={value}' for key, value in sorted(THRESHOLDS.items()))
+    return f'{DETECTOR_VERSION}:{thresholds}'
+
+def _deviations(points, field, baseline=None):
+    """
+    Get the deviation of each point from the baseline or the window mean
+    
+    Args:
+        points (list): List of data points
+        field (str): The field of the points to measure
+        baseline (BaselineProfile, optional): Patient baseline; the mean and
+            standard deviation of the window are used without one
+    
+    Returns:
+        list: Deviation of each point in scale units
+    """
+    values = np.array([point[field] for point in points], dtype=np.float64)
+    
+    if baseline is not None:
+        center, scale = baseline.center_scale([point['timestamp'] for point in points])
+    else:
+        center, scale = np.mean(values), np.std(values)
+    
+    # A zero scale flags every point that differs from the center at all
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviations = np.abs(values - center) / scale
+    
+    return np.nan_to_num(deviations, nan=0.0).tolist()
+
+def build_ecg_anomaly(timestamp, deviation):
+    """
+    Create an ECG anomaly record
+    
+    Args:
+        timestamp (int): Timestamp of the anomalous sample in milliseconds
+        deviation (float): Deviation of the sample in standard deviations
+    
+    Returns:
+        dict: The anomaly
+    """
+    return {
+        'id': str(uuid.uuid4()),
+        'timestamp': datetime.fromtimestamp(timestamp / 1000).isoformat(),
+        'type': 'ECG',
+        'severity': 'high' if deviation > THRESHOLDS['high'] else 'medium',
+        'description': 'Irregular heartbeat pattern detected',
+        'details': 'The ECG shows signs of arrhythmia with irregular R-R intervals. This pattern has persisted for over 5 minutes.',
+        'status': 'active'
+    }
+
+def build_eeg_anomaly(timestamp, band, deviation, channel=DEFAULT_CHANNEL):
+    """
+    Create an EEG anomaly record
+    
+    Args:
+        timestamp (int): Timestamp of the anomalous sample in milliseconds
+        band (str): The wave band with the most significant deviation
+        deviation (float): Deviation of the band in standard deviations
+        channel (str, optional): The EEG channel the deviation was found on
+    
+    Returns:
+        dict: The anomaly
+    """
+    location = '' if channel == DEFAULT_CHANNEL else f' on channel {channel}'
+    
+    return {
+        'id': str(uuid.uuid4()),
+        'timestamp': datetime.fromtimestamp(timestamp / 1000).isoformat(),
+        'type': 'EEG',
+        'severity': 'high' if deviation > THRESHOLDS['high'] else ('medium' if deviation > THRESHOLDS['trigger'] else 'low'),
+        'description': f'Unusual {band} wave activity{location}',
+        'details': f'{band.capitalize()} wave patterns show unusual amplitude variations during rest state. This may indicate increased stress or anxiety.',
+        'channel': channel,
+        'band': band,
+        'status': 'active'
+    }
+
 def load_model():
     """
     Load the trained anomaly detection model
@@ -29,7 +127,7 @@ def load_model():
     
     return None
 
-def detect_anomalies(ecg_data, eeg_data, type=None):
+def detect_anomalies(ecg_data, eeg_data, type=None, baselines=None):
     """
     Detect anomalies in ECG and EEG data
     
@@ -37,6 +135,8 @@ def detect_anomalies(ecg_data, eeg_data, type=None):
         ecg_data (list): List of ECG data points
         eeg_data (list): List of EEG data points
         type (str, optional): Type of anomalies to detect ('ECG', 'EEG', or None for combined)
+        baselines (dict, optional): Patient baselines per channel ('ecg' and the
+            EEG bands); channels without one use the statistics of the window
     
     Returns:
         list: List of detected anomalies
@@ -46,6 +146,7 @@ def detect_anomalies(ecg_data, eeg_data, type=None):
     
     # List to store detected anomalies
     anomalies = []
+    baselines = baselines or {}
     
     # If we have a trained model, use it
     if model:
@@ -57,12 +158,12 @@ def detect_anomalies(ecg_data, eeg_data, type=None):
     else:
         # Detect ECG anomalies
         if ecg_data and (type is None or type == 'ECG'):
-            ecg_anomalies = detect_ecg_anomalies(ecg_data)
+            ecg_anomalies = detect_ecg_anomalies(ecg_data, baselines.get('ecg'))
             anomalies.extend(ecg_anomalies)
         
         # Detect EEG anomalies
         if eeg_data and (type is None or type == 'EEG'):
-            eeg_anomalies = detect_eeg_anomalies(eeg_data)
+            eeg_anomalies = detect_eeg_anomalies(eeg_data, baselines)
             anomalies.extend(eeg_anomalies)
         
         # Detect combined anomalies
@@ -72,12 +173,15 @@ def detect_anomalies(ecg_data, eeg_data, type=None):
     
     return anomalies
 
-def detect_ecg_anomalies(ecg_data):
+@timed_stage('detect_ecg_anomalies')
+def detect_ecg_anomalies(ecg_data, baseline=None):
     """
     Detect anomalies in ECG data
     
     Args:
         ecg_data (list): List of ECG data points
+        baseline (BaselineProfile, optional): Patient baseline to threshold against
+            instead of the statistics of the window
     
     Returns:
         list: List of detected anomalies
@@ -87,10 +191,8 @@ def detect_ecg_anomalies(ecg_data):
     # In a real application, this would use more sophisticated algorithms
     # For now, we'll use a simple threshold-based approach
     
-    # Calculate mean and standard deviation
-    values = [point['value'] for point in ecg_data]
-    mean = np.mean(values)
-    std = np.std(values)
+    # Deviation of each point from the baseline or the window mean
+    deviations = _deviations(ecg_data, 'value', baseline)
     
     # Check for anomalies
     for i, point in enumerate(ecg_data):
@@ -99,22 +201,14 @@ def detect_ecg_anomalies(ecg_data):
             continue
         
         # Check for values that are significantly different from the mean
-        if abs(point['value'] - mean) > 2.5 * std:
+        if deviations[i] > THRESHOLDS['trigger']:
             # Check if this is a sustained anomaly (at least 3 consecutive points)
             if (i + 2 < len(ecg_data) and 
-                abs(ecg_data[i+1]['value'] - mean) > 2 * std and 
-                abs(ecg_data[i+2]['value'] - mean) > 2 * std):
+                deviations[i+1] > THRESHOLDS['sustain'] and 
+                deviations[i+2] > THRESHOLDS['sustain']):
                 
                 # Create an anomaly
-                anomaly = {
-                    'id': str(uuid.uuid4()),
-                    'timestamp': datetime.fromtimestamp(point['timestamp'] / 1000).isoformat(),
-                    'type': 'ECG',
-                    'severity': 'high' if abs(point['value'] - mean) > 3 * std else 'medium',
-                    'description': 'Irregular heartbeat pattern detected',
-                    'details': 'The ECG shows signs of arrhythmia with irregular R-R intervals. This pattern has persisted for over 5 minutes.',
-                    'status': 'active'
-                }
+                anomaly = build_ecg_anomaly(point['timestamp'], deviations[i])
                 
                 anomalies.append(anomaly)
                 
@@ -123,110 +217,94 @@ def detect_ecg_anomalies(ecg_data):
     
     return anomalies
 
-def detect_eeg_anomalies(eeg_data):
+@timed_stage('detect_eeg_anomalies')
+def detect_eeg_anomalies(eeg_data, baselines=None):
     """
     Detect anomalies in EEG data
     
     Args:
         eeg_data (list): List of EEG data points
+        baselines (dict, optional): Patient baselines per wave band to threshold
+            against instead of the statistics of the window
     
     Returns:
         list: List of detected anomalies
     """
-    anomalies = []
+    eeg = EEGArray.from_points(eeg_data)
+    baselines = {(DEFAULT_CHANNEL, band): profile for band, profile in (baselines or {}).items()}
+    
+    return detect_eeg_array_anomalies(eeg, baselines)
+
+@timed_stage('detect_eeg_array_anomalies')
+def detect_eeg_array_anomalies(eeg, baselines=None):
+    """
+    Detect anomalies across every channel and band of an EEG array at once
+    
+    Applies the same rule as the other detectors to each channel: a window
+    triggers when any band deviates above the trigger threshold, and counts
+    when the first triggering band stays above the sustain threshold for the
+    next two windows. The anomaly reports the channel and the band with the
+    largest deviation.
+    
+    Args:
+        eeg (EEGArray): Band values of shape (n_channels, n_bands, n_windows)
+        baselines (dict, optional): Patient baselines keyed by (channel, band);
+            other channels and bands use the statistics of the window
+    
+    Returns:
+        list: List of detected anomalies, ordered by timestamp
+    """
+    data = eeg.data
+    n = eeg.n_windows
     
     # In a real application, this would use more sophisticated algorithms
     # For now, we'll use a simple threshold-based approach
     
-    # Calculate mean and standard deviation for each wave band
-    alpha_values = [point['alpha'] for point in eeg_data]
-    beta_values = [point['beta'] for point in eeg_data]
-    theta_values = [point['theta'] for point in eeg_data]
-    delta_values = [point['delta'] for point in eeg_data]
+    # Deviation of each value from the window statistics of its channel and band,
+    # or from the patient baseline where one is available
+    center = data.mean(axis=2, keepdims=True) * np.ones_like(data)
+    scale = data.std(axis=2, keepdims=True) * np.ones_like(data)
+    for (channel, band), profile in (baselines or {}).items():
+        if channel in eeg.channels and band in eeg.bands:
+            c, b = eeg.channels.index(channel), eeg.bands.index(band)
+            center[c, b], scale[c, b] = profile.center_scale(eeg.timestamps)
     
-    alpha_mean = np.mean(alpha_values)
-    alpha_std = np.std(alpha_values)
+    # A zero scale flags every value that differs from the center at all
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviations = np.nan_to_num(np.abs(data - center) / scale, nan=0.0)
     
-    beta_mean = np.mean(beta_values)
-    beta_std = np.std(beta_values)
+    triggered = deviations > THRESHOLDS['trigger']
+    above_sustain = deviations > THRESHOLDS['sustain']
     
-    theta_mean = np.mean(theta_values)
-    theta_std = np.std(theta_values)
+    # Whether the next two windows stay deviant, per channel, band and window
+    followed = np.zeros_like(above_sustain)
+    followed[:, :, :-2] = above_sustain[:, :, 1:-1] & above_sustain[:, :, 2:]
     
-    delta_mean = np.mean(delta_values)
-    delta_std = np.std(delta_values)
+    # Sustain is checked on the first band that triggered, as a reading of the bands in order would
+    first_band = triggered.argmax(axis=1)
+    sustained = np.take_along_axis(followed, first_band[:, np.newaxis, :], axis=1)[:, 0, :]
     
-    # Check for anomalies
-    for i, point in enumerate(eeg_data):
-        # Skip the first and last few points to avoid edge effects
-        if i < 5 or i > len(eeg_data) - 5:
-            continue
-        
-        # Check for values that are significantly different from the mean
-        alpha_anomaly = abs(point['alpha'] - alpha_mean) > 2.5 * alpha_std
-        beta_anomaly = abs(point['beta'] - beta_mean) > 2.5 * beta_std
-        theta_anomaly = abs(point['theta'] - theta_mean) > 2.5 * theta_std
-        delta_anomaly = abs(point['delta'] - delta_mean) > 2.5 * delta_std
-        
-        if alpha_anomaly or beta_anomaly or theta_anomaly or delta_anomaly:
-            # Check if this is a sustained anomaly (at least 3 consecutive points)
-            sustained = False
-            
-            if alpha_anomaly:
-                sustained = (i + 2 < len(eeg_data) and 
-                            abs(eeg_data[i+1]['alpha'] - alpha_mean) > 2 * alpha_std and 
-                            abs(eeg_data[i+2]['alpha'] - alpha_mean) > 2 * alpha_std)
-            elif beta_anomaly:
-                sustained = (i + 2 < len(eeg_data) and 
-                            abs(eeg_data[i+1]['beta'] - beta_mean) > 2 * beta_std and 
-                            abs(eeg_data[i+2]['beta'] - beta_mean) > 2 * beta_std)
-            elif theta_anomaly:
-                sustained = (i + 2 < len(eeg_data) and 
-                            abs(eeg_data[i+1]['theta'] - theta_mean) > 2 * theta_std and 
-                            abs(eeg_data[i+2]['theta'] - theta_mean) > 2 * theta_std)
-            elif delta_anomaly:
-                sustained = (i + 2 < len(eeg_data) and 
-                            abs(eeg_data[i+1]['delta'] - delta_mean) > 2 * delta_std and 
-                            abs(eeg_data[i+2]['delta'] - delta_mean) > 2 * delta_std)
-            
-            if sustained:
-                # Determine which wave band has the most significant anomaly
-                anomaly_type = 'alpha'
-                max_deviation = abs(point['alpha'] - alpha_mean) / alpha_std
-                
-                if abs(point['beta'] - beta_mean) / beta_std > max_deviation:
-                    anomaly_type = 'beta'
-                    max_deviation = abs(point['beta'] - beta_mean) / beta_std
-                
-                if abs(point['theta'] - theta_mean) / theta_std > max_deviation:
-                    anomaly_type = 'theta'
-                    max_deviation = abs(point['theta'] - theta_mean) / theta_std
-                
-                if abs(point['delta'] - delta_mean) / delta_std > max_deviation:
-                    anomaly_type = 'delta'
-                    max_deviation = abs(point['delta'] - delta_mean) / delta_std
-                
-                # Create an anomaly
-                description = f'Unusual {anomaly_type} wave activity'
-                details = f'{anomaly_type.capitalize()} wave patterns show unusual amplitude variations during rest state. This may indicate increased stress or anxiety.'
-                
-                anomaly = {
-                    'id': str(uuid.uuid4()),
-                    'timestamp': datetime.fromtimestamp(point['timestamp'] / 1000).isoformat(),
-                    'type': 'EEG',
-                    'severity': 'high' if max_deviation > 3 else ('medium' if max_deviation > 2.5 else 'low'),
-                    'description': description,
-                    'details': details,
-                    'status': 'active'
-                }
-                
-                anomalies.append(anomaly)
-                
-                # Skip the next few points to avoid detecting the same anomaly multiple times
-                i += 5
+    # Skip the first and last few windows to avoid edge effects
+    inside = np.zeros(n, dtype=bool)
+    inside[5:n - 4] = True
     
-    return anomalies
+    hits = triggered.any(axis=1) & sustained & inside
+    
+    # Window-major order, so anomalies come out sorted by time
+    windows, channels = np.nonzero(hits.T)
+    window_deviations = deviations[channels, :, windows]
+    bands = window_deviations.argmax(axis=1)
+    
+    timestamps = eeg.timestamps[windows].tolist()
+    max_deviations = window_deviations[np.arange(len(bands)), bands].tolist()
+    
+    return [
+        build_eeg_anomaly(timestamp, eeg.bands[band], deviation, eeg.channels[channel])
+        for timestamp, channel, band, deviation
+        in zip(timestamps, channels.tolist(), bands.tolist(), max_deviations)
+    ]
 
+@timed_stage('detect_combined_anomalies')
 def detect_combined_anomalies(ecg_data, eeg_data):
     """
     Detect anomalies in the relationship between ECG and EEG data
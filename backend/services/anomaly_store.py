@@ -0,0 +1,478 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import atexit
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+# Path to the local anomaly database
+DB_PATH = os.environ.get(
+    'ANOMALY_DB_PATH',
+    os.path.join(os.path.dirname(__file__), '../data/anomalies.db')
+)
+
+# Pending writes are flushed once this many anomalies are buffered...
+BATCH_SIZE = 500
+
+# ...or once the oldest pending write is this many seconds old
+FLUSH_INTERVAL = 2.0
+
+# Detection scope covering every anomaly type
+SCOPE_ALL = 'all'
+
+# Periods anomaly counts are summarized over, in milliseconds, finest first
+SUMMARY_PERIODS = {
+    'hour': 60 * 60 * 1000,
+    'day': 24 * 60 * 60 * 1000
+}
+
+# Namespace of the deterministic anomaly IDs
+ANOMALY_ID_NAMESPACE = uuid.UUID('5f0c9a4e-3b1d-4c2a-9e57-8d6b1f2a7c30')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS anomalies (
+    id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    status TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_anomalies_patient_time
+    ON anomalies (patient_id, timestamp_ms);
+CREATE INDEX IF NOT EXISTS idx_anomalies_patient_type_time
+    ON anomalies (patient_id, type, timestamp_ms);
+CREATE INDEX IF NOT EXISTS idx_anomalies_patient_severity_time
+    ON anomalies (patient_id, severity, timestamp_ms);
+CREATE TABLE IF NOT EXISTS detection_windows (
+    patient_id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    version TEXT NOT NULL,
+    computed_at INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, scope, start_ms, end_ms)
+);
+CREATE TABLE IF NOT EXISTS anomaly_summaries (
+    patient_id TEXT NOT NULL,
+    period_ms INTEGER NOT NULL,
+    bucket_ms INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, period_ms, bucket_ms, type, severity)
+) WITHOUT ROWID;
+"""
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection configured for concurrent readers and a single writer
+
+    Args:
+        path (str): Path to the database file
+
+    Returns:
+        sqlite3.Connection: The configured connection
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+
+def anomaly_timestamp_ms(anomaly: Dict[str, Any]) -> int:
+    """
+    Get the timestamp of an anomaly in milliseconds
+
+    Args:
+        anomaly (Dict[str, Any]): The anomaly, with an ISO formatted timestamp
+
+    Returns:
+        int: The timestamp in milliseconds
+    """
+    return int(datetime.fromisoformat(anomaly['timestamp']).timestamp() * 1000)
+
+
+def anomaly_id(patient_id: str, anomaly: Dict[str, Any]) -> str:
+    """
+    Get the ID of an anomaly from what identifies it
+
+    Rerunning detection over the same data finds the same anomalies, which
+    then keep their IDs.
+
+    Args:
+        patient_id (str): The patient the anomaly belongs to
+        anomaly (Dict[str, Any]): The anomaly
+
+    Returns:
+        str: A UUID derived from patient, type, channel, band and timestamp
+    """
+    name = '|'.join(str(part) for part in (
+        patient_id, anomaly['type'], anomaly.get('channel', ''), anomaly.get('band', ''),
+        anomaly_timestamp_ms(anomaly)
+    ))
+    return str(uuid.uuid5(ANOMALY_ID_NAMESPACE, name))
+
+
+class AnomalyStore:
+    """
+    Local SQLite store for detected anomalies
+
+    Anomalies are indexed by patient, timestamp, type and severity. Each
+    detection run also records the window it covered, so historical windows
+    can be served from the store instead of rerunning detection. Hourly and
+    daily counts by type and severity are refreshed for the periods touched
+    by every flush.
+    """
+
+    def __init__(self, path: str = DB_PATH, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_count = 0
+        self._pending_since = None
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections are not shared between threads; each request
+        # thread gets its own connection to the same WAL database
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = open_database(self.path)
+            self._local.conn = conn
+        return conn
+
+    def replace_window(
+        self,
+        patient_id: str,
+        start_ms: int,
+        end_ms: int,
+        anomalies: List[Dict[str, Any]],
+        scope: str = SCOPE_ALL,
+        version: Optional[str] = None
+    ) -> None:
+        """
+        Record the result of a detection run over a window
+
+        Previously stored anomalies of the same scope inside the window are
+        replaced, so rerunning detection does not duplicate anomalies, and the
+        anomalies are given IDs that rerunning reproduces. When a
+        version is given the window is also recorded as covered, so later
+        requests for it can be served from the store. The write is buffered
+        and committed with the next batch.
+
+        Args:
+            patient_id (str): The patient the anomalies belong to
+            start_ms (int): Start of the detection window in milliseconds
+            end_ms (int): End of the detection window in milliseconds
+            anomalies (List[Dict[str, Any]]): The detected anomalies
+            scope (str, optional): Anomaly type the run covered, or 'all'. Defaults to 'all'.
+            version (str, optional): Detector signature; only complete windows should pass one
+        """
+        rows = [self._to_row(patient_id, anomaly) for anomaly in anomalies]
+
+        with self._lock:
+            self._pending.append((patient_id, scope, start_ms, end_ms, version, rows))
+            self._pending_count += len(rows)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+
+            should_flush = (
+                self._pending_count >= self.batch_size or
+                time.monotonic() - self._pending_since >= self.flush_interval
+            )
+
+        if should_flush:
+            self.flush()
+
+    def add(self, patient_id: str, anomalies: List[Dict[str, Any]]) -> None:
+        """
+        Append anomalies without recording a detection window
+
+        Args:
+            patient_id (str): The patient the anomalies belong to
+            anomalies (List[Dict[str, Any]]): The anomalies to store
+        """
+        self.replace_window(patient_id, None, None, anomalies)
+
+    def flush(self) -> None:
+        """
+        Commit all buffered writes in a single transaction
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            self._pending_count = 0
+            self._pending_since = None
+
+            if not pending:
+                return
+
+            conn = self._connection()
+            now_ms = int(time.time() * 1000)
+            hour = SUMMARY_PERIODS['hour']
+            touched = set()
+
+            with conn:
+                for patient_id, scope, start_ms, end_ms, version, rows in pending:
+                    # Hours whose summaries change with this write
+                    touched.update((patient_id, row[2] - row[2] % hour) for row in rows)
+                    if start_ms is not None and end_ms is not None:
+                        touched.update((patient_id, bucket)
+                                       for bucket in range(start_ms - start_ms % hour, end_ms, hour))
+
+                    if start_ms is not None and end_ms is not None:
+                        if scope == SCOPE_ALL:
+                            conn.execute(
+                                'DELETE FROM anomalies WHERE patient_id = ? '
+                                'AND timestamp_ms >= ? AND timestamp_ms < ?',
+                                (patient_id, start_ms, end_ms)
+                            )
+                        else:
+                            conn.execute(
+                                'DELETE FROM anomalies WHERE patient_id = ? AND type = ? '
+                                'AND timestamp_ms >= ? AND timestamp_ms < ?',
+                                (patient_id, scope, start_ms, end_ms)
+                            )
+                        if version is not None:
+                            conn.execute(
+                                'INSERT OR REPLACE INTO detection_windows '
+                                '(patient_id, scope, start_ms, end_ms, version, computed_at) '
+                                'VALUES (?, ?, ?, ?, ?, ?)',
+                                (patient_id, scope, start_ms, end_ms, version, now_ms)
+                            )
+
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO anomalies '
+                        '(id, patient_id, timestamp_ms, type, severity, status, payload) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        rows
+                    )
+
+                for patient_id, bucket in sorted(touched):
+                    self._refresh_summaries(conn, patient_id, bucket, bucket + hour)
+
+    def _refresh_summaries(self, conn, patient_id, start_ms, end_ms):
+        # Each period is rebuilt for the touched buckets from the one below
+        # it, starting from the anomalies themselves
+        source_period = None
+
+        for period in SUMMARY_PERIODS.values():
+            bucket_start = start_ms - start_ms % period
+            bucket_end = end_ms - end_ms % period + (period if end_ms % period else 0)
+
+            conn.execute(
+                'DELETE FROM anomaly_summaries WHERE patient_id = ? AND period_ms = ? '
+                'AND bucket_ms >= ? AND bucket_ms < ?',
+                (patient_id, period, bucket_start, bucket_end)
+            )
+
+            if source_period is None:
+                conn.execute(
+                    'INSERT INTO anomaly_summaries '
+                    '(patient_id, period_ms, bucket_ms, type, severity, count) '
+                    'SELECT patient_id, ?, (timestamp_ms / ?) * ?, type, severity, COUNT(*) '
+                    'FROM anomalies WHERE patient_id = ? AND timestamp_ms >= ? AND timestamp_ms < ? '
+                    'GROUP BY timestamp_ms / ?, type, severity',
+                    (period, period, period, patient_id, bucket_start, bucket_end, period)
+                )
+            else:
+                conn.execute(
+                    'INSERT INTO anomaly_summaries '
+                    '(patient_id, period_ms, bucket_ms, type, severity, count) '
+                    'SELECT patient_id, ?, (bucket_ms / ?) * ?, type, severity, SUM(count) '
+                    'FROM anomaly_summaries WHERE patient_id = ? AND period_ms = ? '
+                    'AND bucket_ms >= ? AND bucket_ms < ? '
+                    'GROUP BY bucket_ms / ?, type, severity',
+                    (period, period, period, patient_id, source_period,
+                     bucket_start, bucket_end, period)
+                )
+
+            source_period = period
+
+    def get(self, anomaly_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a single anomaly by ID
+
+        Args:
+            anomaly_id (str): ID of the anomaly
+
+        Returns:
+            Optional[Dict[str, Any]]: The anomaly, or None if it is not stored
+        """
+        self.flush()
+
+        row = self._connection().execute(
+            'SELECT payload FROM anomalies WHERE id = ?', (anomaly_id,)
+        ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def query(
+        self,
+        patient_id: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        type: Optional[str] = None,
+        severity: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get stored anomalies for a patient, ordered by timestamp
+
+        Args:
+            patient_id (str): The patient to query
+            start_ms (int, optional): Inclusive start of the range in milliseconds
+            end_ms (int, optional): Exclusive end of the range in milliseconds
+            type (str, optional): Only return anomalies of this type
+            severity (str, optional): Only return anomalies of this severity
+            limit (int, optional): Maximum number of anomalies to return
+
+        Returns:
+            List[Dict[str, Any]]: The matching anomalies
+        """
+        self.flush()
+
+        sql = 'SELECT payload FROM anomalies WHERE patient_id = ?'
+        params = [patient_id]
+
+        if type is not None:
+            sql += ' AND type = ?'
+            params.append(type)
+        if severity is not None:
+            sql += ' AND severity = ?'
+            params.append(severity)
+        if start_ms is not None:
+            sql += ' AND timestamp_ms >= ?'
+            params.append(start_ms)
+        if end_ms is not None:
+            sql += ' AND timestamp_ms < ?'
+            params.append(end_ms)
+
+        sql += ' ORDER BY timestamp_ms'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        rows = self._connection().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def summaries(self, patient_id: str, period_ms: int, start_ms: int,
+                  end_ms: int) -> List[tuple]:
+        """
+        Get summarized anomaly counts for a patient
+
+        Args:
+            patient_id (str): The patient to query
+            period_ms (int): The summary period, one of SUMMARY_PERIODS
+            start_ms (int): Inclusive start of the range in milliseconds
+            end_ms (int): Exclusive end of the range in milliseconds
+
+        Returns:
+            List[tuple]: (bucket_ms, type, severity, count) rows ordered by bucket
+        """
+        self.flush()
+
+        return self._connection().execute(
+            'SELECT bucket_ms, type, severity, count FROM anomaly_summaries '
+            'WHERE patient_id = ? AND period_ms = ? AND bucket_ms >= ? AND bucket_ms < ? '
+            'ORDER BY bucket_ms',
+            (patient_id, period_ms, start_ms - start_ms % period_ms, end_ms)
+        ).fetchall()
+
+    def is_covered(self, patient_id: str, start_ms: int, end_ms: int, version: str,
+                   scopes: Iterable[str] = (SCOPE_ALL,)) -> bool:
+        """
+        Check whether a single stored detection run covers the whole window
+
+        Args:
+            patient_id (str): The patient to check
+            start_ms (int): Start of the window in milliseconds
+            end_ms (int): End of the window in milliseconds
+            version (str): Detector signature the stored run must match
+            scopes (Iterable[str], optional): Detection scopes that satisfy the check
+
+        Returns:
+            bool: True if stored results can be served for the window
+        """
+        self.flush()
+
+        scopes = list(scopes)
+        placeholders = ', '.join('?' for _ in scopes)
+        row = self._connection().execute(
+            'SELECT 1 FROM detection_windows WHERE patient_id = ? '
+            f'AND scope IN ({placeholders}) AND version = ? AND start_ms <= ? AND end_ms >= ? LIMIT 1',
+            [patient_id, *scopes, version, start_ms, end_ms]
+        ).fetchone()
+
+        return row is not None
+
+    def invalidate_windows(self, patient_id: str, start_ms: int, end_ms: int) -> None:
+        """
+        Forget stored detection runs overlapping a window, e.g. after new data lands in it
+
+        The anomalies themselves are kept until detection reruns over the window.
+
+        Args:
+            patient_id (str): The patient whose data changed
+            start_ms (int): Start of the changed range in milliseconds
+            end_ms (int): End of the changed range in milliseconds
+        """
+        self.flush()
+
+        with self._connection() as conn:
+            conn.execute(
+                'DELETE FROM detection_windows WHERE patient_id = ? AND start_ms < ? AND end_ms > ?',
+                (patient_id, end_ms, start_ms)
+            )
+
+    def _to_row(self, patient_id: str, anomaly: Dict[str, Any]) -> tuple:
+        # Recorded anomalies get deterministic IDs; the caller sees them too
+        anomaly['id'] = anomaly_id(patient_id, anomaly)
+        return (
+            anomaly['id'],
+            patient_id,
+            anomaly_timestamp_ms(anomaly),
+            anomaly['type'],
+            anomaly['severity'],
+            anomaly.get('status'),
+            json.dumps(anomaly)
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_anomaly_store() -> AnomalyStore:
+    """
+    Get the process-wide anomaly store, creating it on first use
+
+    Returns:
+        AnomalyStore: The shared anomaly store
+    """
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = AnomalyStore()
+            atexit.register(_store.flush)
+
+    return _store
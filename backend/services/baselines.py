@@ -0,0 +1,396 @@
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, Optional, Iterable
+
+from services.anomaly_store import open_database
+from services.signal_store import DB_PATH
+
+# Number of histogram bins per hour of day
+N_BINS = 512
+
+# Headroom added on each side a sketch's range grows, as a fraction of the
+# new span, so that it does not have to grow again right away
+RANGE_HEADROOM = 0.5
+
+# Smallest span of a sketch, absolute and relative to the magnitude of its values
+MIN_SPAN = 1e-6
+MIN_RELATIVE_SPAN = 0.01
+
+# A profile needs a scale of at least this many bins to be resolved
+MIN_RESOLUTION_BINS = 2
+
+# Sketches with more of their mass in the edge bins were clipped and are not trusted
+MAX_EDGE_FRACTION = 0.01
+
+# A recomputed profile replaces the published one only once a center or
+# scale moved by more than this fraction of the published scale
+PROFILE_TOLERANCE = 0.1
+
+# Samples an hour of day needs before its own statistics are used; hours
+# with fewer samples fall back to the statistics of the whole day
+MIN_SAMPLES = 1000
+
+# Scales a median absolute deviation to a standard deviation for normal data
+MAD_TO_STD = 1.4826
+
+MS_PER_HOUR = 60 * 60 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS baselines (
+    patient_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    counts BLOB NOT NULL,
+    PRIMARY KEY (patient_id, channel, hour)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS baseline_ranges (
+    patient_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    PRIMARY KEY (patient_id, channel)
+) WITHOUT ROWID;
+"""
+
+
+def hour_of_day(timestamps) -> np.ndarray:
+    """
+    Get the UTC hour of day of millisecond timestamps
+
+    Args:
+        timestamps (array-like): Timestamps in milliseconds
+
+    Returns:
+        np.ndarray: Hours in 0..23
+    """
+    return (np.asarray(timestamps, dtype=np.int64) // MS_PER_HOUR) % 24
+
+
+def _robust_stats(counts: np.ndarray, edges: np.ndarray):
+    """
+    Estimate the median and MAD-based scale from a histogram
+
+    Args:
+        counts (np.ndarray): Histogram counts
+        edges (np.ndarray): Bin edges (len(counts) + 1)
+
+    Returns:
+        tuple: (median, scale)
+    """
+    centers = (edges[:-1] + edges[1:]) / 2
+    median = _weighted_median(centers, counts)
+    deviations = np.abs(centers - median)
+    order = np.argsort(deviations)
+    mad = _weighted_median(deviations[order], counts[order])
+    return median, mad * MAD_TO_STD
+
+
+def _resolved(counts: np.ndarray, edges: np.ndarray, scale: float) -> bool:
+    # The histogram only supports a scale well above its bin width, and
+    # mass piled up in the edge bins means values were clipped
+    edge_mass = counts[0] + counts[-1]
+    return scale >= MIN_RESOLUTION_BINS * (edges[1] - edges[0]) and edge_mass <= MAX_EDGE_FRACTION * counts.sum()
+
+
+def _weighted_median(values, weights):
+    cumulative = np.cumsum(weights)
+    return float(values[np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+
+class BaselineProfile:
+    """
+    Robust per-hour-of-day center and scale of one patient channel
+    """
+
+    def __init__(self, centers: np.ndarray, scales: np.ndarray):
+        self.centers = centers
+        self.scales = scales
+
+    def center_scale(self, timestamps):
+        """
+        Get the baseline center and scale for each sample
+
+        Args:
+            timestamps (array-like): Sample timestamps in milliseconds
+
+        Returns:
+            tuple: (centers, scales) arrays aligned with the timestamps
+        """
+        hours = hour_of_day(timestamps)
+        return self.centers[hours], self.scales[hours]
+
+    @property
+    def digest(self) -> str:
+        """
+        Short hash identifying the statistics of the profile
+        """
+        return hashlib.sha1(self.centers.tobytes() + self.scales.tobytes()).hexdigest()[:12]
+
+    def differs(self, other: 'BaselineProfile', tolerance: float = PROFILE_TOLERANCE) -> bool:
+        """
+        Check whether the profile moved materially away from another
+
+        Args:
+            other (BaselineProfile): The profile to compare with
+            tolerance (float, optional): Allowed change as a fraction of the other's scale
+
+        Returns:
+            bool: True if any hour's center or scale moved by more than the tolerance
+        """
+        allowed = tolerance * other.scales
+        return bool(np.any(np.abs(self.centers - other.centers) > allowed)
+                    or np.any(np.abs(self.scales - other.scales) > allowed))
+
+
+def baseline_signature(profiles: Dict[str, BaselineProfile]) -> str:
+    """
+    Get a string identifying a set of channel profiles, for detector signatures
+
+    Args:
+        profiles (Dict[str, BaselineProfile]): Profile per channel
+
+    Returns:
+        str: Short hash over the channels and their profile digests
+    """
+    parts = ','.join(f'{channel}={profile.digest}' for channel, profile in sorted(profiles.items()))
+    return hashlib.sha1(parts.encode()).hexdigest()[:12]
+
+
+class _Sketch:
+    """
+    Histogram of one patient channel per hour of day over an adaptive value range
+
+    The range is set from the first samples seen and grows, with headroom,
+    whenever samples fall outside it; the counts are then re-binned into
+    the wider range.
+    """
+
+    def __init__(self, low: Optional[float] = None, high: Optional[float] = None):
+        self.low = low
+        self.high = high
+        self.counts = np.zeros((24, N_BINS), dtype=np.int64)
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, N_BINS + 1)
+
+    def fit(self, values: np.ndarray) -> bool:
+        """
+        Grow the range to cover new samples
+
+        Args:
+            values (np.ndarray): Finite sample values
+
+        Returns:
+            bool: True if the range changed
+        """
+        v_min, v_max = float(values.min()), float(values.max())
+        empty = self.low is None
+        if not empty and v_min >= self.low and v_max <= self.high:
+            return False
+
+        low = v_min if empty else min(self.low, v_min)
+        high = v_max if empty else max(self.high, v_max)
+        span = max(high - low, MIN_RELATIVE_SPAN * max(abs(low), abs(high)), MIN_SPAN)
+        if empty or v_min < self.low:
+            low -= RANGE_HEADROOM * span
+        if empty or v_max > self.high:
+            high += RANGE_HEADROOM * span
+
+        if not empty and self.counts.any():
+            # Move the counts of each old bin to the new bin holding its center
+            old_edges = self.edges
+            centers = (old_edges[:-1] + old_edges[1:]) / 2
+            bins = np.clip(np.searchsorted(np.linspace(low, high, N_BINS + 1), centers, side='right') - 1,
+                           0, N_BINS - 1)
+            counts = np.zeros_like(self.counts)
+            np.add.at(counts, (slice(None), bins), self.counts)
+            self.counts = counts
+
+        self.low, self.high = low, high
+        return True
+
+    def bins(self, values: np.ndarray) -> np.ndarray:
+        return np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, N_BINS - 1)
+
+
+class BaselineStore:
+    """
+    Persisted per-patient, per-channel baseline statistics
+
+    Each channel keeps a histogram sketch per UTC hour of day over a value
+    range fitted to its own samples, updated incrementally as samples are
+    ingested. Robust statistics (median and MAD) are derived from the
+    sketches, so detectors can threshold every sample against a precomputed
+    baseline instead of computing statistics over the requested window.
+    Sketches too coarse to resolve their spread yield no profile. A profile
+    is only republished once it moved materially, so results computed
+    against it stay valid while it is in effect.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sketches = {}
+        self._profiles = {}
+        self._stale = set()
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = open_database(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _sketch(self, patient_id, channel):
+        # Load the sketch of a channel on first use
+        key = (patient_id, channel)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            conn = self._connection()
+            rows = conn.execute(
+                'SELECT hour, counts FROM baselines WHERE patient_id = ? AND channel = ?',
+                (patient_id, channel)
+            ).fetchall()
+            bounds = conn.execute(
+                'SELECT low, high FROM baseline_ranges WHERE patient_id = ? AND channel = ?',
+                (patient_id, channel)
+            ).fetchone()
+
+            sketch = _Sketch(*bounds) if bounds else _Sketch()
+            for hour, counts in rows:
+                sketch.counts[hour] = np.frombuffer(counts, dtype=np.int64)
+            self._sketches[key] = sketch
+        return sketch
+
+    def update(self, patient_id: str, channel: str, timestamps, values) -> None:
+        """
+        Add samples to the baseline of a channel and persist the touched hours
+
+        Args:
+            patient_id (str): The patient
+            channel (str): The channel name
+            timestamps (array-like): Sample timestamps in milliseconds
+            values (array-like): Sample values
+        """
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        values = values[finite]
+        if len(values) == 0:
+            return
+
+        hours = hour_of_day(timestamps)[finite]
+        key = (patient_id, channel)
+
+        with self._lock:
+            sketch = self._sketch(patient_id, channel)
+            refitted = sketch.fit(values)
+
+            counts = np.bincount(hours * N_BINS + sketch.bins(values), minlength=24 * N_BINS).reshape(24, N_BINS)
+            sketch.counts += counts
+            self._stale.add(key)
+
+            # A refitted sketch moved every hour's counts
+            touched = np.flatnonzero(sketch.counts.sum(axis=1) if refitted else counts.sum(axis=1))
+
+            with self._connection() as conn:
+                if refitted:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO baseline_ranges (patient_id, channel, low, high) VALUES (?, ?, ?, ?)',
+                        (patient_id, channel, sketch.low, sketch.high)
+                    )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO baselines (patient_id, channel, hour, counts) VALUES (?, ?, ?, ?)',
+                    [(patient_id, channel, int(hour), sketch.counts[hour].tobytes()) for hour in touched]
+                )
+
+    def _compute_profile(self, sketch: _Sketch) -> Optional[BaselineProfile]:
+        day = sketch.counts.sum(axis=0)
+        if sketch.low is None or day.sum() < MIN_SAMPLES:
+            return None
+
+        edges = sketch.edges
+        day_center, day_scale = _robust_stats(day, edges)
+        if not _resolved(day, edges, day_scale):
+            return None
+
+        centers = np.full(24, day_center)
+        scales = np.full(24, day_scale)
+
+        for hour in np.flatnonzero(sketch.counts.sum(axis=1) >= MIN_SAMPLES):
+            center, scale = _robust_stats(sketch.counts[hour], edges)
+            if _resolved(sketch.counts[hour], edges, scale):
+                centers[hour], scales[hour] = center, scale
+
+        return BaselineProfile(centers, scales)
+
+    def profile(self, patient_id: str, channel: str) -> Optional[BaselineProfile]:
+        """
+        Get the baseline profile of a channel
+
+        Args:
+            patient_id (str): The patient
+            channel (str): The channel name
+
+        Returns:
+            Optional[BaselineProfile]: The profile, or None until enough samples
+                were seen or if the sketch cannot resolve them
+        """
+        key = (patient_id, channel)
+
+        with self._lock:
+            if key in self._profiles and key not in self._stale:
+                return self._profiles[key]
+
+            published = self._profiles.get(key)
+            profile = self._compute_profile(self._sketch(patient_id, channel))
+            self._stale.discard(key)
+
+            # Small drifts keep the published profile and with it the results computed against it
+            if published is None or profile is None or profile.differs(published):
+                self._profiles[key] = profile
+            return self._profiles[key]
+
+    def profiles(self, patient_id: str, channels: Iterable[str]) -> Dict[str, BaselineProfile]:
+        """
+        Get the available baseline profiles of several channels
+
+        Args:
+            patient_id (str): The patient
+            channels (Iterable[str]): Channel names
+
+        Returns:
+            Dict[str, BaselineProfile]: Profiles of the channels that have one
+        """
+        result = {}
+        for channel in channels:
+            profile = self.profile(patient_id, channel)
+            if profile is not None:
+                result[channel] = profile
+        return result
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_baseline_store() -> BaselineStore:
+    """
+    Get the process-wide baseline store, creating it on first use
+
+    Returns:
+        BaselineStore: The shared baseline store
+    """
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = BaselineStore()
+
+    return _store
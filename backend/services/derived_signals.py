@@ -0,0 +1,240 @@
+import os
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from services.eeg_ecg_conversion import convert_ecg_array_to_eeg, EEG_BANDS, CONVERSION_VERSION
+from services.result_cache import align_buckets, BUCKET_MS
+from services.signal_store import get_signal_store
+from services.metrics import timed, timed_stage, record_samples, record_cache
+
+# Upper bound on the memory held by cached derived signals
+MAX_CACHED_BYTES = int(os.environ.get('DERIVED_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Where the signals of a window come from; EEG bands are either recorded
+# or derived from the ECG of the window
+SOURCE_RECORDED = 'recorded'
+SOURCE_MOCK = 'mock'
+SOURCE_DERIVED = 'derived'
+
+
+def ecg_rows(timestamps: np.ndarray, values: np.ndarray) -> List[Dict]:
+    """
+    Convert ECG arrays to data points
+
+    Args:
+        timestamps (np.ndarray): Sample timestamps in milliseconds
+        values (np.ndarray): ECG values
+
+    Returns:
+        list: List of ECG data points
+    """
+    return [{'timestamp': t, 'value': v} for t, v in zip(timestamps.tolist(), values.tolist())]
+
+
+def eeg_rows(timestamps: np.ndarray, bands: np.ndarray) -> List[Dict]:
+    """
+    Convert EEG arrays to data points
+
+    Args:
+        timestamps (np.ndarray): Sample timestamps in milliseconds
+        bands (np.ndarray): Band values of shape (len(EEG_BANDS), n)
+
+    Returns:
+        list: List of EEG data points
+    """
+    return [
+        {'timestamp': t, **dict(zip(EEG_BANDS, point))}
+        for t, point in zip(timestamps.tolist(), bands.T.tolist())
+    ]
+
+
+@timed_stage('convert_ecg_to_eeg')
+def _convert(values):
+    record_samples('convert_ecg_to_eeg', len(values))
+    return convert_ecg_array_to_eeg(values)
+
+
+def _fetch_ecg(patient_id, source, start_ms, end_ms):
+    with timed('fetch'):
+        if source == SOURCE_RECORDED:
+            timestamps, values = get_signal_store().read(patient_id, 'ecg', start_ms, end_ms)
+        else:
+            # In a real application, every window would come from recorded data
+            # For now, windows without any are filled with mock data
+            from utils.signal_processing import generate_mock_ecg_data
+
+            points = generate_mock_ecg_data(start_ms, end_ms)
+            timestamps = np.array([point['timestamp'] for point in points], dtype=np.int64)
+            values = np.array([point['value'] for point in points], dtype=np.float64)
+
+    record_samples('fetch', len(timestamps))
+    return timestamps, values
+
+
+def _fetch_bands(patient_id, start_ms, end_ms):
+    with timed('fetch'):
+        store = get_signal_store()
+        series = [store.read(patient_id, band, start_ms, end_ms) for band in EEG_BANDS]
+
+        # Keep the timestamps recorded for every band
+        timestamps = series[0][0]
+        for band_timestamps, _ in series[1:]:
+            timestamps = np.intersect1d(timestamps, band_timestamps)
+
+        bands = np.stack([
+            values[np.searchsorted(band_timestamps, timestamps)]
+            for band_timestamps, values in series
+        ])
+
+    record_samples('fetch', len(timestamps))
+    return timestamps, bands
+
+
+def _load(patient_id, ecg_source, eeg_source, start_ms, end_ms):
+    if ecg_source is None:
+        ecg_timestamps, ecg_values = np.empty(0, dtype=np.int64), np.empty(0)
+    else:
+        ecg_timestamps, ecg_values = _fetch_ecg(patient_id, ecg_source, start_ms, end_ms)
+
+    if eeg_source == SOURCE_RECORDED:
+        eeg_timestamps, bands = _fetch_bands(patient_id, start_ms, end_ms)
+    else:
+        eeg_timestamps, bands = ecg_timestamps, _convert(ecg_values)
+
+    return ecg_timestamps, ecg_values, eeg_timestamps, bands
+
+
+class DerivedSignalCache:
+    """
+    Size-bounded LRU cache of ECG windows and the EEG bands derived from them
+
+    Windows are split into the same fixed buckets as the anomaly result
+    cache. Each bucket is fetched and converted once and keyed on patient,
+    bucket, data sources and conversion version, so the EEG view and every
+    anomaly view of a window share one conversion. Buckets that have not
+    ended yet are never cached; they are computed on every request, but
+    only over the requested part that has already happened.
+    """
+
+    def __init__(self, bucket_ms: int = BUCKET_MS, max_bytes: int = MAX_CACHED_BYTES):
+        self.bucket_ms = bucket_ms
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_window(self, patient_id: str, start_ms: int,
+                   end_ms: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the ECG and EEG bands of a window
+
+        Recorded EEG bands are used when the patient has any in the window,
+        bands derived from the ECG otherwise. The ECG is recorded when the
+        patient has any in the window; mock ECG only fills windows without
+        any recorded signal, so a patient with recorded EEG alone gets no ECG.
+
+        Args:
+            patient_id (str): The patient
+            start_ms (int): Start of the window in milliseconds
+            end_ms (int): End of the window in milliseconds (exclusive)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: ECG timestamps,
+                ECG values, EEG timestamps and EEG bands of shape (len(EEG_BANDS), n)
+        """
+        store = get_signal_store()
+        ecg_recorded = store.has_data(patient_id, 'ecg', start_ms, end_ms)
+        eeg_recorded = store.has_data(patient_id, EEG_BANDS[0], start_ms, end_ms)
+
+        if ecg_recorded:
+            ecg_source = SOURCE_RECORDED
+        else:
+            ecg_source = None if eeg_recorded else SOURCE_MOCK
+        eeg_source = SOURCE_RECORDED if eeg_recorded else SOURCE_DERIVED
+        now_ms = int(time.time() * 1000)
+
+        parts = []
+        for bucket_start in align_buckets(start_ms, end_ms, self.bucket_ms):
+            bucket_end = bucket_start + self.bucket_ms
+
+            if bucket_end > now_ms:
+                load_start, load_end = max(bucket_start, start_ms), min(bucket_end, end_ms, now_ms)
+                if load_start < load_end:
+                    parts.append(_load(patient_id, ecg_source, eeg_source, load_start, load_end))
+                continue
+
+            key = (patient_id, bucket_start, ecg_source, eeg_source, CONVERSION_VERSION)
+            entry = self._get(key)
+            if entry is None:
+                entry = _load(patient_id, ecg_source, eeg_source, bucket_start, bucket_end)
+                self._put(key, entry)
+            parts.append(entry)
+
+        if not parts:
+            return (np.empty(0, dtype=np.int64), np.empty(0),
+                    np.empty(0, dtype=np.int64), np.empty((len(EEG_BANDS), 0)))
+
+        ecg_timestamps, ecg_values, eeg_timestamps, bands = (
+            np.concatenate(column, axis=-1) for column in zip(*parts)
+        )
+        ecg_inside = (ecg_timestamps >= start_ms) & (ecg_timestamps < end_ms)
+        eeg_inside = (eeg_timestamps >= start_ms) & (eeg_timestamps < end_ms)
+        return ecg_timestamps[ecg_inside], ecg_values[ecg_inside], eeg_timestamps[eeg_inside], bands[:, eeg_inside]
+
+    def invalidate(self, patient_id: str, start_ms: int, end_ms: int) -> None:
+        """
+        Drop cached buckets overlapping a time range, e.g. after new samples land in it
+
+        Args:
+            patient_id (str): The patient whose data changed
+            start_ms (int): Start of the changed range in milliseconds
+            end_ms (int): End of the changed range in milliseconds (exclusive)
+        """
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[0] == patient_id and key[1] < end_ms and key[1] + self.bucket_ms > start_ms
+            ]
+            for key in stale:
+                self._size -= self._weight(self._entries.pop(key))
+
+    def clear(self) -> None:
+        """
+        Drop all cached buckets
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _get(self, key) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        record_cache('derived_signals', entry is not None)
+        return entry
+
+    def _put(self, key, entry) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= self._weight(previous)
+
+            self._entries[key] = entry
+            self._size += self._weight(entry)
+
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self._weight(evicted)
+
+    @staticmethod
+    def _weight(entry) -> int:
+        return sum(array.nbytes for array in entry)
+
+
+derived_signals = DerivedSignalCache()
@@ -0,0 +1,142 @@
+import numpy as np
+
+# Supported downsampling methods
+METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(timestamps, values, max_points):
+    """
+    Select points with the Largest-Triangle-Three-Buckets algorithm
+
+    The series is split into max_points - 2 buckets between the first and last
+    point. From each bucket the point forming the largest triangle with the
+    previously selected point and the average of the next bucket is kept.
+    Triangle areas are computed for a whole bucket at once.
+
+    Args:
+        timestamps (array-like): Sample timestamps, ascending
+        values (array-like): Sample values
+        max_points (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Indices of the selected points, ascending
+    """
+    x = np.asarray(timestamps, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    n = len(x)
+
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    # Work relative to the first timestamp to keep areas well conditioned
+    x = x - x[0]
+
+    n_buckets = max_points - 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+    # Bucket averages from prefix sums
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    counts = edges[1:] - edges[:-1]
+    avg_x = (x_sums[edges[1:]] - x_sums[edges[:-1]]) / counts
+    avg_y = (y_sums[edges[1:]] - y_sums[edges[:-1]]) / counts
+
+    # The point after the last bucket is the last sample
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_buckets):
+        lo, hi = edges[i], edges[i + 1]
+        areas = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a]) -
+            (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(values, max_points):
+    """
+    Select the minimum and maximum point of each bucket (min/max envelope)
+
+    Args:
+        values (array-like): Sample values
+        max_points (int): Upper bound on the number of points to keep
+
+    Returns:
+        np.ndarray: Indices of the selected points, ascending
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+
+    if max_points >= n or max_points < 2:
+        return np.arange(n)
+
+    # Equal-width buckets padded with NaN so they can be reduced in one pass
+    size = -(-n // (max_points // 2))
+    n_buckets = -(-n // size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, size)
+
+    offsets = np.arange(n_buckets) * size
+    mins = offsets + np.nanargmin(padded, axis=1)
+    maxs = offsets + np.nanargmax(padded, axis=1)
+
+    return np.unique(np.concatenate((mins, maxs)))
+
+
+def downsample_indices(timestamps, values, max_points, method='lttb'):
+    """
+    Select at most max_points samples of a series for display
+
+    Args:
+        timestamps (array-like): Sample timestamps, ascending
+        values (array-like): Sample values; a 2D array (samples x fields) is
+            reduced to the sum of its fields before selection
+        max_points (int): Upper bound on the number of points to keep
+        method (str, optional): 'lttb' or 'minmax'. Defaults to 'lttb'.
+
+    Returns:
+        np.ndarray: Indices of the selected points, ascending
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 2:
+        values = values.sum(axis=1)
+
+    if method == 'minmax':
+        return minmax_indices(values, max_points)
+
+    return lttb_indices(timestamps, values, max_points)
+
+
+def downsample_rows(rows, fields, max_points, method='lttb'):
+    """
+    Downsample a list of per-sample dicts, keeping the selected dicts unchanged
+
+    Args:
+        rows (list): Data points with a 'timestamp' key, ascending
+        fields (list): Keys of the values used to select points
+        max_points (int): Upper bound on the number of points to keep
+        method (str, optional): 'lttb' or 'minmax'. Defaults to 'lttb'.
+
+    Returns:
+        list: The selected data points
+    """
+    if max_points is None or len(rows) <= max_points:
+        return rows
+
+    timestamps = np.fromiter((row['timestamp'] for row in rows), dtype=np.float64, count=len(rows))
+    values = np.array([[row[field] for field in fields] for row in rows], dtype=np.float64)
+
+    return [rows[i] for i in downsample_indices(timestamps, values, max_points, method)]
@@ -0,0 +1,104 @@
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+
+from services.eeg_ecg_conversion import EEG_BANDS
+from services.metrics import timed_stage
+
+# Frequency range of each wave band in Hz; bands can be overridden per call
+BAND_RANGES = {
+    'alpha': (8.0, 13.0),   # Relaxed, calm
+    'beta': (13.0, 30.0),   # Alert, active thinking
+    'theta': (4.0, 8.0),    # Drowsy, meditative
+    'delta': (0.5, 4.0)     # Deep sleep
+}
+
+# Channel name given to single-channel EEG, such as the ECG-derived bands
+DEFAULT_CHANNEL = 'eeg'
+
+
+class EEGArray:
+    """
+    Band values of a multi-channel EEG recording
+
+    Holds a (n_channels x n_bands x n_windows) array together with the
+    channel names, band names and the start timestamp of each window, so
+    that processing scales with array operations rather than per-channel
+    or per-band code.
+    """
+
+    def __init__(self, data: np.ndarray, timestamps, channels: Sequence[str],
+                 bands: Sequence[str] = EEG_BANDS):
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim != 3 or data.shape[:2] != (len(channels), len(bands)):
+            raise ValueError('data must have shape (n_channels, n_bands, n_windows)')
+        if data.shape[2] != len(timestamps):
+            raise ValueError('timestamps must have one entry per window')
+
+        self.data = data
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.channels = list(channels)
+        self.bands = list(bands)
+
+    @property
+    def n_windows(self) -> int:
+        return self.data.shape[2]
+
+    @classmethod
+    def from_points(cls, eeg_data: List[Dict], bands: Sequence[str] = EEG_BANDS,
+                    channel: str = DEFAULT_CHANNEL) -> 'EEGArray':
+        """
+        Build a single-channel array from EEG data points
+
+        Args:
+            eeg_data (list): List of EEG data points with a value per band
+            bands (Sequence[str], optional): The bands to take from each point
+            channel (str, optional): Name of the channel
+
+        Returns:
+            EEGArray: Array of shape (1, n_bands, n_points)
+        """
+        data = np.array([[point[band] for band in bands] for point in eeg_data], dtype=np.float64)
+        data = data.reshape(len(eeg_data), len(bands)).T[np.newaxis]
+        return cls(data, [point['timestamp'] for point in eeg_data], [channel], bands)
+
+
+@timed_stage('band_powers')
+def band_powers(samples, sample_rate: float, start_ms: int, channels: Sequence[str],
+                window_samples: int, bands: Dict[str, Tuple[float, float]] = None) -> EEGArray:
+    """
+    Compute band powers of raw multi-channel EEG over consecutive windows
+
+    Every channel and window is transformed in one FFT, and the power
+    spectrum is reduced to bands with a single matrix product.
+
+    Args:
+        samples (array-like): Raw samples of shape (n_channels, n_samples)
+        sample_rate (float): Samples per second
+        start_ms (int): Timestamp of the first sample in milliseconds
+        channels (Sequence[str]): Channel names
+        window_samples (int): Samples per window; a trailing partial window is dropped
+        bands (Dict[str, Tuple[float, float]], optional): Frequency range per band in Hz
+
+    Returns:
+        EEGArray: Band powers of shape (n_channels, n_bands, n_windows)
+    """
+    bands = bands or BAND_RANGES
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim != 2 or samples.shape[0] != len(channels):
+        raise ValueError('samples must have shape (n_channels, n_samples)')
+
+    n_windows = samples.shape[1] // window_samples
+    windows = samples[:, :n_windows * window_samples].reshape(len(channels), n_windows, window_samples)
+
+    # Remove each window's offset and taper it before the transform
+    windows = (windows - windows.mean(axis=2, keepdims=True)) * np.hanning(window_samples)
+    power = np.abs(np.fft.rfft(windows, axis=2)) ** 2
+
+    freqs = np.fft.rfftfreq(window_samples, 1 / sample_rate)
+    masks = np.array([(freqs >= low) & (freqs < high) for low, high in bands.values()], dtype=np.float64)
+
+    # (channels, windows, freqs) x (freqs, bands) -> (channels, bands, windows)
+    data = (power @ masks.T).transpose(0, 2, 1) / window_samples
+
+    timestamps = start_ms + np.round(np.arange(n_windows) * window_samples * 1000 / sample_rate)
+    return EEGArray(data, timestamps.astype(np.int64), channels, list(bands))
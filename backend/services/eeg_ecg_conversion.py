@@ -2,6 +2,13 @@ import numpy as np
 import math
 from datetime import datetime
 
+# EEG wave bands produced by the conversion, in output order
+EEG_BANDS = ('alpha', 'beta', 'theta', 'delta')
+
+# Version of the conversion model; bump whenever the transformation changes
+# so that cached derived signals computed by older versions are not served
+CONVERSION_VERSION = '1'
+
 def convert_ecg_to_eeg(ecg_value):
     """
     Transforms ECG data to EEG data using a simplified model
@@ -39,6 +46,32 @@ def convert_ecg_to_eeg(ecg_value):
         'delta': abs(ecg_value) * 0.2 + math.sin(timestamp * 0.0002) * 0.1 + random_factor
     }
 
+def convert_ecg_array_to_eeg(ecg_values):
+    """
+    Transforms a block of ECG values to EEG data with the same model as
+    convert_ecg_to_eeg, computed for all values at once
+    
+    Args:
+        ecg_values (array-like): The ECG values to transform
+    
+    Returns:
+        np.ndarray: Array of shape (len(EEG_BANDS), n) with one row per wave band
+    """
+    magnitude = np.abs(np.asarray(ecg_values, dtype=np.float64))
+    
+    # Add some randomness to make it look more realistic
+    random_factor = np.random.random(len(magnitude)) * 0.2
+    
+    # Current timestamp for time-based variations
+    timestamp = datetime.now().timestamp()
+    
+    return np.stack([
+        magnitude * 0.7 + random_factor,
+        magnitude * 0.5 + math.sin(timestamp * 0.001) * 0.2 + random_factor,
+        magnitude * 0.3 + math.cos(timestamp * 0.0005) * 0.15 + random_factor,
+        magnitude * 0.2 + math.sin(timestamp * 0.0002) * 0.1 + random_factor
+    ])
+
 def detect_ecg_eeg_anomaly(ecg_value, eeg_values):
     """
     Detects anomalies in the ECG-EEG relationship
@@ -0,0 +1,159 @@
+import os
+import time
+import secrets
+import requests
+from urllib.parse import urlencode
+from typing import Dict, Any, List, Optional
+
+# Google Fit API scopes requested when connecting
+SCOPES = [
+    'https://www.googleapis.com/auth/fitness.heart_rate.read',
+    'https://www.googleapis.com/auth/fitness.activity.read',
+    'https://www.googleapis.com/auth/fitness.body.read'
+]
+
+# Data source holding the merged heart rate samples of a user
+HEART_RATE_SOURCE = 'derived:com.google.heart_rate.bpm:com.google.android.gms:merge_heart_rate_bpm'
+
+# Window synced when the request does not specify one
+DEFAULT_SYNC_MS = 24 * 60 * 60 * 1000
+
+# Seconds to wait for the Google Fit API before giving up
+REQUEST_TIMEOUT = 30
+
+class GoogleFitService:
+    """
+    Service for connecting to the Google Fit API and syncing heart rate data
+    """
+
+    def __init__(self):
+        self.client_id = os.environ.get('GOOGLE_FIT_CLIENT_ID', '')
+        self.redirect_uri = os.environ.get('GOOGLE_FIT_REDIRECT_URI', 'http://localhost:5000/api/google-fit/callback')
+        self.api_url = os.environ.get('GOOGLE_FIT_API_URL', 'https://www.googleapis.com/fitness/v1/users/me')
+        self.access_token = os.environ.get('GOOGLE_FIT_ACCESS_TOKEN', '')
+        # The API is only called once an endpoint is configured explicitly;
+        # until then mock heart rate data is returned
+        self.call_api = 'GOOGLE_FIT_API_URL' in os.environ
+        self.last_sync = None
+        self._state = None
+
+    def get_authorization_url(self) -> str:
+        """
+        Get the URL that starts the OAuth flow
+
+        Returns:
+            str: The Google authorization URL
+        """
+        self._state = secrets.token_urlsafe(16)
+        params = {
+            'client_id': self.client_id,
+            'redirect_uri': self.redirect_uri,
+            'response_type': 'code',
+            'scope': ' '.join(SCOPES),
+            'access_type': 'offline',
+            'state': self._state
+        }
+        return f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
+
+    def exchange_code_for_token(self, code: str, state: Optional[str] = None) -> str:
+        """
+        Exchange an authorization code for an access token
+
+        Args:
+            code (str): The authorization code from the callback
+            state (str, optional): The state parameter from the callback
+
+        Returns:
+            str: The access token
+        """
+        if self._state and state != self._state:
+            raise ValueError("Invalid state parameter")
+
+        # In a real application, this would post the code to the token endpoint
+        # For now, we'll keep a token derived from the code in memory
+        self.access_token = f'mock-token-{code}'
+        self._state = None
+        return self.access_token
+
+    def revoke_token(self) -> None:
+        """
+        Revoke the access token
+        """
+        # In a real application, this would also call the revocation endpoint
+        self.access_token = ''
+
+    def sync_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Sync heart rate data from Google Fit
+
+        Args:
+            start_time (int, optional): Start of the window in milliseconds.
+                Defaults to a day before end_time.
+            end_time (int, optional): End of the window in milliseconds. Defaults to now.
+
+        Returns:
+            Dict[str, Any]: The synced window and its heart rate samples
+        """
+        end_time = int(end_time) if end_time is not None else int(time.time() * 1000)
+        start_time = int(start_time) if start_time is not None else end_time - DEFAULT_SYNC_MS
+
+        if self.call_api:
+            heart_rate = self._fetch_heart_rate(start_time, end_time)
+        else:
+            # In a real application, every sync would call the Google Fit API
+            # For now, without a configured endpoint, we'll return mock heart rate data
+            heart_rate = [
+                {'timestamp': timestamp, 'value': round(70 + 10 * ((timestamp // 60000) % 7) / 6)}
+                for timestamp in range(start_time - start_time % 60000, end_time, 60000)
+                if timestamp >= start_time
+            ]
+
+        self.last_sync = int(time.time() * 1000)
+        return {
+            'startTime': start_time,
+            'endTime': end_time,
+            'points': len(heart_rate),
+            'heartRate': heart_rate
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get the connection status
+
+        Returns:
+            Dict[str, Any]: Whether a token is held and when data was last synced
+        """
+        return {
+            'connected': bool(self.access_token),
+            'lastSync': self.last_sync
+        }
+
+    def _fetch_heart_rate(self, start_time: int, end_time: int) -> List[Dict[str, Any]]:
+        """
+        Read the heart rate dataset of a window from the Google Fit API
+
+        Args:
+            start_time (int): Start of the window in milliseconds
+            end_time (int): End of the window in milliseconds
+
+        Returns:
+            List[Dict[str, Any]]: Heart rate samples with timestamp and value
+        """
+        url = f"{self.api_url}/dataSources/{HEART_RATE_SOURCE}/datasets/{start_time * 1000000}-{end_time * 1000000}"
+        headers = {'Authorization': f'Bearer {self.access_token}'} if self.access_token else {}
+
+        try:
+            response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+
+            return [
+                {
+                    'timestamp': int(point['startTimeNanos']) // 1000000,
+                    'value': point['value'][0]['fpVal']
+                }
+                for point in response.json().get('point', [])
+                if point.get('value')
+            ]
+        except Exception as e:
+            print(f"Error calling Google Fit API: {e}")
+            raise
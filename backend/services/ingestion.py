@@ -0,0 +1,168 @@
+import time
+import numpy as np
+from typing import Dict, Any
+
+from services.eeg_ecg_conversion import EEG_BANDS
+from services.signal_store import get_signal_store
+from services.anomaly_store import get_anomaly_store
+from services.result_cache import result_cache
+from services.derived_signals import derived_signals
+from services.streaming_detection import streaming_detector
+from services.baselines import get_baseline_store
+from services.summaries import record_heart_rate
+from services.live_feed import live_feed
+from services.metrics import registry, timed, record_samples
+
+# Channels accepted by the ingestion API
+CHANNELS = ('ecg',) + EEG_BANDS
+
+# Samples are buffered per channel and written in batches of this size
+INGEST_BATCH_SIZE = 50000
+
+ingested_samples = registry.counter(
+    'neurocard_ingested_samples_total', 'Samples appended through the ingestion API', ['channel'])
+ingest_lag = registry.histogram(
+    'neurocard_ingest_lag_seconds', 'Delay between the newest sample of a batch and its ingestion',
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 3600, 86400))
+
+
+class IngestionError(ValueError):
+    """
+    Raised when a batch of samples fails validation
+    """
+
+
+def validate_batch(channel: str, timestamps: np.ndarray, values: np.ndarray) -> None:
+    """
+    Check a batch of samples before it is written
+
+    Args:
+        channel (str): The channel name
+        timestamps (np.ndarray): Sample timestamps in milliseconds
+        values (np.ndarray): Sample values
+
+    Raises:
+        IngestionError: If the batch is invalid
+    """
+    if channel not in CHANNELS:
+        raise IngestionError(f"Unknown channel '{channel}'; expected one of: {', '.join(CHANNELS)}")
+    if len(timestamps) != len(values):
+        raise IngestionError('timestamps and values must have the same length')
+    if not np.all(np.isfinite(values)):
+        raise IngestionError('values must be finite numbers')
+    if len(timestamps) > 1 and not np.all(np.diff(timestamps) > 0):
+        raise IngestionError('timestamps must be strictly increasing')
+
+
+def ingest_batch(patient_id: str, channel: str, timestamps, values) -> Dict[str, Any]:
+    """
+    Validate a batch of samples, append it to the signal store and run streaming detection
+
+    Cached and stored anomaly results for the affected window are
+    invalidated, since they were computed without these samples. The
+    samples are judged against the patient's baseline as it was before
+    them, then folded into it. Samples and anomalies are pushed to live
+    subscribers of the patient.
+
+    Args:
+        patient_id (str): The patient the samples belong to
+        channel (str): 'ecg' or an EEG band name
+        timestamps (array-like): Sample timestamps in milliseconds, ascending
+        values (array-like): Sample values
+
+    Returns:
+        Dict[str, Any]: Number of samples written and anomalies detected
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+
+    validate_batch(channel, timestamps, values)
+
+    if len(timestamps) == 0:
+        return {'samples': 0, 'anomalies': 0}
+
+    with timed('ingest'):
+        get_signal_store().append(patient_id, channel, timestamps, values)
+        if channel == 'ecg':
+            record_heart_rate(patient_id, timestamps, values)
+
+    start_ms = int(timestamps[0])
+    end_ms = int(timestamps[-1]) + 1
+    result_cache.invalidate(patient_id, start_ms, end_ms)
+    derived_signals.invalidate(patient_id, start_ms, end_ms)
+
+    store = get_anomaly_store()
+    store.invalidate_windows(patient_id, start_ms, end_ms)
+
+    baselines = get_baseline_store()
+    with timed('streaming_detection'):
+        anomalies = streaming_detector.feed(
+            patient_id, channel, timestamps, values, baselines.profile(patient_id, channel))
+    if anomalies:
+        store.add(patient_id, anomalies)
+
+    # Push the new samples and anomalies to live subscribers
+    with timed('push'):
+        if live_feed.has_subscribers(patient_id):
+            live_feed.publish(patient_id, {
+                'type': 'samples',
+                'channel': channel,
+                'timestamps': timestamps.tolist(),
+                'values': values.tolist()
+            })
+            for anomaly in anomalies:
+                live_feed.publish(patient_id, {'type': 'anomaly', 'anomaly': anomaly})
+
+    with timed('baseline_update'):
+        baselines.update(patient_id, channel, timestamps, values)
+
+    ingested_samples.inc(len(timestamps), channel=channel)
+    ingest_lag.observe(max(time.time() - end_ms / 1000, 0))
+    record_samples('ingest', len(timestamps))
+
+    return {'samples': len(timestamps), 'anomalies': len(anomalies)}
+
+
+class BatchWriter:
+    """
+    Buffers samples per channel and ingests them in large batches
+    """
+
+    def __init__(self, patient_id: str, batch_size: int = INGEST_BATCH_SIZE):
+        self.patient_id = patient_id
+        self.batch_size = batch_size
+        self.samples = 0
+        self.anomalies = 0
+        self._buffers = {}
+
+    def add(self, channel: str, timestamps, values) -> None:
+        """
+        Buffer samples for a channel, ingesting the buffer once it is full
+
+        Args:
+            channel (str): The channel name
+            timestamps (list): Sample timestamps in milliseconds
+            values (list): Sample values
+        """
+        if channel not in CHANNELS:
+            raise IngestionError(f"Unknown channel '{channel}'; expected one of: {', '.join(CHANNELS)}")
+
+        buffered_timestamps, buffered_values = self._buffers.setdefault(channel, ([], []))
+        buffered_timestamps.extend(timestamps)
+        buffered_values.extend(values)
+
+        if len(buffered_timestamps) >= self.batch_size:
+            self._flush_channel(channel)
+
+    def flush(self) -> None:
+        """
+        Ingest everything still buffered
+        """
+        for channel in list(self._buffers):
+            self._flush_channel(channel)
+
+    def _flush_channel(self, channel):
+        timestamps, values = self._buffers.pop(channel)
+        result = ingest_batch(self.patient_id, channel, timestamps, values)
+        self.samples += result['samples']
+        self.anomalies += result['anomalies']
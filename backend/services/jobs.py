@@ -0,0 +1,220 @@
+import os
+import math
+import time
+import uuid
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Hashable
+
+from services.metrics import registry, timed
+
+# Number of background worker threads
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+
+# Finished jobs kept for their results to be fetched; results can be large
+JOB_HISTORY = int(os.environ.get('JOB_HISTORY', 20))
+
+# Unfinished jobs allowed per client and across all clients
+JOB_CLIENT_LIMIT = int(os.environ.get('JOB_CLIENT_LIMIT', 2))
+JOB_QUEUE_LIMIT = int(os.environ.get('JOB_QUEUE_LIMIT', 32))
+
+job_events = registry.counter(
+    'neurocard_jobs_total', 'Background jobs by kind and outcome', ['kind', 'status'])
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobLimitExceeded(Exception):
+    """
+    Raised when a client, or the queue as a whole, has too many unfinished jobs
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Too many background jobs, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    A unit of background work and its outcome
+    """
+
+    def __init__(self, kind: str, func: Callable, args: tuple, key: Optional[Hashable], client_id: str):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.key = key
+        self.client_id = client_id
+        self.func = func
+        self.args = args
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        job = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'createdAt': int(self.created_at * 1000),
+            'finishedAt': int(self.finished_at * 1000) if self.finished_at else None
+        }
+        if self.status == FAILED:
+            job['error'] = self.error
+        if include_result and self.status == DONE:
+            job['result'] = self.result
+        return job
+
+
+class JobQueue:
+    """
+    In-process background job queue served by a fixed pool of worker threads
+
+    Requests too expensive to answer inline are submitted here and polled
+    through /api/jobs/<id>. Jobs submitted with a key that matches a job
+    still queued or running share that job instead of computing the same
+    result twice. Each client may have a few unfinished jobs and the queue
+    as a whole a bounded number; past either limit submissions are refused
+    with a retry hint from the recent job durations. Finished jobs are kept
+    for a bounded number of later jobs.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY,
+                 client_limit: int = JOB_CLIENT_LIMIT, queue_limit: int = JOB_QUEUE_LIMIT):
+        self.history = history
+        self.client_limit = client_limit
+        self.queue_limit = queue_limit
+        self._jobs = OrderedDict()
+        self._active_keys = {}
+        self._active_clients = {}
+        self._active = 0
+        self._job_seconds = 1.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True).start()
+
+    def submit(self, kind: str, func: Callable, *args, key: Optional[Hashable] = None,
+               client_id: str = 'anonymous') -> Job:
+        """
+        Queue a function call as a background job
+
+        Args:
+            kind (str): Kind of job, for reporting
+            func (Callable): The function to run
+            *args: Arguments to call it with
+            key (Hashable, optional): Identifies the work, so duplicates are merged
+            client_id (str, optional): The client the job counts against
+
+        Returns:
+            Job: The new job, or the pending job with the same key
+
+        Raises:
+            JobLimitExceeded: If the client or the queue has too many unfinished jobs
+        """
+        with self._lock:
+            if key is not None and key in self._active_keys:
+                return self._active_keys[key]
+
+            if (self._active >= self.queue_limit
+                    or self._active_clients.get(client_id, 0) >= self.client_limit):
+                job_events.inc(kind=kind, status='rejected')
+                # Roughly when a worker frees up for the jobs ahead
+                raise JobLimitExceeded(max(1, int(math.ceil(self._job_seconds))))
+
+            job = Job(kind, func, args, key, client_id)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active_keys[key] = job
+            self._active += 1
+            self._active_clients[client_id] = self._active_clients.get(client_id, 0) + 1
+            self._evict()
+
+        job_events.inc(kind=kind, status=QUEUED)
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Look up a job by ID
+
+        Args:
+            job_id (str): ID of the job
+
+        Returns:
+            Optional[Job]: The job, or None if it is unknown or was evicted
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending(self) -> int:
+        """
+        Get the number of jobs waiting for a worker
+
+        Returns:
+            int: Queued job count
+        """
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = RUNNING
+
+            try:
+                with timed(f'job_{job.kind}'):
+                    job.result = job.func(*job.args)
+                job.status = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+
+            job.finished_at = time.time()
+            job.func = job.args = None
+            job_events.inc(kind=job.kind, status=job.status)
+
+            with self._lock:
+                if job.key is not None and self._active_keys.get(job.key) is job:
+                    del self._active_keys[job.key]
+                self._active -= 1
+                remaining = self._active_clients.get(job.client_id, 0) - 1
+                if remaining > 0:
+                    self._active_clients[job.client_id] = remaining
+                else:
+                    self._active_clients.pop(job.client_id, None)
+
+                # Moving average of job durations, for the retry hint
+                self._job_seconds = 0.8 * self._job_seconds + 0.2 * (job.finished_at - job.created_at)
+                self._evict()
+
+    def _evict(self):
+        # Drop the oldest finished jobs beyond the history limit
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (DONE, FAILED)]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Get the process-wide job queue, starting its workers on first use
+
+    Returns:
+        JobQueue: The shared job queue
+    """
+    global _queue
+
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+
+    return _queue
@@ -0,0 +1,126 @@
+import json
+import queue
+import threading
+from typing import Dict, Any, Iterator
+
+from services.metrics import registry
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+dropped_events = registry.counter(
+    'neurocard_live_feed_dropped_events_total', 'Events dropped because a subscriber fell behind')
+
+
+class LiveFeed:
+    """
+    In-process publish/subscribe hub pushing new samples and anomalies to clients
+
+    Every subscriber gets a bounded queue; a subscriber that falls behind
+    loses its oldest events rather than slowing down ingestion.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, patient_id: str) -> queue.Queue:
+        """
+        Start receiving the events of a patient
+
+        Args:
+            patient_id (str): The patient
+
+        Returns:
+            queue.Queue: Queue the events are delivered to
+        """
+        subscriber = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(patient_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, patient_id: str, subscriber: queue.Queue) -> None:
+        """
+        Stop delivering events to a subscriber
+
+        Args:
+            patient_id (str): The patient
+            subscriber (queue.Queue): Queue returned by subscribe
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(patient_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(patient_id, None)
+
+    def has_subscribers(self, patient_id: str) -> bool:
+        """
+        Check whether anyone is listening to a patient
+
+        Args:
+            patient_id (str): The patient
+
+        Returns:
+            bool: True if the patient has at least one subscriber
+        """
+        with self._lock:
+            return bool(self._subscribers.get(patient_id))
+
+    def publish(self, patient_id: str, event: Dict[str, Any]) -> int:
+        """
+        Deliver an event to every subscriber of a patient
+
+        Args:
+            patient_id (str): The patient
+            event (Dict[str, Any]): JSON-serializable event
+
+        Returns:
+            int: Number of subscribers the event was delivered to
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(patient_id, ()))
+
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                        dropped_events.inc()
+                    except queue.Empty:
+                        pass
+
+        return len(subscribers)
+
+    def stream(self, patient_id: str) -> Iterator[str]:
+        """
+        Yield the events of a patient as server-sent events until the client disconnects
+
+        Args:
+            patient_id (str): The patient
+
+        Yields:
+            str: Server-sent event messages
+        """
+        subscriber = self.subscribe(patient_id)
+        try:
+            # Send something right away so the response headers go out
+            yield ': connected\n\n'
+            while True:
+                try:
+                    event = subscriber.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            self.unsubscribe(patient_id, subscriber)
+
+
+live_feed = LiveFeed()
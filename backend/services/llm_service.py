@@ -1,7 +1,9 @@
 import os
 import json
 import requests
+from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
+from services.metrics import timed_stage
 
 class LLMService:
     """
@@ -11,7 +13,10 @@ class LLMService:
     def __init__(self):
         self.api_key = os.environ.get('LLM_API_KEY', '')
         self.model = os.environ.get('LLM_MODEL', 'nvidia/llama3-70b-instruct')
-        self.api_url = 'https://openrouter.ai/api/v1/chat/completions'
+        self.api_url = os.environ.get('LLM_API_URL', 'https://openrouter.ai/api/v1/chat/completions')
+        # The API is only called once an endpoint is configured explicitly;
+        # until then the mock responses below are returned
+        self.call_api = 'LLM_API_URL' in os.environ
     
     def set_api_key(self, api_key: str) -> None:
         """
@@ -33,12 +38,18 @@ class LLMService:
         """
         self.model = model
     
-    def generate_health_recommendations(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_health_recommendations(
+        self, 
+        data: Dict[str, Any], 
+        summaries: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
         """
         Generate health recommendations based on health data
         
         Args:
             data (Dict[str, Any]): The health data to analyze
+            summaries (List[Dict[str, Any]], optional): Materialized daily or hourly
+                summaries of the patient, used instead of raw series when given
         
         Returns:
             Dict[str, Any]: The generated recommendations
@@ -53,10 +64,14 @@ class LLMService:
         user_profile = data.get('userProfile', {})
         
         # Create prompt for the LLM
-        prompt = self._create_health_recommendations_prompt(ecg_data, eeg_data, anomalies, user_profile)
+        prompt = self._create_health_recommendations_prompt(ecg_data, eeg_data, anomalies, user_profile, summaries)
+        
+        if self.call_api:
+            return self._parse_response(self._call_llm_api(prompt), 'analysis',
+                                        {'recommendations': [], 'warningSigns': []})
         
-        # In a real application, this would call the LLM API
-        # For now, we'll return mock recommendations
+        # In a real application, every request would call the LLM API
+        # For now, without a configured endpoint, we'll return mock recommendations
         
         # Mock response for demonstration
         return {
@@ -120,8 +135,13 @@ class LLMService:
         # Create prompt for the LLM
         prompt = self._create_anomaly_analysis_prompt(anomaly)
         
-        # In a real application, this would call the LLM API
-        # For now, we'll return mock analysis
+        if self.call_api:
+            return self._parse_response(self._call_llm_api(prompt), 'explanation', {
+                'possibleCauses': [], 'riskFactors': [], 'recommendations': [], 'medicalAttention': ''
+            })
+        
+        # In a real application, every request would call the LLM API
+        # For now, without a configured endpoint, we'll return mock analysis
         
         # Mock response for demonstration
         return {
@@ -155,7 +175,8 @@ class LLMService:
         ecg_data: List[Dict[str, Any]], 
         eeg_data: List[Dict[str, Any]], 
         anomalies: List[Dict[str, Any]], 
-        user_profile: Dict[str, Any]
+        user_profile: Dict[str, Any],
+        summaries: Optional[List[Dict[str, Any]]] = None
     ) -> str:
         """
         Create a prompt for health recommendations
@@ -165,6 +186,7 @@ class LLMService:
             eeg_data (List[Dict[str, Any]]): The EEG data
             anomalies (List[Dict[str, Any]]): The detected anomalies
             user_profile (Dict[str, Any]): The user profile
+            summaries (List[Dict[str, Any]], optional): Daily or hourly health summaries
         
         Returns:
             str: The prompt for the LLM
@@ -191,9 +213,16 @@ class LLMService:
                 prompt += f"Medications: {', '.join(user_profile['medications'])}\n"
             prompt += "\n"
         
-        # Add data summary to the prompt
-        prompt += f"ECG Data Points: {len(ecg_data)}\n"
-        prompt += f"EEG Data Points: {len(eeg_data)}\n\n"
+        # Add the materialized summaries to the prompt; they describe the
+        # trends compactly, so raw series are only counted without them
+        if summaries:
+            prompt += "Health Summaries:\n"
+            for summary in summaries:
+                prompt += self._format_summary(summary) + "\n"
+            prompt += "\n"
+        else:
+            prompt += f"ECG Data Points: {len(ecg_data)}\n"
+            prompt += f"EEG Data Points: {len(eeg_data)}\n\n"
         
         # Add request for recommendations
         prompt += "Please provide:\n"
@@ -203,6 +232,36 @@ class LLMService:
         
         return prompt
     
+    def _format_summary(self, summary: Dict[str, Any]) -> str:
+        """
+        Format one health summary as a single prompt line
+        
+        Args:
+            summary (Dict[str, Any]): The summary of one period
+        
+        Returns:
+            str: The formatted summary
+        """
+        start = datetime.fromtimestamp(summary['timestamp'] / 1000, tz=timezone.utc)
+        parts = [start.strftime('%Y-%m-%d %H:%M UTC')]
+        
+        anomalies = summary['anomalies']
+        if anomalies['total']:
+            by_type = ', '.join(f"{count} {type}" for type, count in sorted(anomalies['byType'].items()))
+            by_severity = ', '.join(f"{count} {severity}" for severity, count in sorted(anomalies['bySeverity'].items()))
+            parts.append(f"{anomalies['total']} anomalies ({by_type}; {by_severity})")
+        else:
+            parts.append("no anomalies")
+        
+        heart_rate = summary.get('heartRate')
+        if heart_rate:
+            parts.append(f"heart rate {heart_rate['mean']:.0f} bpm (range {heart_rate['min']:.0f}-{heart_rate['max']:.0f})")
+        
+        for band, power in sorted(summary.get('bandPower', {}).items()):
+            parts.append(f"{band} {power['mean']:.2f}")
+        
+        return '- ' + ', '.join(parts)
+    
     def _create_anomaly_analysis_prompt(self, anomaly: Dict[str, Any]) -> str:
         """
         Create a prompt for anomaly analysis
@@ -232,6 +291,29 @@ class LLMService:
         
         return prompt
     
+    def _parse_response(self, content: str, text_field: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turn the content of an LLM reply into the response structure
+        
+        Args:
+            content (str): The reply, either a JSON object or free text
+            text_field (str): Field that holds the reply when it is free text
+            defaults (Dict[str, Any]): Values of the fields the reply does not fill
+        
+        Returns:
+            Dict[str, Any]: The structured response
+        """
+        try:
+            parsed = json.loads(content)
+        except ValueError:
+            parsed = None
+        
+        if not isinstance(parsed, dict):
+            parsed = {text_field: content}
+        
+        return {**defaults, **parsed}
+    
+    @timed_stage('llm_api')
     def _call_llm_api(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
         Call the LLM API with the given prompt
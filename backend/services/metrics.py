@@ -0,0 +1,301 @@
+import os
+import io
+import time
+import random
+import pstats
+import cProfile
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+# Default histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SAMPLE_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+BYTE_BUCKETS = (1024, 10240, 102400, 1048576, 10485760, 104857600)
+
+# Fraction of requests to profile; 0 disables the profiler
+PROFILE_SAMPLE_RATE = float(os.environ.get('NEUROCARD_PROFILE_SAMPLE_RATE', 0))
+
+# Number of request profiles kept in memory
+PROFILE_HISTORY = 20
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets and optional labels
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels + ('le',), key + (repr(float(bound)),))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _format_labels(self.labels + ('le',), key + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics rendered together in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, labels, buckets))
+
+    def _register(self, name, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_duration = registry.histogram(
+    'neurocard_stage_duration_seconds', 'Time spent in each processing stage', ['stage'])
+stage_samples = registry.histogram(
+    'neurocard_stage_samples', 'Number of samples handled per stage call', ['stage'], SAMPLE_BUCKETS)
+response_bytes = registry.histogram(
+    'neurocard_response_bytes', 'Size of serialized response payloads', ['endpoint'], BYTE_BUCKETS)
+cache_requests = registry.counter(
+    'neurocard_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+
+
+# Per-thread stage durations collected by collect_stage_times
+_collector = threading.local()
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Record the duration of a block under the given stage name
+
+    Can be used as a context manager or, via timed_stage, as a decorator.
+
+    Args:
+        stage (str): The stage name
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_duration.observe(elapsed, stage=stage)
+
+        collected = getattr(_collector, 'stages', None)
+        if collected is not None:
+            collected[stage] = collected.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_stage_times():
+    """
+    Collect the durations of the stages timed by the current thread inside a block
+
+    Yields:
+        dict: Seconds spent per stage name, filled in as stages complete
+    """
+    previous = getattr(_collector, 'stages', None)
+    _collector.stages = {}
+    try:
+        yield _collector.stages
+    finally:
+        _collector.stages = previous
+
+
+def timed_stage(stage: str):
+    """
+    Decorator recording the duration of every call under the given stage name
+
+    Args:
+        stage (str): The stage name
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_samples(stage: str, count: int) -> None:
+    """
+    Record how many samples a stage handled
+
+    Args:
+        stage (str): The stage name
+        count (int): Number of samples
+    """
+    stage_samples.observe(count, stage=stage)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """
+    Record a cache lookup
+
+    Args:
+        cache (str): The cache name
+        hit (bool): Whether the lookup was a hit
+    """
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+class RequestProfiler:
+    """
+    Opt-in profiler for a random sample of requests
+
+    A fraction of requests (NEUROCARD_PROFILE_SAMPLE_RATE) is run under
+    cProfile, as is any request with ?profile=1 while profiling is enabled.
+    Only one profile can be active in the process at a time, so requests
+    sampled while another is being profiled run unprofiled. The top
+    functions by cumulative time of the most recent profiles are kept in
+    memory.
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, history: int = PROFILE_HISTORY):
+        self.sample_rate = sample_rate
+        self.profiles = deque(maxlen=history)
+        self._local = threading.local()
+        self._busy = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self, path: str, forced: bool = False) -> None:
+        if not self.enabled or not (forced or random.random() < self.sample_rate):
+            return
+
+        # Python 3.12+ refuses a second concurrent profiler, so skip rather than fail the request
+        if not self._busy.acquire(blocking=False):
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiling tool, e.g. a debugger, holds the profiler
+            self._busy.release()
+            return
+        self._local.active = (profile, path, time.time())
+
+    def stop(self) -> Optional[Dict]:
+        active = getattr(self._local, 'active', None)
+        if active is None:
+            return None
+
+        self._local.active = None
+        profile, path, started = active
+        profile.disable()
+        self._busy.release()
+
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats('cumulative').print_stats(30)
+
+        entry = {
+            'path': path,
+            'started': started,
+            'duration': time.time() - started,
+            'stats': output.getvalue()
+        }
+        self.profiles.append(entry)
+        return entry
+
+
+profiler = RequestProfiler()
+
+
+def install_request_profiler(app) -> None:
+    """
+    Hook the request profiler into a Flask app
+
+    Args:
+        app (Flask): The application
+    """
+    from flask import request
+
+    @app.before_request
+    def _start_profile():
+        profiler.start(request.path, forced=request.args.get('profile') == '1')
+
+    @app.teardown_request
+    def _stop_profile(exc=None):
+        profiler.stop()
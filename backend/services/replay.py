@@ -0,0 +1,216 @@
+import time
+import threading
+import numpy as np
+from typing import Dict, Any, List, Optional, Sequence
+
+from services.eeg_ecg_conversion import convert_ecg_array_to_eeg, EEG_BANDS
+from services.signal_store import get_signal_store
+from services.ingestion import ingest_batch, CHANNELS
+from services.metrics import timed, collect_stage_times
+
+# Recording time emitted per chunk, in milliseconds
+DEFAULT_CHUNK_MS = 1000
+
+
+def _percentiles(values) -> Dict[str, float]:
+    if len(values) == 0:
+        return {'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {'p50': float(p50), 'p95': float(p95), 'max': float(np.max(values))}
+
+
+def load_recording(patient_id: str, channels: Optional[Sequence[str]] = None,
+                   start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, tuple]:
+    """
+    Read a stored recording from the signal store
+
+    Args:
+        patient_id (str): The patient whose recording to read
+        channels (Sequence[str], optional): Channels to read; every ingestible channel by default
+        start_ms (int, optional): Inclusive start of the recording in milliseconds
+        end_ms (int, optional): Exclusive end of the recording in milliseconds
+
+    Returns:
+        Dict[str, tuple]: (timestamps, values) per channel that has samples
+    """
+    store = get_signal_store()
+    recording = {}
+    for channel in channels or CHANNELS:
+        timestamps, values = store.read(patient_id, channel, start_ms, end_ms)
+        if len(timestamps):
+            recording[channel] = (timestamps, values)
+    return recording
+
+
+class Replay:
+    """
+    Re-emits a stored recording through the live pipeline at a chosen speed
+
+    The recording is cut into chunks of recording time. Each chunk is due
+    once its recording time has elapsed at the replay speed and is then
+    ingested (storage, streaming detection, baselines and push) under a
+    target patient, with timestamps shifted to start at the time the
+    replay started. ECG-only recordings are also converted to EEG bands,
+    which are ingested alongside. With no speed the chunks are emitted as
+    fast as the pipeline absorbs them.
+    """
+
+    def __init__(self, recording: Dict[str, tuple], target_patient: str,
+                 speed: Optional[float] = 1.0, chunk_ms: int = DEFAULT_CHUNK_MS,
+                 convert: bool = True):
+        if not recording:
+            raise ValueError('The recording has no samples')
+        if speed is not None and speed <= 0:
+            raise ValueError('speed must be positive')
+
+        self.recording = recording
+        self.target_patient = target_patient
+        self.speed = speed
+        self.chunk_ms = chunk_ms
+        self.convert = convert and 'ecg' in recording and not any(band in recording for band in EEG_BANDS)
+
+        self.start_ms = min(int(timestamps[0]) for timestamps, _ in recording.values())
+        self.end_ms = max(int(timestamps[-1]) for timestamps, _ in recording.values()) + 1
+
+    @property
+    def n_samples(self) -> int:
+        return sum(len(timestamps) for timestamps, _ in self.recording.values())
+
+    def run(self, stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Replay the recording and report how the pipeline kept up
+
+        Args:
+            stop (threading.Event, optional): Set to end the replay early
+
+        Returns:
+            Dict[str, Any]: Samples emitted, sustained samples per second, lag
+                behind the schedule and time spent per pipeline stage
+        """
+        n_chunks = -(-(self.end_ms - self.start_ms) // self.chunk_ms)
+        offset_ms = int(time.time() * 1000) - self.start_ms
+
+        # Chunk boundaries of every channel, found once up front
+        bounds = {
+            channel: np.searchsorted(timestamps, self.start_ms + np.arange(n_chunks + 1) * self.chunk_ms)
+            for channel, (timestamps, _) in self.recording.items()
+        }
+
+        lags = []
+        latencies = []
+        stage_totals = {}
+        samples = 0
+        anomalies = 0
+        started = time.perf_counter()
+
+        for k in range(n_chunks):
+            if stop is not None and stop.is_set():
+                break
+
+            # A chunk is due once its recording time has passed at the replay speed
+            if self.speed is not None:
+                due = started + (k + 1) * self.chunk_ms / 1000 / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                due = time.perf_counter()
+
+            lags.append(max(time.perf_counter() - due, 0.0))
+
+            with collect_stage_times() as stages:
+                for channel, (timestamps, values) in self.recording.items():
+                    low, high = bounds[channel][k], bounds[channel][k + 1]
+                    if low == high:
+                        continue
+
+                    chunk_timestamps = timestamps[low:high] + offset_ms
+                    chunk_values = values[low:high]
+                    result = ingest_batch(self.target_patient, channel, chunk_timestamps, chunk_values)
+                    samples += result['samples']
+                    anomalies += result['anomalies']
+
+                    if self.convert and channel == 'ecg':
+                        with timed('replay_convert'):
+                            bands = convert_ecg_array_to_eeg(chunk_values)
+                        for band, band_values in zip(EEG_BANDS, bands):
+                            result = ingest_batch(self.target_patient, band, chunk_timestamps, band_values)
+                            anomalies += result['anomalies']
+
+            latencies.append(time.perf_counter() - due)
+            for stage, seconds in stages.items():
+                stage_totals.setdefault(stage, []).append(seconds)
+
+        elapsed = time.perf_counter() - started
+        replayed_ms = min(len(lags) * self.chunk_ms, self.end_ms - self.start_ms)
+
+        return {
+            'targetPatient': self.target_patient,
+            'speed': self.speed,
+            'chunks': len(lags),
+            'samples': samples,
+            'anomalies': anomalies,
+            'recordingSeconds': replayed_ms / 1000,
+            'wallSeconds': elapsed,
+            'samplesPerSecond': samples / elapsed if elapsed else 0.0,
+            'realtimeFactor': replayed_ms / 1000 / elapsed if elapsed else 0.0,
+            'scheduleLag': _percentiles(lags),
+            'chunkLatency': _percentiles(latencies),
+            'stages': {
+                stage: {'totalSeconds': float(np.sum(seconds)), **_percentiles(seconds)}
+                for stage, seconds in sorted(stage_totals.items())
+            }
+        }
+
+
+def run_concurrent(recording: Dict[str, tuple], n_patients: int, speed: Optional[float] = 1.0,
+                   chunk_ms: int = DEFAULT_CHUNK_MS, target_prefix: str = 'replay',
+                   stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Replay the same recording as several live patients at once
+
+    Args:
+        recording (Dict[str, tuple]): (timestamps, values) per channel
+        n_patients (int): Number of patients replayed in parallel
+        speed (float, optional): Replay speed; None for as fast as possible
+        chunk_ms (int, optional): Recording time emitted per chunk in milliseconds
+        target_prefix (str, optional): Prefix of the target patient IDs
+        stop (threading.Event, optional): Set to end the replays early
+
+    Returns:
+        Dict[str, Any]: Combined throughput, the worst lag of any patient and
+            the per-patient reports
+    """
+    replays = [
+        Replay(recording, f'{target_prefix}-{i}', speed=speed, chunk_ms=chunk_ms)
+        for i in range(n_patients)
+    ]
+    reports: List[Optional[Dict[str, Any]]] = [None] * n_patients
+
+    def worker(i):
+        reports[i] = replays[i].run(stop)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(n_patients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = sum(report['samples'] for report in reports)
+
+    # Samples per second one live patient produces
+    per_patient_rate = replays[0].n_samples / ((replays[0].end_ms - replays[0].start_ms) / 1000)
+
+    return {
+        'patients': n_patients,
+        'speed': speed,
+        'samples': samples,
+        'wallSeconds': elapsed,
+        'samplesPerSecond': samples / elapsed if elapsed else 0.0,
+        'patientSamplesPerSecond': per_patient_rate,
+        'worstScheduleLag': max(report['scheduleLag']['max'] for report in reports),
+        'worstChunkLatency': max(report['chunkLatency']['p95'] for report in reports),
+        'reports': reports
+    }
@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from services.metrics import record_cache
+
+# Width of the fixed time buckets detection results are memoized in
+BUCKET_MS = int(os.environ.get('ANOMALY_BUCKET_MS', 10 * 60 * 1000))
+
+# Upper bound on the number of anomalies held across all cached buckets
+MAX_CACHED_ANOMALIES = int(os.environ.get('ANOMALY_CACHE_MAX_ANOMALIES', 100000))
+
+
+def align_buckets(start_ms: int, end_ms: int, bucket_ms: int = BUCKET_MS) -> List[int]:
+    """
+    Get the start times of the fixed buckets overlapping a time range
+
+    Args:
+        start_ms (int): Start of the range in milliseconds
+        end_ms (int): End of the range in milliseconds (exclusive)
+        bucket_ms (int, optional): Width of a bucket in milliseconds
+
+    Returns:
+        List[int]: Bucket start times in ascending order
+    """
+    first = start_ms - start_ms % bucket_ms
+    return list(range(first, end_ms, bucket_ms))
+
+
+class AnomalyResultCache:
+    """
+    Size-bounded LRU cache of anomaly detection results per time bucket
+
+    Entries are keyed on patient, bucket, detection scope and detector
+    signature, so results computed with other detector versions or thresholds
+    are never served. Each entry holds (timestamp_ms, anomaly) pairs sorted by
+    timestamp.
+    """
+
+    def __init__(self, bucket_ms: int = BUCKET_MS, max_anomalies: int = MAX_CACHED_ANOMALIES):
+        self.bucket_ms = bucket_ms
+        self.max_anomalies = max_anomalies
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, patient_id: str, bucket_start: int, scope: str,
+            signature: str) -> Optional[List[Tuple[int, Dict[str, Any]]]]:
+        """
+        Get the cached detection result for a bucket
+
+        Args:
+            patient_id (str): The patient
+            bucket_start (int): Start of the bucket in milliseconds
+            scope (str): Detection scope ('all', 'ECG' or 'EEG')
+            signature (str): Detector signature the result must match
+
+        Returns:
+            Optional[List[Tuple[int, Dict[str, Any]]]]: The cached result, or None on a miss
+        """
+        key = (patient_id, bucket_start, scope, signature)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                record_cache('anomaly_results', False)
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            record_cache('anomaly_results', True)
+            return entry
+
+    def contains(self, patient_id: str, bucket_start: int, scope: str, signature: str) -> bool:
+        """
+        Check whether a bucket is cached, without counting a hit or refreshing it
+
+        Args:
+            patient_id (str): The patient
+            bucket_start (int): Start of the bucket in milliseconds
+            scope (str): Detection scope ('all', 'ECG' or 'EEG')
+            signature (str): Detector signature the result must match
+
+        Returns:
+            bool: True if the bucket is cached
+        """
+        with self._lock:
+            return (patient_id, bucket_start, scope, signature) in self._entries
+
+    def put(self, patient_id: str, bucket_start: int, scope: str, signature: str,
+            anomalies: List[Tuple[int, Dict[str, Any]]]) -> None:
+        """
+        Cache the detection result for a bucket, evicting least recently used buckets
+
+        Args:
+            patient_id (str): The patient
+            bucket_start (int): Start of the bucket in milliseconds
+            scope (str): Detection scope ('all', 'ECG' or 'EEG')
+            signature (str): Detector signature the result was computed with
+            anomalies (List[Tuple[int, Dict[str, Any]]]): (timestamp_ms, anomaly) pairs
+        """
+        key = (patient_id, bucket_start, scope, signature)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= self._weight(previous)
+
+            self._entries[key] = anomalies
+            self._size += self._weight(anomalies)
+
+            while self._size > self.max_anomalies and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self._weight(evicted)
+
+    def invalidate(self, patient_id: str, start_ms: int, end_ms: int) -> None:
+        """
+        Drop cached results for every bucket overlapping a time range
+
+        Called when new data lands for a patient, so the affected buckets
+        are recomputed on the next request.
+
+        Args:
+            patient_id (str): The patient whose data changed
+            start_ms (int): Start of the changed range in milliseconds
+            end_ms (int): End of the changed range in milliseconds (exclusive)
+        """
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[0] == patient_id and key[1] < end_ms and key[1] + self.bucket_ms > start_ms
+            ]
+            for key in stale:
+                self._size -= self._weight(self._entries.pop(key))
+
+    def clear(self) -> None:
+        """
+        Drop all cached results
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @staticmethod
+    def _weight(anomalies: List[Tuple[int, Dict[str, Any]]]) -> int:
+        # Empty buckets still take a slot
+        return max(len(anomalies), 1)
+
+
+result_cache = AnomalyResultCache()
@@ -0,0 +1,304 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from services.anomaly_store import open_database
+
+# Path to the local signal database
+DB_PATH = os.environ.get(
+    'SIGNAL_DB_PATH',
+    os.path.join(os.path.dirname(__file__), '../data/signals.db')
+)
+
+# Pre-aggregated tiers, in milliseconds per bucket, finest first; the hourly
+# and daily tiers double as the summaries behind the dashboard
+ROLLUP_RESOLUTIONS = (1000, 60 * 1000, 60 * 60 * 1000, 24 * 60 * 60 * 1000)
+
+# A tier is used while it yields at most this many buckets per requested
+# point; the buckets are then downsampled to the requested number of points
+ROLLUP_OVERSAMPLE = 4
+
+# Names accepted for the resolution query parameter
+RESOLUTION_NAMES = {
+    'raw': None,
+    '1s': 1000,
+    '1m': 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    patient_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (patient_id, channel, timestamp_ms)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    patient_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    resolution_ms INTEGER NOT NULL,
+    bucket_ms INTEGER NOT NULL,
+    min_value REAL NOT NULL,
+    max_value REAL NOT NULL,
+    sum_value REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, channel, resolution_ms, bucket_ms)
+) WITHOUT ROWID;
+"""
+
+
+class SignalStore:
+    """
+    Local SQLite store for recorded signal samples
+
+    Each channel ('ecg', 'alpha', 'beta', ...) is stored as raw samples plus
+    per-second, per-minute, hourly and daily min/max/mean rollups. Rollups
+    are refreshed for the buckets touched by every append, so wide zoom
+    levels can be read from a pre-aggregated tier instead of raw samples.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, all sharing the same WAL database
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = open_database(self.path)
+            self._local.conn = conn
+        return conn
+
+    def append(self, patient_id: str, channel: str, timestamps, values) -> int:
+        """
+        Append samples for one channel and refresh the affected rollups
+
+        Samples whose timestamp is already stored are replaced.
+
+        Args:
+            patient_id (str): The patient the samples belong to
+            channel (str): The channel name
+            timestamps (array-like): Sample timestamps in milliseconds
+            values (array-like): Sample values
+
+        Returns:
+            int: Number of samples written
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        if len(timestamps) == 0:
+            return 0
+
+        start_ms = int(timestamps.min())
+        end_ms = int(timestamps.max()) + 1
+
+        conn = self._connection()
+        with self._write_lock, conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO samples (patient_id, channel, timestamp_ms, value) '
+                'VALUES (?, ?, ?, ?)',
+                zip([patient_id] * len(timestamps), [channel] * len(timestamps),
+                    timestamps.tolist(), values.tolist())
+            )
+            self._refresh_rollups(conn, patient_id, channel, start_ms, end_ms)
+
+        return len(timestamps)
+
+    def _refresh_rollups(self, conn, patient_id, channel, start_ms, end_ms):
+        # Each tier is rebuilt for the touched buckets from the tier below it,
+        # so a refresh only reads the samples of the buckets that changed
+        source_resolution = None
+
+        for resolution in ROLLUP_RESOLUTIONS:
+            bucket_start = start_ms - start_ms % resolution
+            bucket_end = end_ms - end_ms % resolution + (resolution if end_ms % resolution else 0)
+
+            if source_resolution is None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO rollups '
+                    '(patient_id, channel, resolution_ms, bucket_ms, min_value, max_value, sum_value, count) '
+                    'SELECT patient_id, channel, ?, (timestamp_ms / ?) * ?, '
+                    'MIN(value), MAX(value), SUM(value), COUNT(*) FROM samples '
+                    'WHERE patient_id = ? AND channel = ? AND timestamp_ms >= ? AND timestamp_ms < ? '
+                    'GROUP BY timestamp_ms / ?',
+                    (resolution, resolution, resolution, patient_id, channel,
+                     bucket_start, bucket_end, resolution)
+                )
+            else:
+                conn.execute(
+                    'INSERT OR REPLACE INTO rollups '
+                    '(patient_id, channel, resolution_ms, bucket_ms, min_value, max_value, sum_value, count) '
+                    'SELECT patient_id, channel, ?, (bucket_ms / ?) * ?, '
+                    'MIN(min_value), MAX(max_value), SUM(sum_value), SUM(count) FROM rollups '
+                    'WHERE patient_id = ? AND channel = ? AND resolution_ms = ? '
+                    'AND bucket_ms >= ? AND bucket_ms < ? '
+                    'GROUP BY bucket_ms / ?',
+                    (resolution, resolution, resolution, patient_id, channel, source_resolution,
+                     bucket_start, bucket_end, resolution)
+                )
+
+            source_resolution = resolution
+
+    def has_data(self, patient_id: str, channel: str,
+                 start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> bool:
+        """
+        Check whether any raw samples are stored for a channel in a time range
+
+        Args:
+            patient_id (str): The patient
+            channel (str): The channel name
+            start_ms (int, optional): Inclusive start of the range in milliseconds
+            end_ms (int, optional): Exclusive end of the range in milliseconds
+
+        Returns:
+            bool: True if at least one sample is stored
+        """
+        sql, params = self._range_clause(
+            'SELECT 1 FROM samples WHERE patient_id = ? AND channel = ?',
+            [patient_id, channel], 'timestamp_ms', start_ms, end_ms
+        )
+        return self._connection().execute(sql + ' LIMIT 1', params).fetchone() is not None
+
+    def read(self, patient_id: str, channel: str, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read raw samples for a channel
+
+        Args:
+            patient_id (str): The patient
+            channel (str): The channel name
+            start_ms (int, optional): Inclusive start of the range in milliseconds
+            end_ms (int, optional): Exclusive end of the range in milliseconds
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Timestamps and values, ordered by timestamp
+        """
+        sql, params = self._range_clause(
+            'SELECT timestamp_ms, value FROM samples WHERE patient_id = ? AND channel = ?',
+            [patient_id, channel], 'timestamp_ms', start_ms, end_ms
+        )
+        rows = self._connection().execute(sql + ' ORDER BY timestamp_ms', params).fetchall()
+
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        data = np.array(rows, dtype=np.float64)
+        return data[:, 0].astype(np.int64), data[:, 1]
+
+    def read_rollup(self, patient_id: str, channel: str, resolution_ms: int,
+                    start_ms: Optional[int] = None,
+                    end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Read a pre-aggregated tier for a channel
+
+        Args:
+            patient_id (str): The patient
+            channel (str): The channel name
+            resolution_ms (int): The tier, one of ROLLUP_RESOLUTIONS
+            start_ms (int, optional): Inclusive start of the range in milliseconds
+            end_ms (int, optional): Exclusive end of the range in milliseconds
+
+        Returns:
+            Dict[str, np.ndarray]: Arrays 'timestamp', 'min', 'max' and 'mean'
+        """
+        if resolution_ms not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Unsupported rollup resolution: {resolution_ms}")
+
+        # Include the bucket containing start_ms
+        if start_ms is not None:
+            start_ms -= start_ms % resolution_ms
+
+        sql, params = self._range_clause(
+            'SELECT bucket_ms, min_value, max_value, sum_value, count FROM rollups '
+            'WHERE patient_id = ? AND channel = ? AND resolution_ms = ?',
+            [patient_id, channel, resolution_ms], 'bucket_ms', start_ms, end_ms
+        )
+        rows = self._connection().execute(sql + ' ORDER BY bucket_ms', params).fetchall()
+
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return {
+            'timestamp': data[:, 0].astype(np.int64),
+            'min': data[:, 1],
+            'max': data[:, 2],
+            'mean': data[:, 3] / np.maximum(data[:, 4], 1)
+        }
+
+    def channels(self, patient_id: str) -> List[str]:
+        """
+        List the channels stored for a patient
+
+        Args:
+            patient_id (str): The patient
+
+        Returns:
+            List[str]: Channel names
+        """
+        rows = self._connection().execute(
+            'SELECT DISTINCT channel FROM rollups WHERE patient_id = ? AND resolution_ms = ?',
+            (patient_id, ROLLUP_RESOLUTIONS[-1])
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _range_clause(sql, params, column, start_ms, end_ms):
+        if start_ms is not None:
+            sql += f' AND {column} >= ?'
+            params.append(start_ms)
+        if end_ms is not None:
+            sql += f' AND {column} < ?'
+            params.append(end_ms)
+        return sql, params
+
+
+def choose_resolution(start_ms: int, end_ms: int, max_points: int) -> Optional[int]:
+    """
+    Pick the finest rollup tier that fits a window into roughly max_points buckets
+
+    Args:
+        start_ms (int): Start of the window in milliseconds
+        end_ms (int): End of the window in milliseconds
+        max_points (int): Number of points the client can draw
+
+    Returns:
+        Optional[int]: The tier in milliseconds, or None when raw samples should be read
+    """
+    span = end_ms - start_ms
+
+    # Windows narrower than max_points seconds are drawn from raw samples
+    if span <= max_points * ROLLUP_RESOLUTIONS[0]:
+        return None
+
+    for resolution in ROLLUP_RESOLUTIONS:
+        if span / resolution <= max_points * ROLLUP_OVERSAMPLE:
+            return resolution
+
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_signal_store() -> SignalStore:
+    """
+    Get the process-wide signal store, creating it on first use
+
+    Returns:
+        SignalStore: The shared signal store
+    """
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = SignalStore()
+
+    return _store
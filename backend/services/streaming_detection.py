@@ -0,0 +1,166 @@
+import threading
+import numpy as np
+from typing import Dict, Any, List
+
+from services.anomaly_detection import THRESHOLDS, build_ecg_anomaly, build_eeg_anomaly
+
+# Samples a channel must have seen before its statistics are trusted
+WARMUP_SAMPLES = 100
+
+# Minimum number of samples between two anomalies on the same channel
+REFRACTORY_SAMPLES = 5
+
+# Following samples that must stay deviant for an anomaly to count as sustained
+SUSTAIN_SAMPLES = 2
+
+
+class _ChannelState:
+    """
+    Running statistics and unevaluated tail of one patient channel
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.tail_timestamps = np.empty(0, dtype=np.int64)
+        self.tail_values = np.empty(0, dtype=np.float64)
+        self.since_last_anomaly = REFRACTORY_SAMPLES
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        # Merge the chunk's statistics into the running ones (Chan et al.)
+        n = len(values)
+        if n == 0:
+            return
+
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        total = self.count + n
+        delta = chunk_mean - self.mean
+
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+
+class StreamingDetector:
+    """
+    Incremental threshold detector fed with chunks of samples as they arrive
+
+    Uses the same rule as the batch detectors (a deviation above the trigger
+    threshold followed by two samples above the sustain threshold) against
+    running per-channel statistics, so each chunk is evaluated in one
+    vectorized pass. The last samples of a chunk are carried over until the
+    samples that decide whether they are sustained have arrived.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, patient_id: str, channel: str) -> _ChannelState:
+        key = (patient_id, channel)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _ChannelState()
+            return state
+
+    def feed(self, patient_id: str, channel: str, timestamps, values,
+             baseline=None) -> List[Dict[str, Any]]:
+        """
+        Feed a chunk of samples and return the anomalies it completes
+
+        With a baseline the samples are thresholded against the patient's
+        robust per-hour-of-day statistics instead of the running ones, and
+        no warm-up is needed.
+
+        Args:
+            patient_id (str): The patient
+            channel (str): 'ecg' or an EEG band name
+            timestamps (array-like): Sample timestamps in milliseconds, ascending
+            values (array-like): Sample values
+            baseline (BaselineProfile, optional): Baseline of the patient channel
+
+        Returns:
+            List[Dict[str, Any]]: Newly detected anomalies
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        state = self._state(patient_id, channel)
+
+        with state.lock:
+            # Warm up on the first samples before judging any of them
+            if state.count < WARMUP_SAMPLES and baseline is None:
+                n_warmup = WARMUP_SAMPLES - state.count
+                state.update(values[:n_warmup])
+                state.tail_timestamps = timestamps[max(n_warmup - SUSTAIN_SAMPLES, 0):n_warmup]
+                state.tail_values = values[max(n_warmup - SUSTAIN_SAMPLES, 0):n_warmup]
+                timestamps = timestamps[n_warmup:]
+                values = values[n_warmup:]
+                if state.count < WARMUP_SAMPLES or len(values) == 0:
+                    return []
+
+            ts = np.concatenate((state.tail_timestamps, timestamps))
+            vs = np.concatenate((state.tail_values, values))
+            mean, std = state.mean, state.std
+            state.update(values)
+
+            state.tail_timestamps = ts[-SUSTAIN_SAMPLES:]
+            state.tail_values = vs[-SUSTAIN_SAMPLES:]
+
+            n_evaluated = len(vs) - SUSTAIN_SAMPLES
+            if baseline is not None:
+                mean, std = baseline.center_scale(ts)
+            elif std == 0:
+                return []
+            if n_evaluated <= 0:
+                return []
+
+            deviation = np.abs(vs - mean) / std
+            sustained = deviation[1:n_evaluated + 1] > THRESHOLDS['sustain']
+            for k in range(2, SUSTAIN_SAMPLES + 1):
+                sustained &= deviation[k:n_evaluated + k] > THRESHOLDS['sustain']
+            candidates = np.flatnonzero((deviation[:n_evaluated] > THRESHOLDS['trigger']) & sustained)
+
+            # Suppress repeated detections of the same event
+            anomalies = []
+            last = -state.since_last_anomaly
+            for i in candidates.tolist():
+                if i - last < REFRACTORY_SAMPLES:
+                    continue
+                last = i
+                anomalies.append(self._build(channel, int(ts[i]), float(deviation[i])))
+
+            state.since_last_anomaly = n_evaluated - last if anomalies else \
+                state.since_last_anomaly + n_evaluated
+
+            return anomalies
+
+    def reset(self, patient_id: str = None) -> None:
+        """
+        Forget the state of one patient, or of every patient
+
+        Args:
+            patient_id (str, optional): The patient to reset
+        """
+        with self._lock:
+            if patient_id is None:
+                self._states.clear()
+            else:
+                for key in [key for key in self._states if key[0] == patient_id]:
+                    del self._states[key]
+
+    @staticmethod
+    def _build(channel, timestamp, deviation):
+        if channel == 'ecg':
+            return build_ecg_anomaly(timestamp, deviation)
+        return build_eeg_anomaly(timestamp, channel, deviation)
+
+
+streaming_detector = StreamingDetector()
@@ -0,0 +1,252 @@
+import threading
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+from services.eeg_ecg_conversion import EEG_BANDS
+from services.signal_store import get_signal_store
+from services.anomaly_store import get_anomaly_store, SUMMARY_PERIODS
+from services.metrics import timed_stage
+
+# Derived channel holding the instantaneous heart rate at each detected beat
+HEART_RATE_CHANNEL = 'heart_rate'
+
+# R peaks must rise this many standard deviations above the batch mean
+BEAT_THRESHOLD_STD = 1.5
+
+# Shortest and longest plausible R-R intervals (240 and 30 beats per minute)
+MIN_RR_MS = 250
+MAX_RR_MS = 2000
+
+# ECG samples buffered before the running peak threshold is trusted
+WARMUP_SAMPLES = 500
+
+# Upper bound on the number of buckets a single summary may span
+MAX_SUMMARY_BUCKETS = 1000
+
+
+def detect_beats(timestamps, values, threshold=None, last_beat=None):
+    """
+    Find R peaks in a block of ECG samples and the heart rate at each beat
+
+    Args:
+        timestamps (array-like): Sample timestamps in milliseconds
+        values (array-like): ECG sample values
+        threshold (float, optional): Level R peaks must exceed; derived from the block by default
+        last_beat (int, optional): Timestamp of the beat preceding the block
+
+    Returns:
+        tuple: (beat timestamps, beats per minute, last beat timestamp); a beat
+            without a plausible preceding interval is not reported but still
+            returned as the last beat
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+
+    if len(values) < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0), last_beat
+
+    # Local maxima well above the baseline
+    if threshold is None:
+        threshold = values.mean() + BEAT_THRESHOLD_STD * values.std()
+    middle = values[1:-1]
+    peaks = np.flatnonzero((middle > threshold) & (middle > values[:-2]) & (middle >= values[2:])) + 1
+
+    beats = []
+    rates = []
+    for peak in timestamps[peaks].tolist():
+        # Peaks closer than the shortest R-R interval belong to the same beat
+        if last_beat is not None and peak - last_beat < MIN_RR_MS:
+            continue
+        if last_beat is not None and peak - last_beat <= MAX_RR_MS:
+            beats.append(peak)
+            rates.append(60000 / (peak - last_beat))
+        last_beat = peak
+
+    return np.asarray(beats, dtype=np.int64), np.asarray(rates, dtype=np.float64), last_beat
+
+
+class _BeatState:
+    """
+    Running ECG statistics, last beat and unevaluated tail of one patient
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last_beat = None
+        self.tail_timestamps = np.empty(0, dtype=np.int64)
+        self.tail_values = np.empty(0, dtype=np.float64)
+
+    @property
+    def threshold(self) -> float:
+        std = float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+        return self.mean + BEAT_THRESHOLD_STD * std
+
+    def update(self, values: np.ndarray) -> None:
+        # Merge the chunk's statistics into the running ones (Chan et al.)
+        n = len(values)
+        if n == 0:
+            return
+
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        total = self.count + n
+        delta = chunk_mean - self.mean
+
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+
+class HeartRateTracker:
+    """
+    Incremental beat detection over ECG chunks as they are ingested
+
+    Keeps the running peak threshold and the last beat of each patient, so
+    intervals spanning chunk boundaries are measured like any other. The
+    last sample of a chunk is carried over until the sample that decides
+    whether it is a peak has arrived, and the first samples of a patient
+    are held back until the threshold rests on enough of them.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, patient_id: str) -> _BeatState:
+        with self._lock:
+            state = self._states.get(patient_id)
+            if state is None:
+                state = self._states[patient_id] = _BeatState()
+            return state
+
+    def feed(self, patient_id: str, timestamps, values) -> tuple:
+        """
+        Feed a chunk of ECG samples and return the beats it completes
+
+        Args:
+            patient_id (str): The patient
+            timestamps (array-like): Sample timestamps in milliseconds
+            values (array-like): ECG sample values
+
+        Returns:
+            tuple: (beat timestamps, beats per minute) arrays
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        state = self._state(patient_id)
+        with state.lock:
+            state.update(values)
+
+            timestamps = np.concatenate([state.tail_timestamps, timestamps])
+            values = np.concatenate([state.tail_values, values])
+
+            # Hold everything back until the threshold rests on enough samples
+            if state.count < WARMUP_SAMPLES:
+                state.tail_timestamps, state.tail_values = timestamps, values
+                return np.empty(0, dtype=np.int64), np.empty(0)
+
+            beats, rates, state.last_beat = detect_beats(timestamps, values, state.threshold, state.last_beat)
+
+            # The first kept sample was already evaluated; the last one still needs its successor
+            state.tail_timestamps = timestamps[-2:]
+            state.tail_values = values[-2:]
+
+        return beats, rates
+
+    def reset(self, patient_id: Optional[str] = None) -> None:
+        """
+        Forget the state of one patient, or of every patient
+
+        Args:
+            patient_id (str, optional): The patient; all patients by default
+        """
+        with self._lock:
+            if patient_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(patient_id, None)
+
+
+heart_rate_tracker = HeartRateTracker()
+
+
+def record_heart_rate(patient_id: str, timestamps, values) -> int:
+    """
+    Derive heart rate from ingested ECG and append it to the signal store
+
+    Beats are tracked across calls, so ECG may arrive in chunks of any
+    length. The heart rate channel gets the same hourly and daily rollups
+    as the recorded channels, which is what the summaries read.
+
+    Args:
+        patient_id (str): The patient
+        timestamps (array-like): ECG sample timestamps in milliseconds
+        values (array-like): ECG sample values
+
+    Returns:
+        int: Number of beats recorded
+    """
+    beat_timestamps, rates = heart_rate_tracker.feed(patient_id, timestamps, values)
+    return get_signal_store().append(patient_id, HEART_RATE_CHANNEL, beat_timestamps, rates)
+
+
+def _trend(tier, index):
+    return {
+        'mean': float(tier['mean'][index]),
+        'min': float(tier['min'][index]),
+        'max': float(tier['max'][index])
+    }
+
+
+@timed_stage('summary')
+def get_summary(patient_id: str, period: str, start_ms: int, end_ms: int) -> List[Dict[str, Any]]:
+    """
+    Get hourly or daily health summaries for a patient
+
+    Reads only the materialized rollups: anomaly counts from the anomaly
+    store and heart rate and band power trends from the signal store, so
+    the cost depends on the number of buckets, not on the samples behind
+    them.
+
+    Args:
+        patient_id (str): The patient
+        period (str): 'hour' or 'day'
+        start_ms (int): Start of the range in milliseconds
+        end_ms (int): End of the range in milliseconds (exclusive)
+
+    Returns:
+        List[Dict[str, Any]]: One summary per bucket with data, ordered by time
+    """
+    period_ms = SUMMARY_PERIODS[period]
+    buckets = {}
+
+    def bucket(timestamp):
+        return buckets.setdefault(int(timestamp), {
+            'timestamp': int(timestamp),
+            'anomalies': {'total': 0, 'byType': {}, 'bySeverity': {}},
+            'heartRate': None,
+            'bandPower': {}
+        })
+
+    for bucket_ms, type, severity, count in get_anomaly_store().summaries(patient_id, period_ms, start_ms, end_ms):
+        anomalies = bucket(bucket_ms)['anomalies']
+        anomalies['total'] += count
+        anomalies['byType'][type] = anomalies['byType'].get(type, 0) + count
+        anomalies['bySeverity'][severity] = anomalies['bySeverity'].get(severity, 0) + count
+
+    store = get_signal_store()
+
+    tier = store.read_rollup(patient_id, HEART_RATE_CHANNEL, period_ms, start_ms, end_ms)
+    for i, timestamp in enumerate(tier['timestamp'].tolist()):
+        bucket(timestamp)['heartRate'] = _trend(tier, i)
+
+    for band in EEG_BANDS:
+        tier = store.read_rollup(patient_id, band, period_ms, start_ms, end_ms)
+        for i, timestamp in enumerate(tier['timestamp'].tolist()):
+            bucket(timestamp)['bandPower'][band] = _trend(tier, i)
+
+    return [buckets[timestamp] for timestamp in sorted(buckets)]
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Keep the stores out of the working databases
+_scratch = tempfile.mkdtemp(prefix='neurocard-tests-')
+os.environ.setdefault('ANOMALY_DB_PATH', os.path.join(_scratch, 'anomalies.db'))
+os.environ.setdefault('SIGNAL_DB_PATH', os.path.join(_scratch, 'signals.db'))
+
+
+@pytest.fixture
+def patient_id(request):
+    # A fresh patient per test keeps the shared stores independent
+    return f'test-{request.node.name}'
+
+
+def synthetic_ecg(seconds, bpm=72, sample_rate=250, start_ms=1_700_000_000_000, seed=0):
+    """
+    ECG-like signal with a narrow R peak at a fixed heart rate plus noise
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    phase = (t * bpm / 60) % 1
+    values = np.exp(-((phase - 0.5) * 60 / bpm * 1000 / 15) ** 2) + rng.normal(0, 0.05, n)
+    timestamps = start_ms + (np.arange(n) * 1000) // sample_rate
+    return timestamps.astype(np.int64), values
@@ -0,0 +1,59 @@
+import pytest
+
+from services.admission import AdmissionController, Overloaded, client_key, estimate_cost
+
+
+def test_estimate_cost_counts_samples_in_the_window():
+    assert estimate_cost(0, 60_000, sample_rate=250) == 15_000
+    assert estimate_cost(0, 60_000, sample_rate=1 / 60) == 1
+    assert estimate_cost(None, 60_000) == 0
+    assert estimate_cost(60_000, 0) == 0
+
+
+def test_client_header_is_only_trusted_from_proxies():
+    proxies = frozenset({'10.0.0.1'})
+
+    assert client_key('10.0.0.1', 'alice', proxies) == 'alice'
+    assert client_key('203.0.113.7', 'alice', proxies) == '203.0.113.7'
+    assert client_key('10.0.0.1', None, proxies) == '10.0.0.1'
+    assert client_key(None) == 'anonymous'
+
+
+def test_inline_and_hard_limits():
+    controller = AdmissionController(max_inline_cost=100, max_request_cost=1000)
+
+    assert controller.inline(100) and controller.allowed(100)
+    assert not controller.inline(101) and controller.allowed(1000)
+    assert not controller.allowed(1001)
+
+
+def test_cheap_requests_skip_the_budgets():
+    controller = AdmissionController(global_budget=10, client_budget=10, cheap_cost=5)
+
+    assert controller.acquire('a', 5) is None
+    assert controller.acquire('a', 5) is None
+
+
+def test_client_over_budget_is_shed_with_a_retry_hint():
+    controller = AdmissionController(global_budget=100, client_budget=50, cheap_cost=0,
+                                     queue_timeout=0.05, max_queued=4)
+    ticket = controller.acquire('a', 50)
+
+    with pytest.raises(Overloaded) as error:
+        controller.acquire('a', 10)
+    assert error.value.retry_after >= 1
+
+    # Other clients keep their own budget
+    controller.release(controller.acquire('b', 50))
+
+    controller.release(ticket)
+    controller.release(controller.acquire('a', 50))
+
+
+def test_full_queue_rejects_without_waiting():
+    controller = AdmissionController(global_budget=10, client_budget=10, cheap_cost=0,
+                                     queue_timeout=10, max_queued=0)
+    controller.acquire('a', 10)
+
+    with pytest.raises(Overloaded):
+        controller.acquire('b', 10)
@@ -0,0 +1,77 @@
+import pytest
+
+from services.anomaly_detection import build_ecg_anomaly, build_eeg_anomaly
+from services.anomaly_store import AnomalyStore, anomaly_timestamp_ms
+
+START_MS = 1_700_000_000_000
+HOUR_MS = 60 * 60 * 1000
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnomalyStore(str(tmp_path / 'anomalies.db'))
+
+
+def ecg(offset_ms, deviation=4.0):
+    return build_ecg_anomaly(START_MS + offset_ms, deviation)
+
+
+def test_replace_window_replaces_previous_results(store):
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, [ecg(1000), ecg(2000)])
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, [ecg(3000)])
+
+    stored = store.query('p', START_MS, START_MS + HOUR_MS)
+
+    assert [anomaly_timestamp_ms(anomaly) for anomaly in stored] == [START_MS + 3000]
+
+
+def test_rerunning_detection_reproduces_ids(store):
+    first = [ecg(1000), build_eeg_anomaly(START_MS + 1000, 'alpha', 4.0)]
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, first)
+    rerun = [ecg(1000), build_eeg_anomaly(START_MS + 1000, 'alpha', 4.0)]
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, rerun)
+
+    assert [anomaly['id'] for anomaly in rerun] == [anomaly['id'] for anomaly in first]
+    assert len({anomaly['id'] for anomaly in first}) == 2
+    assert store.get(first[0]['id'])['type'] == 'ECG'
+
+
+def test_other_patients_do_not_share_ids(store):
+    mine, theirs = ecg(1000), ecg(1000)
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, [mine])
+    store.replace_window('q', START_MS, START_MS + HOUR_MS, [theirs])
+
+    assert mine['id'] != theirs['id']
+
+
+def test_coverage_requires_a_matching_version_and_scope(store):
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, [ecg(1000)], version='v1')
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, [], scope='ECG')
+
+    assert store.is_covered('p', START_MS, START_MS + HOUR_MS, 'v1')
+    assert store.is_covered('p', START_MS + 10, START_MS + 20, 'v1', scopes=('EEG', 'all'))
+    assert not store.is_covered('p', START_MS, START_MS + HOUR_MS, 'v2')
+    assert not store.is_covered('p', START_MS, START_MS + 2 * HOUR_MS, 'v1')
+    assert not store.is_covered('p', START_MS, START_MS + HOUR_MS, 'v1', scopes=('ECG',))
+
+
+def test_invalidate_forgets_overlapping_windows_but_keeps_anomalies(store):
+    store.replace_window('p', START_MS, START_MS + HOUR_MS, [ecg(1000)], version='v1')
+    store.replace_window('p', START_MS + HOUR_MS, START_MS + 2 * HOUR_MS, [], version='v1')
+
+    store.invalidate_windows('p', START_MS + 500, START_MS + 600)
+
+    assert not store.is_covered('p', START_MS, START_MS + HOUR_MS, 'v1')
+    assert store.is_covered('p', START_MS + HOUR_MS, START_MS + 2 * HOUR_MS, 'v1')
+    assert len(store.query('p', START_MS, START_MS + HOUR_MS)) == 1
+
+
+def test_summaries_count_by_hour(store):
+    store.replace_window('p', START_MS, START_MS + 2 * HOUR_MS, [ecg(1000), ecg(2000), ecg(HOUR_MS + 1000)])
+    hour = START_MS - START_MS % HOUR_MS
+
+    counts = {}
+    for bucket, _, _, count in store.summaries('p', HOUR_MS, START_MS, START_MS + 2 * HOUR_MS):
+        counts[bucket] = counts.get(bucket, 0) + count
+
+    assert counts == {hour: 2, hour + HOUR_MS: 1}
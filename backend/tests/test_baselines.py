@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from services.baselines import BaselineStore, baseline_signature
+
+START_MS = 1_700_000_000_000
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BaselineStore(str(tmp_path / 'baselines.db'))
+
+
+def feed(store, channel, values, chunk=250):
+    timestamps = START_MS + np.arange(len(values)) * 1000
+    for i in range(0, len(values), chunk):
+        store.update('p', channel, timestamps[i:i + chunk], values[i:i + chunk])
+
+
+def test_range_adapts_to_values_far_outside_the_legacy_range(store):
+    rng = np.random.default_rng(0)
+    feed(store, 'alpha', rng.normal(20, 2, 5000))
+
+    profile = store.profile('p', 'alpha')
+
+    assert profile.centers == pytest.approx(20, abs=0.2)
+    assert profile.scales == pytest.approx(2, abs=0.2)
+
+
+def test_range_grows_and_rebins_existing_counts(store):
+    rng = np.random.default_rng(1)
+    feed(store, 'alpha', rng.normal(0, 1, 3000))
+    feed(store, 'alpha', rng.normal(10, 1, 3000))
+
+    profile = store.profile('p', 'alpha')
+
+    # Half the samples around 0 and half around 10
+    assert 0 < profile.centers[0] < 10
+    assert profile.scales[0] > 3
+
+
+def test_sketch_and_range_survive_a_restart(store, tmp_path):
+    rng = np.random.default_rng(2)
+    feed(store, 'alpha', rng.normal(20, 2, 5000))
+
+    reloaded = BaselineStore(str(tmp_path / 'baselines.db')).profile('p', 'alpha')
+    profile = store.profile('p', 'alpha')
+
+    np.testing.assert_array_equal(reloaded.centers, profile.centers)
+    np.testing.assert_array_equal(reloaded.scales, profile.scales)
+
+
+def test_unresolvable_sketch_yields_no_profile(store):
+    rng = np.random.default_rng(3)
+    values = rng.normal(20, 2, 2000)
+    values[-1] = 1e9
+    feed(store, 'alpha', values)
+
+    assert store.profile('p', 'alpha') is None
+
+
+def test_profile_is_republished_only_after_a_material_move(store):
+    rng = np.random.default_rng(4)
+    feed(store, 'alpha', rng.normal(20, 2, 5000))
+    published = store.profile('p', 'alpha')
+    signature = baseline_signature({'alpha': published})
+
+    feed(store, 'alpha', rng.normal(20, 2, 100))
+    assert store.profile('p', 'alpha') is published
+
+    feed(store, 'alpha', rng.normal(30, 2, 5000))
+    moved = store.profile('p', 'alpha')
+    assert moved is not published
+    assert baseline_signature({'alpha': moved}) != signature
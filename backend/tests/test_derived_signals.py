@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+
+from services import derived_signals as derived_signals_module
+from services.derived_signals import DerivedSignalCache
+from services.eeg_ecg_conversion import EEG_BANDS
+from services.ingestion import ingest_batch
+from services.result_cache import BUCKET_MS
+from services.signal_store import get_signal_store
+
+START_MS = 1_700_000_000_000 - 1_700_000_000_000 % BUCKET_MS
+
+
+def test_live_buckets_only_load_the_requested_past(monkeypatch):
+    loaded = []
+    fetch_ecg = derived_signals_module._fetch_ecg
+
+    def recording_fetch(patient_id, source, start_ms, end_ms):
+        loaded.append((start_ms, end_ms))
+        return fetch_ecg(patient_id, source, start_ms, end_ms)
+
+    monkeypatch.setattr(derived_signals_module, '_fetch_ecg', recording_fetch)
+    cache = DerivedSignalCache()
+
+    now_ms = int(time.time() * 1000)
+    ecg_timestamps, _, eeg_timestamps, bands = cache.get_window('live-patient', now_ms - 10 * 1000, now_ms + 60 * 1000)
+
+    assert sum(end - start for start, end in loaded) <= 10 * 1000 + 1000
+    assert all(start >= now_ms - 10 * 1000 for start, _ in loaded)
+    assert len(ecg_timestamps) and ecg_timestamps.max() <= now_ms + 1000
+    assert np.array_equal(ecg_timestamps, eeg_timestamps)
+    assert bands.shape == (len(EEG_BANDS), len(eeg_timestamps))
+    assert not cache._entries
+
+
+def test_recorded_eeg_is_used_without_recorded_ecg(patient_id):
+    timestamps = START_MS + np.arange(0, 60 * 1000, 4, dtype=np.int64)
+    store = get_signal_store()
+    for i, band in enumerate(EEG_BANDS):
+        store.append(patient_id, band, timestamps, np.full(len(timestamps), float(i + 1)))
+    cache = DerivedSignalCache()
+
+    ecg_timestamps, _, eeg_timestamps, bands = cache.get_window(patient_id, START_MS, START_MS + 30 * 1000)
+
+    assert len(ecg_timestamps) == 0
+    assert np.array_equal(eeg_timestamps, timestamps[timestamps < START_MS + 30 * 1000])
+    assert np.array_equal(bands[:, 0], np.arange(1, len(EEG_BANDS) + 1))
+
+
+def test_ingested_eeg_drops_cached_buckets(patient_id, monkeypatch):
+    cache = DerivedSignalCache()
+    monkeypatch.setattr(derived_signals_module, 'derived_signals', cache)
+    monkeypatch.setattr('services.ingestion.derived_signals', cache)
+
+    cache.get_window(patient_id, START_MS, START_MS + 60 * 1000)
+    assert cache._entries
+
+    ingest_batch(patient_id, 'alpha', np.array([START_MS + 1000]), np.array([0.5]))
+
+    assert not cache._entries
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from services.downsampling import downsample_indices, downsample_rows, lttb_indices, minmax_indices
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    timestamps = np.arange(10_000) * 4
+    values = np.sin(timestamps / 500) + rng.normal(0, 0.1, len(timestamps))
+    values[1234] = 25
+    values[8765] = -25
+    return timestamps, values
+
+
+@pytest.mark.parametrize('max_points', [3, 10, 500, 9_999])
+def test_lttb_keeps_exactly_max_points_with_both_ends(series, max_points):
+    timestamps, values = series
+    indices = lttb_indices(timestamps, values, max_points)
+
+    assert len(indices) == max_points
+    assert indices[0] == 0 and indices[-1] == len(values) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize('max_points', [2, 11, 500, 9_999])
+def test_minmax_stays_within_max_points_and_keeps_the_extremes(series, max_points):
+    _, values = series
+    indices = minmax_indices(values, max_points)
+
+    assert len(indices) <= max_points
+    assert np.all(np.diff(indices) > 0)
+    assert values[indices].max() == values.max()
+    assert values[indices].min() == values.min()
+
+
+def test_lttb_keeps_spikes(series):
+    timestamps, values = series
+    indices = lttb_indices(timestamps, values, 200)
+
+    assert {1234, 8765} <= set(indices.tolist())
+
+
+def test_short_series_are_returned_whole(series):
+    timestamps, values = series
+
+    assert len(downsample_indices(timestamps[:10], values[:10], 100)) == 10
+    assert len(downsample_indices(timestamps[:10], values[:10], 100, method='minmax')) == 10
+
+
+def test_unknown_method_is_rejected(series):
+    with pytest.raises(ValueError):
+        downsample_indices(*series, 100, method='average')
+
+
+def test_rows_are_selected_unchanged(series):
+    timestamps, values = series
+    rows = [{'timestamp': int(t), 'value': float(v)} for t, v in zip(timestamps, values)]
+
+    selected = downsample_rows(rows, ['value'], 100)
+
+    assert len(selected) == 100
+    assert all(row is rows[row['timestamp'] // 4] for row in selected)
+    assert downsample_rows(rows, ['value'], None) is rows
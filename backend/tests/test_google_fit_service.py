@@ -0,0 +1,40 @@
+import pytest
+
+from loadtest.fakes import FakeGoogleFit
+from services.google_fit_service import GoogleFitService
+
+
+def test_sync_reads_heart_rate_from_the_configured_api(monkeypatch):
+    fit = FakeGoogleFit().start()
+    try:
+        monkeypatch.setenv('GOOGLE_FIT_API_URL', fit.url)
+        service = GoogleFitService()
+
+        result = service.sync_data(0, 60 * 60 * 1000)
+    finally:
+        fit.stop()
+
+    assert fit.requests == 1
+    assert result['points'] == 60
+    assert all(60 <= point['value'] <= 80 for point in result['heartRate'])
+    assert service.get_status()['lastSync'] is not None
+
+
+def test_sync_without_an_api_returns_mock_data_for_the_window(monkeypatch):
+    monkeypatch.delenv('GOOGLE_FIT_API_URL', raising=False)
+    service = GoogleFitService()
+
+    result = service.sync_data(30 * 1000, 10 * 60 * 1000)
+
+    assert result['points'] == 9
+    assert all(30 * 1000 <= point['timestamp'] < 10 * 60 * 1000 for point in result['heartRate'])
+
+
+def test_callback_state_must_match_the_authorization_request():
+    service = GoogleFitService()
+    service.get_authorization_url()
+
+    with pytest.raises(ValueError):
+        service.exchange_code_for_token('code', 'forged')
+
+    assert not service.get_status()['connected']
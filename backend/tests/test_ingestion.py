@@ -0,0 +1,93 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from routes.ingest import ingest_bp
+from services.ingestion import IngestionError, validate_batch
+from services.signal_store import get_signal_store
+
+START_MS = 1_700_000_000_000
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(ingest_bp, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.mark.parametrize('channel, timestamps, values, message', [
+    ('spo2', [1, 2], [0.0, 0.0], 'Unknown channel'),
+    ('ecg', [1, 2], [0.0], 'same length'),
+    ('ecg', [1, 2], [0.0, np.nan], 'finite'),
+    ('ecg', [1, 2], [0.0, np.inf], 'finite'),
+    ('ecg', [2, 2], [0.0, 0.0], 'strictly increasing'),
+    ('ecg', [2, 1], [0.0, 0.0], 'strictly increasing'),
+])
+def test_invalid_batches_are_rejected(channel, timestamps, values, message):
+    with pytest.raises(IngestionError, match=message):
+        validate_batch(channel, np.asarray(timestamps), np.asarray(values))
+
+
+def test_valid_batches_pass():
+    validate_batch('alpha', np.asarray([1, 2, 3]), np.asarray([0.1, 0.2, 0.3]))
+    validate_batch('ecg', np.asarray([], dtype=np.int64), np.asarray([]))
+
+
+def test_ndjson_samples_and_blocks_are_stored(client, patient_id):
+    lines = [
+        {'channel': 'ecg', 'timestamp': START_MS, 'value': 0.5},
+        {'channel': 'ecg', 'timestamps': [START_MS + 4, START_MS + 8], 'values': [0.6, 0.7]},
+    ]
+    body = '\n'.join(json.dumps(line) for line in lines) + '\n\n'
+
+    response = client.post(f'/api/ingest/{patient_id}', data=body,
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    assert response.get_json()['samples'] == 3
+    assert get_signal_store().has_data(patient_id, 'ecg', START_MS, START_MS + 10)
+
+
+@pytest.mark.parametrize('line', [
+    'not json',
+    '{"channel": "ecg", "timestamp": 1}',
+    '{"channel": "spo2", "timestamp": 1, "value": 1}',
+    '{"channel": "ecg", "timestamps": [1, 2], "values": [1]}',
+])
+def test_bad_ndjson_lines_are_reported(client, patient_id, line):
+    body = json.dumps({'channel': 'ecg', 'timestamp': START_MS, 'value': 0.5}) + '\n' + line
+
+    response = client.post(f'/api/ingest/{patient_id}', data=body,
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Line 2:')
+
+
+def test_binary_block_is_stored_evenly_spaced(client, patient_id):
+    values = np.arange(250, dtype='<f4')
+
+    response = client.post(f'/api/ingest/{patient_id}/alpha?startTime={START_MS}&sampleRate=250',
+                           data=values.tobytes(), content_type='application/octet-stream')
+
+    assert response.status_code == 200
+    assert response.get_json()['samples'] == 250
+    assert get_signal_store().has_data(patient_id, 'alpha', START_MS + 990, START_MS + 1000)
+
+
+@pytest.mark.parametrize('query, body', [
+    ('sampleRate=250', b''),
+    (f'startTime={START_MS}&sampleRate=0', b''),
+    (f'startTime={START_MS}&sampleRate=5000', b''),
+    (f'startTime={START_MS}&sampleRate=250', struct.pack('<f', 1.0) + b'\x00'),
+    (f'startTime={START_MS}&sampleRate=250', struct.pack('<f', float('nan'))),
+])
+def test_bad_binary_blocks_are_rejected(client, patient_id, query, body):
+    response = client.post(f'/api/ingest/{patient_id}/alpha?{query}', data=body,
+                           content_type='application/octet-stream')
+
+    assert response.status_code == 400
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from services.jobs import JobQueue, JobLimitExceeded, DONE, FAILED
+
+
+def wait(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if job.status in (DONE, FAILED):
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f'job {job.id} did not finish')
+
+
+@pytest.fixture
+def gate():
+    # Holds jobs in their worker until released
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_job_runs_and_keeps_its_result():
+    jobs = JobQueue(workers=1)
+    job = jobs.submit('sum', sum, [1, 2, 3])
+
+    assert wait(job).status == DONE
+    assert jobs.get(job.id).to_dict()['result'] == 6
+
+
+def test_failed_job_reports_its_error():
+    def fail():
+        raise ValueError('broken')
+
+    job = wait(JobQueue(workers=1).submit('fail', fail))
+
+    assert job.status == FAILED
+    assert job.to_dict()['error'] == 'broken'
+
+
+def test_duplicate_keys_share_a_pending_job(gate):
+    jobs = JobQueue(workers=1)
+    first = jobs.submit('wait', gate.wait, key='same')
+
+    assert jobs.submit('wait', gate.wait, key='same') is first
+
+
+def test_client_limit_refuses_further_jobs(gate):
+    jobs = JobQueue(workers=1, client_limit=2, queue_limit=10)
+    jobs.submit('wait', gate.wait, client_id='a')
+    jobs.submit('wait', gate.wait, client_id='a')
+
+    with pytest.raises(JobLimitExceeded) as error:
+        jobs.submit('wait', gate.wait, client_id='a')
+    assert error.value.retry_after >= 1
+
+    # Other clients can still submit
+    jobs.submit('wait', gate.wait, client_id='b')
+
+    gate.set()
+    wait(jobs.submit('wait', gate.wait, client_id='b'))
+
+
+def test_queue_limit_applies_across_clients(gate):
+    jobs = JobQueue(workers=1, client_limit=10, queue_limit=2)
+    jobs.submit('wait', gate.wait, client_id='a')
+    jobs.submit('wait', gate.wait, client_id='b')
+
+    with pytest.raises(JobLimitExceeded):
+        jobs.submit('wait', gate.wait, client_id='c')
+
+
+def test_finished_jobs_beyond_the_history_are_evicted():
+    jobs = JobQueue(workers=1, history=2)
+    finished = [wait(jobs.submit('sum', sum, [i])) for i in range(4)]
+
+    assert jobs.get(finished[0].id) is None
+    assert jobs.get(finished[-1].id) is not None
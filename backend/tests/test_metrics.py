@@ -0,0 +1,28 @@
+import threading
+
+from services.metrics import RequestProfiler
+
+
+def test_only_one_request_is_profiled_at_a_time():
+    profiler = RequestProfiler(sample_rate=1.0)
+    profiler.start('/first')
+    results = []
+
+    # A concurrent request is served unprofiled instead of failing
+    thread = threading.Thread(target=lambda: (profiler.start('/second'), results.append(profiler.stop())))
+    thread.start()
+    thread.join()
+
+    assert results == [None]
+    assert profiler.stop()['path'] == '/first'
+
+    profiler.start('/third')
+    assert profiler.stop()['path'] == '/third'
+    assert [entry['path'] for entry in profiler.profiles] == ['/first', '/third']
+
+
+def test_disabled_profiler_profiles_nothing():
+    profiler = RequestProfiler(sample_rate=0)
+    profiler.start('/path', forced=True)
+
+    assert profiler.stop() is None
@@ -0,0 +1,110 @@
+import gzip
+import json
+import struct
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from utils.response_formats import (
+    make_data_response, BINARY_HEADER, BINARY_MAGIC, BINARY_VERSION, COLUMNAR_JSON, BINARY, ARROW
+)
+
+ROWS = [
+    {'timestamp': 1_700_000_000_000 + i * 4, 'alpha': i * 0.5, 'beta': -i * 0.25}
+    for i in range(1000)
+]
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def respond(app, rows, query='', headers=None, numeric=True):
+    with app.test_request_context(f'/?{query}', headers=headers or {}):
+        return make_data_response(rows, numeric=numeric)
+
+
+def decode_binary(payload):
+    magic, version, n_fields, n_rows = BINARY_HEADER.unpack_from(payload)
+    assert (magic, version) == (BINARY_MAGIC, BINARY_VERSION)
+
+    offset = BINARY_HEADER.size
+    fields = []
+    for _ in range(n_fields):
+        (length,) = struct.unpack_from('<H', payload, offset)
+        fields.append(payload[offset + 2:offset + 2 + length].decode('utf-8'))
+        offset += 2 + length
+
+    columns = {'timestamp': np.frombuffer(payload, dtype='<i8', count=n_rows, offset=offset)}
+    offset += 8 * n_rows
+    for field in fields[1:]:
+        columns[field] = np.frombuffer(payload, dtype='<f4', count=n_rows, offset=offset)
+        offset += 4 * n_rows
+
+    assert offset == len(payload)
+    return fields, columns
+
+
+def test_row_json_is_the_default(app):
+    response = respond(app, ROWS[:3])
+
+    assert response.get_json() == ROWS[:3]
+
+
+def test_columnar_json_round_trip(app):
+    response = respond(app, ROWS, query='format=columnar')
+    columns = json.loads(response.get_data())
+
+    assert response.mimetype == COLUMNAR_JSON
+    assert list(columns) == ['timestamp', 'alpha', 'beta']
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == ROWS
+
+
+def test_binary_round_trip(app):
+    response = respond(app, ROWS, headers={'Accept': BINARY})
+    fields, columns = decode_binary(response.get_data())
+
+    assert fields == ['timestamp', 'alpha', 'beta']
+    assert columns['timestamp'].tolist() == [row['timestamp'] for row in ROWS]
+    np.testing.assert_allclose(columns['beta'], [row['beta'] for row in ROWS])
+
+
+def test_mixed_rows_use_the_union_of_their_fields(app):
+    rows = [{'timestamp': 1, 'alpha': 1.0}, {'timestamp': 2, 'beta': 2.0}]
+
+    columns = json.loads(respond(app, rows, query='format=columnar').get_data())
+    fields, binary = decode_binary(respond(app, rows, query='format=binary').get_data())
+
+    assert columns == {'timestamp': [1, 2], 'alpha': [1.0, None], 'beta': [None, 2.0]}
+    assert fields == ['timestamp', 'alpha', 'beta']
+    assert np.isnan(binary['alpha'][1]) and binary['beta'][1] == 2.0
+
+
+def test_empty_rows(app):
+    assert json.loads(respond(app, [], query='format=columnar').get_data()) == {'timestamp': []}
+    assert decode_binary(respond(app, [], query='format=binary').get_data())[0] == ['timestamp']
+
+
+def test_binary_is_not_offered_for_non_numeric_rows(app):
+    response, status = respond(app, ROWS, query='format=binary', numeric=False)
+
+    assert status == 406
+
+
+def test_arrow_round_trip(app):
+    pa = pytest.importorskip('pyarrow')
+    response = respond(app, ROWS, headers={'Accept': ARROW})
+
+    table = pa.ipc.open_stream(response.get_data()).read_all()
+
+    assert table.column_names == ['timestamp', 'alpha', 'beta']
+    assert table.column('timestamp').to_pylist() == [row['timestamp'] for row in ROWS]
+
+
+def test_large_payloads_are_compressed_when_accepted(app):
+    response = respond(app, ROWS, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.get_data())) == ROWS
@@ -0,0 +1,121 @@
+import time
+from datetime import datetime
+
+import pytest
+
+import routes.health_data as health_data
+from routes.health_data import EDGE_PADDING_MS
+from services.anomaly_store import anomaly_timestamp_ms, get_anomaly_store
+from services.result_cache import AnomalyResultCache, align_buckets, result_cache
+
+BUCKET_MS = 10 * 60 * 1000
+# Long settled, so buckets are cached and stored
+START_MS = 1_600_000_200_000
+
+
+def test_align_buckets_covers_the_range():
+    assert align_buckets(1500, 4500, 1000) == [1000, 2000, 3000, 4000]
+    assert align_buckets(1000, 2000, 1000) == [1000]
+
+
+def test_cache_is_keyed_on_signature_and_scope():
+    cache = AnomalyResultCache(bucket_ms=1000)
+    cache.put('p', 0, 'all', 'v1', [(10, {})])
+
+    assert cache.get('p', 0, 'all', 'v1') == [(10, {})]
+    assert cache.get('p', 0, 'all', 'v2') is None
+    assert cache.get('p', 0, 'ECG', 'v1') is None
+
+
+def test_invalidate_drops_overlapping_buckets():
+    cache = AnomalyResultCache(bucket_ms=1000)
+    for bucket in (0, 1000, 2000):
+        cache.put('p', bucket, 'all', 'v1', [])
+    cache.put('q', 1000, 'all', 'v1', [])
+
+    cache.invalidate('p', 1500, 1600)
+
+    assert cache.get('p', 1000, 'all', 'v1') is None
+    assert cache.get('p', 0, 'all', 'v1') == []
+    assert cache.get('p', 2000, 'all', 'v1') == []
+    assert cache.get('q', 1000, 'all', 'v1') == []
+
+
+def test_least_recently_used_buckets_are_evicted():
+    cache = AnomalyResultCache(bucket_ms=1000, max_anomalies=4)
+    cache.put('p', 0, 'all', 'v1', [(0, {})] * 2)
+    cache.put('p', 1000, 'all', 'v1', [(1000, {})] * 2)
+    cache.get('p', 0, 'all', 'v1')
+    cache.put('p', 2000, 'all', 'v1', [(2000, {})] * 2)
+
+    assert cache.get('p', 1000, 'all', 'v1') is None
+    assert cache.get('p', 0, 'all', 'v1') is not None
+
+
+def anomaly(timestamp):
+    return {
+        'id': f'ecg-{timestamp}',
+        'timestamp': datetime.fromtimestamp(timestamp / 1000).isoformat(),
+        'type': 'ECG',
+        'severity': 'medium',
+        'status': 'active'
+    }
+
+
+@pytest.fixture
+def detections(monkeypatch):
+    # One ECG anomaly per minute; records the windows detection ran over
+    runs = []
+
+    def run_detection(patient_id, start_ms, end_ms, scope, baselines):
+        runs.append((start_ms, end_ms))
+        first = start_ms - start_ms % 60000 + 60000
+        return [anomaly(timestamp) for timestamp in range(first, end_ms, 60000)]
+
+    monkeypatch.setattr(health_data, '_run_detection', run_detection)
+    result_cache.clear()
+    yield runs
+    result_cache.clear()
+
+
+def test_stitched_window_matches_every_bucket_once(detections, patient_id):
+    start, end = START_MS + 30000, START_MS + 3 * BUCKET_MS - 30000
+
+    anomalies = health_data._detect_bucketed(patient_id, start, end, 'all')
+    timestamps = [anomaly_timestamp_ms(anomaly) for anomaly in anomalies]
+
+    # Bucket padding overlaps, but every anomaly is kept exactly once and in order
+    assert timestamps == sorted(set(timestamps))
+    assert timestamps == [t for t in range(START_MS - START_MS % 60000 + 60000, end, 60000) if t >= start]
+    assert len(detections) == len(align_buckets(start, end, BUCKET_MS))
+
+
+def test_settled_buckets_are_served_without_detection(detections, patient_id):
+    start, end = START_MS, START_MS + 2 * BUCKET_MS
+    first = health_data._detect_bucketed(patient_id, start, end, 'all')
+    runs = len(detections)
+
+    # From the result cache, then from the store once the cache is gone
+    assert health_data._detect_bucketed(patient_id, start, end, 'all') == first
+    result_cache.clear()
+    again = health_data._detect_bucketed(patient_id, start + 1000, end, 'all')
+
+    assert len(detections) == runs
+    assert [anomaly['id'] for anomaly in again] == [anomaly['id'] for anomaly in first
+                                                    if anomaly_timestamp_ms(anomaly) >= start + 1000]
+
+
+def test_live_buckets_only_detect_the_requested_past(detections, patient_id):
+    started = int(time.time() * 1000)
+    health_data._detect_bucketed(patient_id, started - 10 * 60000, started + 10 * 60000, 'all')
+    finished = int(time.time() * 1000)
+
+    # Nothing past the present is detected or stored
+    assert all(end <= finished + EDGE_PADDING_MS for _, end in detections)
+    stored = get_anomaly_store().query(patient_id)
+    assert stored and max(anomaly_timestamp_ms(anomaly) for anomaly in stored) < finished
+
+    # A short poll of the live bucket detects its own window only
+    detections.clear()
+    health_data._detect_bucketed(patient_id, started - 10000, started, 'all')
+    assert sum(end - start - 2 * EDGE_PADDING_MS for start, end in detections) == 10000
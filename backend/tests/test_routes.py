@@ -0,0 +1,164 @@
+import time
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from conftest import synthetic_ecg
+from routes import health_data
+from routes.health_data import health_data_bp, EDGE_PADDING_MS
+from routes.jobs import jobs_bp
+from services.admission import admission, estimate_cost, Overloaded
+from services.jobs import get_job_queue, JobLimitExceeded
+from services.result_cache import BUCKET_MS
+from services.signal_store import get_signal_store
+
+START_MS = 1_700_000_000_000
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(health_data_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def set_limits(max_inline_cost=admission.max_inline_cost, max_request_cost=admission.max_request_cost):
+        monkeypatch.setattr(admission, 'max_inline_cost', max_inline_cost)
+        monkeypatch.setattr(admission, 'max_request_cost', max_request_cost)
+    return set_limits
+
+
+def recording(channels=4, seconds=40, sample_rate=128):
+    # Noise with a strong alpha burst on the first channel
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 1, (channels, seconds * sample_rate))
+    t = np.arange(3 * sample_rate) / sample_rate
+    samples[0, 20 * sample_rate:23 * sample_rate] += 20 * np.sin(2 * np.pi * 10 * t)
+    return {
+        'channels': [f'ch{channel}' for channel in range(channels)],
+        'samples': samples.tolist(),
+        'sampleRate': sample_rate,
+        'startTime': START_MS
+    }
+
+
+def poll(client, location, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(location).get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'{location} did not finish')
+
+
+def test_small_requests_are_answered_inline(client):
+    response = client.post('/api/eeg/multichannel/anomalies', json=recording())
+
+    assert response.status_code == 200
+    assert {(anomaly['channel'], anomaly['band']) for anomaly in response.get_json()} == {('ch0', 'alpha')}
+
+
+def test_large_requests_become_jobs_to_poll(client, limits):
+    inline = client.post('/api/eeg/multichannel/anomalies', json=recording()).get_json()
+    limits(max_inline_cost=1000)
+
+    response = client.post('/api/eeg/multichannel/anomalies', json=recording())
+
+    assert response.status_code == 202
+    assert response.headers['Location'] == f"/api/jobs/{response.get_json()['id']}"
+    job = poll(client, response.headers['Location'])
+    assert job['status'] == 'done'
+    # Anomaly IDs are only fixed once the anomalies are stored
+    assert [dict(anomaly, id=None) for anomaly in job['result']] == [dict(anomaly, id=None) for anomaly in inline]
+
+
+def test_requests_over_the_hard_limit_are_refused(client, limits):
+    limits(max_request_cost=1000)
+
+    response = client.post('/api/eeg/multichannel/anomalies', json=recording())
+
+    assert response.status_code == 400
+    assert 'narrow the window' in response.get_json()['error']
+
+
+def test_oversized_signal_reads_are_refused(client):
+    response = client.get(f'/api/ecg?patientId=nobody&startTime={START_MS}&endTime={START_MS + 365 * 86400_000}')
+
+    assert response.status_code == 400
+
+
+def test_job_reads_come_from_a_rollup_tier(client, limits, patient_id, monkeypatch):
+    get_signal_store().append(patient_id, 'ecg', *synthetic_ecg(120, start_ms=START_MS))
+    limits(max_inline_cost=100)
+    monkeypatch.setattr(health_data, 'JOB_MAX_POINTS', 50)
+
+    response = client.get(f'/api/ecg?patientId={patient_id}&startTime={START_MS}&endTime={START_MS + 120_000}')
+
+    assert response.status_code == 202
+    rows = poll(client, response.headers['Location'])['result']
+    assert 0 < len(rows) <= 50
+    # One row per second of the tier, not 30000 raw samples
+    assert all('valueMin' in row for row in rows)
+
+
+def test_anomalies_are_priced_by_the_buckets_left_to_detect(client, patient_id):
+    start = START_MS - START_MS % BUCKET_MS
+    end = start + BUCKET_MS + 60_000
+
+    # Two buckets, each detected whole with padding on both sides
+    assert health_data._detection_cost(patient_id, start, end, 'all') == \
+        estimate_cost(0, 2 * (BUCKET_MS + 2 * EDGE_PADDING_MS))
+
+    assert client.get(f'/api/anomalies?patientId={patient_id}&startTime={start}&endTime={end}').status_code == 200
+
+    assert health_data._detection_cost(patient_id, start, end, 'all') == 0
+
+
+def test_overloaded_admission_answers_429_with_retry_after(client, monkeypatch):
+    def saturated(client_id, cost):
+        raise Overloaded(7)
+    monkeypatch.setattr(admission, 'acquire', saturated)
+
+    response = client.post('/api/eeg/multichannel/anomalies', json=recording())
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '7'
+
+
+def test_job_limit_answers_429_with_retry_after(client, limits, monkeypatch):
+    limits(max_inline_cost=1000)
+
+    def full(*args, **kwargs):
+        raise JobLimitExceeded(3)
+    monkeypatch.setattr(get_job_queue(), 'submit', full)
+
+    response = client.post('/api/eeg/multichannel/anomalies', json=recording())
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3'
+
+
+def test_jobs_are_charged_to_the_address_not_the_header(client, limits, monkeypatch):
+    limits(max_inline_cost=1000)
+    submitted = []
+    queue = get_job_queue()
+    submit = queue.submit
+
+    def record(*args, **kwargs):
+        submitted.append(kwargs['client_id'])
+        return submit(*args, **kwargs)
+    monkeypatch.setattr(queue, 'submit', record)
+
+    client.post('/api/eeg/multichannel/anomalies', json=recording(),
+                headers={'X-Client-Id': 'someone-else'}, environ_base={'REMOTE_ADDR': '203.0.113.7'})
+
+    assert submitted == ['203.0.113.7']
+
+
+def test_unknown_jobs_are_not_found(client):
+    assert client.get('/api/jobs/missing').status_code == 404
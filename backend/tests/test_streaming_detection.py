@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from services.anomaly_store import anomaly_timestamp_ms
+from services.streaming_detection import StreamingDetector
+
+START_MS = 1_700_000_000_000
+
+# Starts of sustained excursions, some right at the chunk boundaries below
+EXCURSIONS = (400, 999, 1998, 2500, 4096)
+
+
+@pytest.fixture
+def recording():
+    rng = np.random.default_rng(1)
+    values = rng.normal(0, 1, 5000)
+    for start in EXCURSIONS:
+        values[start:start + 4] = 8
+    timestamps = START_MS + np.arange(len(values)) * 4
+    return timestamps, values
+
+
+def detected(detector, timestamps, values, chunk):
+    anomalies = []
+    for i in range(0, len(values), chunk):
+        anomalies += detector.feed('p', 'alpha', timestamps[i:i + chunk], values[i:i + chunk])
+    return [anomaly_timestamp_ms(anomaly) for anomaly in anomalies]
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 3, 97, 1000, 5000])
+def test_each_excursion_is_detected_once_whatever_the_chunking(recording, chunk):
+    timestamps, values = recording
+
+    found = detected(StreamingDetector(), timestamps, values, chunk)
+
+    # The running statistics move with the chunking, so a noisy sample just
+    # before an excursion may trigger instead of its first sample
+    matches = [[t for t in found if abs(t - timestamps[start]) <= 2 * 4] for start in EXCURSIONS]
+    assert [len(match) for match in matches] == [1] * len(EXCURSIONS)
+    assert len(found) == len(EXCURSIONS)
+
+
+def test_a_spike_without_sustain_is_ignored():
+    detector = StreamingDetector()
+    values = np.tile([1.0, -1.0], 300)
+    values[500] = 50
+    timestamps = START_MS + np.arange(len(values)) * 4
+
+    assert detected(detector, timestamps, values, 50) == []
+
+
+def test_channels_and_patients_are_independent(recording):
+    timestamps, values = recording
+    detector = StreamingDetector()
+
+    detector.feed('p', 'alpha', timestamps[:1000], values[:1000])
+    assert detector.feed('q', 'alpha', timestamps[1000:1100], values[1000:1100]) == []
+
+    detector.reset('p')
+    assert detector.feed('p', 'alpha', timestamps[1000:1100], values[1000:1100]) == []
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from conftest import synthetic_ecg
+from services.summaries import detect_beats, HeartRateTracker
+
+
+def feed_in_chunks(tracker, patient_id, timestamps, values, chunk):
+    beats, rates = [], []
+    for i in range(0, len(values), chunk):
+        chunk_beats, chunk_rates = tracker.feed(patient_id, timestamps[i:i + chunk], values[i:i + chunk])
+        beats.extend(chunk_beats.tolist())
+        rates.extend(chunk_rates.tolist())
+    return np.array(beats), np.array(rates)
+
+
+def test_detect_beats_in_one_block():
+    timestamps, values = synthetic_ecg(60, bpm=72)
+    beats, rates, last_beat = detect_beats(timestamps, values)
+
+    assert len(beats) == 71
+    assert rates.mean() == pytest.approx(72, abs=0.5)
+    assert last_beat == beats[-1]
+
+
+@pytest.mark.parametrize('chunk', [250, 100, 17])
+def test_tracker_matches_one_block_when_fed_in_chunks(chunk):
+    timestamps, values = synthetic_ecg(60, bpm=72)
+    beats, rates = feed_in_chunks(HeartRateTracker(), 'p', timestamps, values, chunk)
+
+    assert len(beats) == 71
+    assert rates.mean() == pytest.approx(72, abs=0.5)
+    assert np.all(np.diff(beats) > 0)
+
+
+def test_tracker_records_slow_heart_rates_across_one_second_chunks():
+    timestamps, values = synthetic_ecg(60, bpm=45)
+    beats, rates = feed_in_chunks(HeartRateTracker(), 'p', timestamps, values, 250)
+
+    assert len(beats) == 44
+    assert rates.mean() == pytest.approx(45, abs=0.5)
+
+
+def test_tracker_keeps_patients_apart():
+    tracker = HeartRateTracker()
+    timestamps, values = synthetic_ecg(10, bpm=60)
+
+    feed_in_chunks(tracker, 'a', timestamps, values, 250)
+    beats, _ = tracker.feed('b', timestamps[:1000], values[:1000])
+
+    # The first beat of a new patient has no preceding interval
+    assert len(beats) == 3
+
+
+def test_gap_longer_than_any_interval_restarts_the_rate():
+    tracker = HeartRateTracker()
+    timestamps, values = synthetic_ecg(10, bpm=60)
+    tracker.feed('p', timestamps, values)
+
+    beats, rates = tracker.feed('p', timestamps + 60_000, values)
+
+    assert len(beats) == 9
+    assert rates.mean() == pytest.approx(60, abs=0.5)
@@ -0,0 +1,164 @@
+import gzip
+import json
+import struct
+import numpy as np
+from flask import Response, jsonify, request
+from services.metrics import timed, response_bytes
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Media types offered through content negotiation
+JSON = 'application/json'
+COLUMNAR_JSON = 'application/vnd.neurocard.columnar+json'
+BINARY = 'application/vnd.neurocard.float32'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+# Short names accepted by the format query parameter
+FORMAT_NAMES = {
+    'json': JSON,
+    'columnar': COLUMNAR_JSON,
+    'binary': BINARY,
+    'arrow': ARROW
+}
+
+# Responses smaller than this are not worth compressing
+COMPRESSION_THRESHOLD = 8 * 1024
+
+# Binary layout: magic, version, field count, row count
+BINARY_MAGIC = b'NCRD'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHI')
+
+
+def negotiate_format(numeric=True):
+    """
+    Pick the response media type from the format parameter or the Accept header
+
+    Args:
+        numeric (bool, optional): Whether every field except 'timestamp' is a
+            number, which the binary formats require. Defaults to True.
+
+    Returns:
+        str: The chosen media type, or None if nothing acceptable is offered
+    """
+    offered = [JSON, COLUMNAR_JSON]
+    if numeric:
+        offered.append(BINARY)
+        if pa is not None:
+            offered.append(ARROW)
+
+    name = request.args.get('format')
+    if name is not None:
+        media_type = FORMAT_NAMES.get(name)
+        return media_type if media_type in offered else None
+
+    # Row JSON stays the default for clients that accept anything
+    if not request.accept_mimetypes or request.accept_mimetypes.best == '*/*':
+        return JSON
+
+    return request.accept_mimetypes.best_match(offered)
+
+
+def _fields(rows):
+    # Timestamp first, then every field any row has in a stable order; rows
+    # of different kinds (e.g. EEG anomalies with a channel) may add fields
+    keys = set().union(*rows) if rows else set()
+    return ['timestamp'] + sorted(keys - {'timestamp'})
+
+
+def _columnar_json(rows):
+    columns = {field: [row.get(field) for row in rows] for field in _fields(rows)}
+    return json.dumps(columns, separators=(',', ':')).encode('utf-8')
+
+
+def _binary(rows):
+    """
+    Encode numeric rows as little-endian columns
+
+    Layout: header (magic 'NCRD', uint16 version, uint16 field count, uint32
+    row count), then each field name as uint16 length + UTF-8 bytes, then the
+    timestamps as int64 milliseconds, then one float32 column per remaining
+    field in the order the names were given. Fields a row lacks are NaN.
+    """
+    fields = _fields(rows)
+    parts = [BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(fields), len(rows))]
+
+    for field in fields:
+        name = field.encode('utf-8')
+        parts.append(struct.pack('<H', len(name)))
+        parts.append(name)
+
+    parts.append(np.fromiter((row['timestamp'] for row in rows), dtype='<i8', count=len(rows)).tobytes())
+    for field in fields[1:]:
+        parts.append(np.fromiter((row.get(field, np.nan) for row in rows), dtype='<f4', count=len(rows)).tobytes())
+
+    return b''.join(parts)
+
+
+def _arrow(rows):
+    fields = _fields(rows)
+    arrays = [pa.array([row['timestamp'] for row in rows], type=pa.int64())]
+    arrays += [pa.array([row.get(field) for row in rows], type=pa.float32()) for field in fields[1:]]
+    batch = pa.RecordBatch.from_arrays(arrays, names=fields)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _compress(response):
+    # Only compress large payloads, and only for clients that accept gzip
+    if 'gzip' not in request.accept_encodings or response.content_length is None:
+        return response
+    if response.content_length < COMPRESSION_THRESHOLD:
+        return response
+
+    response.set_data(gzip.compress(response.get_data(), compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def make_data_response(rows, numeric=True):
+    """
+    Serialize a list of per-row dicts in the format the client asked for
+
+    Supported formats are row JSON (the default), columnar JSON with one
+    array per field, a raw little-endian binary layout and Arrow IPC (when
+    pyarrow is installed). The binary formats are only offered when every
+    field except 'timestamp' is numeric. Rows may have different keys: the
+    columnar formats carry every field any row has, and rows lacking a
+    field get null (JSON and Arrow) or NaN (binary) in its column. Large
+    payloads are gzip-compressed when the client accepts it.
+
+    Args:
+        rows (list): The rows to serialize, each with a 'timestamp'
+        numeric (bool, optional): Whether the rows are purely numeric. Defaults to True.
+
+    Returns:
+        Response: The Flask response, or a 406 response if no format is acceptable
+    """
+    media_type = negotiate_format(numeric)
+
+    if media_type is None:
+        return jsonify({'error': 'Requested format is not available for this endpoint'}), 406
+
+    with timed('serialize'):
+        if media_type == JSON:
+            response = jsonify(rows)
+        elif media_type == COLUMNAR_JSON:
+            response = Response(_columnar_json(rows), mimetype=COLUMNAR_JSON)
+        elif media_type == BINARY:
+            response = Response(_binary(rows), mimetype=BINARY)
+        else:
+            response = Response(_arrow(rows), mimetype=ARROW)
+
+        response.vary.add('Accept')
+        response.vary.add('Accept-Encoding')
+        response = _compress(response)
+
+    response_bytes.observe(response.content_length or 0, endpoint=request.endpoint)
+    return response
@@ -0,0 +1,54 @@
+import math
+import time
+from typing import Dict, List, Optional
+
+# Spacing of the mock ECG points, one per second as in the frontend mock
+MOCK_INTERVAL_MS = 1000
+
+# Window generated when the request does not specify one
+DEFAULT_WINDOW_MS = 100 * 1000
+
+
+def _noise(i: int) -> float:
+    # Deterministic stand-in for Math.random(), hashed from the point index
+    return ((i * 2654435761) % 4294967296) / 4294967296
+
+
+def generate_mock_ecg_data(start_time: Optional[int] = None,
+                           end_time: Optional[int] = None) -> List[Dict]:
+    """
+    Generate mock ECG data for a time window
+
+    Uses the simplified waveform of the frontend mock: a base sine wave, an
+    R peak every 10 points and a little noise. Every value is a function of
+    its timestamp alone, so overlapping windows agree on the points they
+    share and repeated requests see the same data.
+
+    Args:
+        start_time (int, optional): Start of the window in milliseconds.
+            Defaults to 100 seconds before end_time.
+        end_time (int, optional): End of the window in milliseconds (exclusive).
+            Defaults to now.
+
+    Returns:
+        list: List of ECG data points
+    """
+    end_time = int(end_time) if end_time is not None else int(time.time() * 1000)
+    start_time = int(start_time) if start_time is not None else end_time - DEFAULT_WINDOW_MS
+
+    # Points sit on a fixed grid so every window sees the same timestamps
+    first = -(-start_time // MOCK_INTERVAL_MS)
+    last = -(-end_time // MOCK_INTERVAL_MS)
+
+    mock_data = []
+    for i in range(first, last):
+        base_value = math.sin(i * 0.2) * 0.5
+        r_wave = 1.0 if i % 10 == 0 else 0
+        noise = _noise(i) * 0.1
+
+        mock_data.append({
+            'timestamp': i * MOCK_INTERVAL_MS,
+            'value': base_value + r_wave + noise
+        })
+
+    return mock_data